@@ -0,0 +1,222 @@
+import datetime
+import os
+import sys
+
+import db
+import schema
+
+# ---------------- Year Archives ----------------
+# Closed years can be moved out of expenses.db into one archive file per
+# year (expenses-2021.db next to expenses.db), so the hot file that every
+# startup, budget check, backup and VACUUM touches only holds recent years.
+# The rollups keep their rows for archived months, so the budget bar,
+# charts and forecasts never need the archives.  Reads of raw rows that
+# reach into archived years (table paging, date-range fetches, exports)
+# ATTACH the archives they need and read through a TEMP view,
+# all_expenses, that is the UNION ALL of the hot table and those archives.
+#
+# SQLite attaches at most 10 databases by default, so a range covering more
+# archived years is split into segments of up to MAX_ATTACHED years each,
+# which callers read one after another (they are in date order).
+
+KEEP_CLOSED_YEARS = 1     # closed years left in the hot file (the rest are archived)
+MAX_ATTACHED = 9
+ROW_COLUMNS = "id, amount_paise, category_id, description, date, import_key"
+VIEW = "all_expenses"
+
+
+def archive_path(year):
+    """Archive file for `year`, next to the hot database."""
+    if db.DB_PATH == ":memory:":
+        raise RuntimeError("An in-memory database cannot have archive files.")
+    stem, _ = os.path.splitext(os.path.abspath(db.DB_PATH))
+    return f"{stem}-{year}.db"
+
+
+def archived_years(conn=None):
+    conn = conn or db.get_conn()
+    return [year for (year,) in conn.execute("SELECT year FROM archives ORDER BY year")]
+
+
+def segments(conn, from_date=None, to_date=None):
+    """Split a date range into [(lo, hi, years)] pieces to read in order.
+
+    years are the archives to attach for the piece (none when the range is
+    all hot); lo and hi bound the piece's dates and are None at open ends.
+    """
+    first = int(from_date[:4]) if from_date else 0
+    last = int(to_date[:4]) if to_date else 9999
+    years = [y for y in archived_years(conn) if first <= y <= last]
+    if len(years) <= MAX_ATTACHED:
+        return [(None, None, years)]
+    pieces = []
+    for i in range(0, len(years), MAX_ATTACHED):
+        chunk = years[i:i + MAX_ATTACHED]
+        lo = f"{years[i - 1] + 1}-01-01" if i else None
+        hi = f"{chunk[-1]}-12-31" if i + MAX_ATTACHED < len(years) else None
+        pieces.append((lo, hi, chunk))
+    return pieces
+
+
+def attach(conn, years):
+    """Attach exactly these archive years to conn and return the table name to read from.
+
+    Returns "expenses" when no archive is needed, otherwise the TEMP view
+    all_expenses over the hot table and the attached archives.  Must be
+    called outside a transaction (SQLite cannot ATTACH inside one).
+    """
+    attached = {name for _, name, _ in conn.execute("PRAGMA database_list") if name.startswith("archive_")}
+    wanted = {f"archive_{y}" for y in years}
+    view_exists = conn.execute("SELECT 1 FROM sqlite_temp_master WHERE name = ?", (VIEW,)).fetchone()
+    if attached == wanted and (view_exists or not years):
+        return VIEW if years else "expenses"
+    conn.execute(f"DROP VIEW IF EXISTS temp.{VIEW}")
+    for name in attached - wanted:
+        conn.execute(f"DETACH DATABASE {name}")
+    for year in years:
+        if f"archive_{year}" not in attached:
+            conn.execute(f"ATTACH DATABASE ? AS archive_{year}", (archive_path(year),))
+    if not years:
+        return "expenses"
+    # Each arm is a plain table read (category names are looked up per row,
+    # not joined), so SQLite can merge the arms' date indexes for ORDER BY.
+    union = " UNION ALL ".join(
+        f"""SELECT id, amount_paise / 100.0 AS amount,
+                   (SELECT name FROM main.categories WHERE categories.id = category_id) AS category,
+                   description, date, year_month, import_key, category_id
+            FROM {name}.expense_rows"""
+        for name in ["main"] + sorted(wanted))
+    conn.execute(f"CREATE TEMP VIEW {VIEW} AS {union}")
+    return VIEW
+
+
+def _create_archive_table(conn, name):
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS {name}.expense_rows (
+                     id INTEGER PRIMARY KEY,
+                     amount_paise INTEGER NOT NULL,
+                     category_id INTEGER NOT NULL,
+                     description TEXT,
+                     date TEXT NOT NULL,
+                     year_month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL,
+                     import_key TEXT
+                 )""")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {name}.idx_expense_rows_date ON expense_rows (date)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {name}.idx_expense_rows_category_date ON expense_rows (category_id, date)")
+
+
+def upgrade_archives():
+    """Convert archives written before schema v9 (REAL amounts, category names) to expense_rows.
+
+    Call after schema.migrate(), outside a transaction; it does nothing once
+    every archive is converted.
+    """
+    conn = db.get_conn()
+    years = [y for (y,) in conn.execute("SELECT year FROM archives WHERE NOT compact ORDER BY year")]
+    for year in years:
+        name = f"archive_{year}"
+        conn.execute(f"ATTACH DATABASE ? AS {name}", (archive_path(year),))
+        try:
+            with db.transaction():
+                _create_archive_table(conn, name)
+                conn.execute(f"""INSERT OR IGNORE INTO categories (name)
+                                 SELECT DISTINCT category FROM {name}.expenses""")
+                conn.execute(f"""INSERT OR IGNORE INTO {name}.expense_rows ({ROW_COLUMNS})
+                                 SELECT e.id, CAST(ROUND(e.amount * 100) AS INTEGER), c.id,
+                                        e.description, e.date, e.import_key
+                                 FROM {name}.expenses e JOIN categories c ON c.name = e.category""")
+                conn.execute(f"DROP TABLE {name}.expenses")
+                conn.execute("UPDATE archives SET compact = 1 WHERE year = ?", (year,))
+            conn.execute(f"VACUUM {name}")
+        finally:
+            conn.execute(f"DETACH DATABASE {name}")
+
+# ---- Archiving ----
+def archive_year(year):
+    """Move every expense dated in `year` from the hot file into its archive; returns the row count moved.
+
+    The copy and the delete are separate transactions (SQLite does not make
+    WAL transactions atomic across files), ordered so that a crash between
+    them leaves rows in both files unregistered, and a rerun finishes the job.
+    """
+    conn = db.get_conn()
+    lo, hi = f"{year}-01-01", f"{year}-12-31"
+    name = f"archive_{year}"
+    attach(conn, [year])
+    with db.transaction():
+        _create_archive_table(conn, name)
+        conn.execute(f"""INSERT OR IGNORE INTO {name}.expense_rows ({ROW_COLUMNS})
+                         SELECT {ROW_COLUMNS} FROM main.expense_rows WHERE date BETWEEN ? AND ?""", (lo, hi))
+    with db.transaction():
+        conn.execute("""INSERT OR IGNORE INTO archived_import_keys (import_key)
+                        SELECT import_key FROM main.expense_rows
+                        WHERE date BETWEEN ? AND ? AND import_key IS NOT NULL""", (lo, hi))
+        # The rollups keep these rows and the change log must not see them as
+        # deleted: only the raw expenses move.
+        with schema.triggers_suspended(conn, "trg_rollup_delete", "trg_changes_delete"):
+            moved = conn.execute("DELETE FROM main.expense_rows WHERE date BETWEEN ? AND ?", (lo, hi)).rowcount
+        conn.execute(f"""INSERT INTO archives (year, path, rows, archived_at, compact)
+                         VALUES (?, ?, (SELECT COUNT(*) FROM {name}.expense_rows), ?, 1)
+                         ON CONFLICT (year) DO UPDATE SET rows = excluded.rows, archived_at = excluded.archived_at""",
+                     (year, os.path.basename(archive_path(year)), datetime.datetime.now().isoformat(timespec="seconds")))
+    attach(conn, [])
+    return moved
+
+
+def archive_closed_years(keep=KEEP_CLOSED_YEARS, vacuum=True):
+    """Archive every year that ended more than `keep` years ago; returns {year: rows moved}.
+
+    Rows later added with a date in an archived year are swept into its
+    archive on the next run.  vacuum=True compacts the hot file afterwards.
+    """
+    conn = db.get_conn()
+    cutoff = datetime.date.today().year - keep
+    years = [int(y) for (y,) in conn.execute(
+        "SELECT DISTINCT substr(year_month, 1, 4) FROM monthly_rollup WHERE year_month < ?", (f"{cutoff}-01",))]
+    moved = {}
+    for year in years:
+        if conn.execute("SELECT 1 FROM main.expense_rows WHERE date BETWEEN ? AND ? LIMIT 1",
+                        (f"{year}-01-01", f"{year}-12-31")).fetchone():
+            moved[year] = archive_year(year)
+    if moved and vacuum:
+        conn.execute("VACUUM")
+    return moved
+
+
+def delete_archived(expense_ids):
+    """Delete these ids from whichever archives hold them, keeping the rollups and change log in step."""
+    conn = db.get_conn()
+    ids = list(expense_ids)
+    placeholders = ", ".join("?" * len(ids))
+    for _, _, years in segments(conn):
+        attach(conn, years)
+        for year in years:
+            name = f"archive_{year}"
+            with db.transaction():
+                rows = conn.execute(f"""SELECT r.id, r.amount_paise, c.name, r.date
+                                        FROM {name}.expense_rows r JOIN main.categories c ON c.id = r.category_id
+                                        WHERE r.id IN ({placeholders})""", ids).fetchall()
+                if rows:
+                    conn.execute(f"DELETE FROM {name}.expense_rows WHERE id IN ({placeholders})", ids)
+                    conn.execute("UPDATE archives SET rows = rows - ? WHERE year = ?", (len(rows), year))
+                    schema.remove_from_rollup(conn, [row[1:] for row in rows])
+                    schema.log_deletes(conn, [row[0] for row in rows])
+    attach(conn, [])
+
+
+if __name__ == "__main__":
+    # python archive.py [--keep N] [expenses.db] -- archive closed years and VACUUM
+    args = sys.argv[1:]
+    keep = KEEP_CLOSED_YEARS
+    if "--keep" in args:
+        i = args.index("--keep")
+        keep = int(args[i + 1])
+        del args[i:i + 2]
+    if args:
+        db.set_db_path(args[0])
+    schema.migrate(db.get_conn())
+    upgrade_archives()
+    moved = archive_closed_years(keep)
+    for year, rows in moved.items():
+        print(f"{year}: {rows} expenses moved to {archive_path(year)}")
+    if not moved:
+        print("nothing to archive")
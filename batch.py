@@ -0,0 +1,213 @@
+import argparse
+import calendar
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+import time
+
+import db
+import exporters
+import pivot
+import queries
+import snapshot
+
+# ---------------- Batch Reports ----------------
+# Month-end close renders the same reports for many months and category
+# filters.  run_batch() takes (kind, filters, output path) specs and renders
+# them in a process pool, so PDF writing, workbook building and matplotlib
+# drawing run on every core instead of one after another on the GUI thread.
+#
+# Workers are spawned, not forked: a forked child would inherit the
+# parent's open SQLite connections (which SQLite does not support across
+# fork) and, in the GUI, its running threads.  Each worker process opens the
+# database read-only (db.set_db_path(..., read_only=True)).  Charts are pivots over the columnar snapshot, which the
+# parent refreshes once before starting; the workers map the same files.
+#
+# kind is one of:
+#   pdf, excel, csv   the matching expenses, as export_to_pdf/excel/csv
+#   pivot             an Excel category-by-month pivot of the matching expenses
+#   pie, trend        a PNG chart: totals by category / by month
+# filters are those of fetch_expenses (from_date, to_date, category; text
+# only for the row exports).
+
+KINDS = ("pdf", "excel", "csv", "pivot", "pie", "trend")
+CHART_KINDS = ("pivot", "pie", "trend")
+
+
+def _init_worker(path):
+    db.set_db_path(path, read_only=True)
+
+
+def _pivot_args(filters):
+    if filters.get("text"):
+        raise ValueError("Charts and pivots cannot filter by text.")
+    category = filters.get("category")
+    return {"start": filters.get("from_date"), "end": filters.get("to_date"),
+            "categories": [category] if category and category != "All" else None}
+
+
+def _render(kind, filters, path):
+    # Returns the number of expenses or chart points written.
+    if kind in ("pdf", "excel", "csv"):
+        export = {"pdf": exporters.export_to_pdf, "excel": exporters.export_to_excel,
+                  "csv": exporters.export_to_csv}[kind]
+        rows = 0
+
+        def counted():
+            nonlocal rows
+            for row in queries.iter_expenses(filters):
+                rows += 1
+                yield row
+
+        export(counted(), path)
+        return rows
+
+    snap = snapshot.load()
+    if snap is None:
+        raise RuntimeError("No columnar snapshot; call snapshot.refresh() first.")
+    if kind == "pivot":
+        result = pivot.group_by(("category", "month"), snap=snap, **_pivot_args(filters))
+        exporters.export_pivot_to_excel(result, path)
+        return result.values.size
+
+    from matplotlib.figure import Figure   # matplotlib only in workers that draw
+    from charts import ChartView
+    view = ChartView(Figure(figsize=(7, 5)))
+    view.figure.subplots_adjust(bottom=0.18)
+    title = " ".join(str(v) for v in (filters.get("category"), filters.get("from_date"), filters.get("to_date")) if v)
+    if kind == "pie":
+        result = pivot.group_by(("category",), snap=snap, **_pivot_args(filters))
+        points = [(label, value) for label, value in zip(result.labels[0], result.values) if value > 0]
+        if points:
+            labels, values = zip(*points)
+            view.draw_pie(labels, values, f"Expenses by Category {title}".strip())
+        else:
+            view.clear("No expense data.")
+    elif kind == "trend":
+        result = pivot.group_by(("month",), snap=snap, **_pivot_args(filters))
+        points = list(zip(result.labels[0], result.values))
+        if points:
+            months, totals = zip(*points)
+            view.draw_trend(list(months), list(totals), f"Monthly Expense Trend {title}".strip())
+        else:
+            view.clear("No expense data.")
+    else:
+        raise ValueError(f"Unknown report kind: {kind}")
+    view.figure.savefig(path)
+    return len(points)
+
+
+def render(spec):
+    """Render one (kind, filters, path) spec; returns its result dict (never raises)."""
+    kind, filters, path = spec
+    start = time.perf_counter()
+    try:
+        rows = _render(kind, filters or {}, path)
+        error = None
+    except Exception as e:
+        rows, error = None, f"{type(e).__name__}: {e}"
+    return {"kind": kind, "filters": filters, "path": path, "ok": error is None, "error": error,
+            "rows": rows, "seconds": time.perf_counter() - start, "pid": os.getpid()}
+
+
+def run_batch(specs, workers=None, progress=None):
+    """Render every spec and return their result dicts in spec order.
+
+    Each result has kind, filters, path, ok, error (a message or None), rows,
+    seconds (time spent in the worker) and pid.  workers=None uses one
+    process per core; workers=0 renders serially in this process (for
+    comparison).  progress, if given, is called as progress(done, total)
+    as jobs finish; if it raises (e.g. worker.Cancelled), jobs not yet
+    started are dropped and the exception propagates.
+    """
+    specs = [(kind, filters or {}, path) for kind, filters, path in specs]
+    for kind, _, _ in specs:
+        if kind not in KINDS:
+            raise ValueError(f"Unknown report kind: {kind}")
+    if db.DB_PATH == ":memory:":
+        raise RuntimeError("Batch reports need a database file.")
+    if any(kind in CHART_KINDS for kind, _, _ in specs):
+        snapshot.refresh()
+    results = [None] * len(specs)
+    if workers == 0:
+        for i, spec in enumerate(specs):
+            results[i] = render(spec)
+            if progress:
+                progress(i + 1, len(specs))
+        return results
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=_init_worker,
+                                                initargs=(os.path.abspath(db.DB_PATH),)) as pool:
+        futures = {pool.submit(render, spec): i for i, spec in enumerate(specs)}
+        try:
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:      # the worker process itself died
+                    kind, filters, path = specs[i]
+                    results[i] = {"kind": kind, "filters": filters, "path": path, "ok": False,
+                                  "error": f"{type(e).__name__}: {e}", "rows": None, "seconds": 0.0, "pid": None}
+                if progress:
+                    progress(done, len(specs))
+        except BaseException:
+            pool.shutdown(cancel_futures=True)
+            raise
+    return results
+
+
+EXTENSIONS = {"pdf": "pdf", "excel": "xlsx", "csv": "csv", "pivot": "xlsx", "pie": "png", "trend": "png"}
+
+
+def monthly_specs(year, out_dir, kinds=("pdf", "excel", "pie"), categories=(None,)):
+    """Specs for every month of `year` x category filter (None = all) x kind, written into out_dir."""
+    specs = []
+    for month in range(1, 13):
+        last = calendar.monthrange(year, month)[1]
+        for category in categories:
+            filters = {"from_date": f"{year}-{month:02d}-01", "to_date": f"{year}-{month:02d}-{last}"}
+            if category:
+                filters["category"] = category
+            for kind in kinds:
+                name = f"{year}-{month:02d}-{category or 'all'}-{kind}.{EXTENSIONS[kind]}"
+                specs.append((kind, filters, os.path.join(out_dir, name)))
+    return specs
+
+
+def summary(results, wall):
+    failed = [r for r in results if not r["ok"]]
+    busy = sum(r["seconds"] for r in results)
+    return (f"{len(results) - len(failed)}/{len(results)} reports in {wall:.1f}s "
+            f"({busy:.1f}s of rendering, {busy / wall if wall else 0:.1f}x parallel)"
+            + "".join(f"\n  FAILED {r['path']}: {r['error']}" for r in failed))
+
+
+def main():
+    # python batch.py YEAR OUT_DIR [--db expenses.db] [--kinds pdf excel pie]
+    #                 [--categories Food Travel] [--workers N]
+    parser = argparse.ArgumentParser()
+    parser.add_argument("year", type=int)
+    parser.add_argument("out_dir")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--kinds", nargs="+", default=["pdf", "excel", "pie"], choices=KINDS)
+    parser.add_argument("--categories", nargs="+", default=[], help="one report set per category, plus all")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per core, 0: serial)")
+    args = parser.parse_args()
+    db.set_db_path(args.db)
+    os.makedirs(args.out_dir, exist_ok=True)
+    specs = monthly_specs(args.year, args.out_dir, args.kinds, [None] + args.categories)
+    start = time.perf_counter()
+    results = run_batch(specs, args.workers)
+    wall = time.perf_counter() - start
+    for r in results:
+        status = "ok    " if r["ok"] else "FAILED"
+        print(f"{status} {r['seconds'] * 1000:8.0f} ms  {os.path.basename(r['path'])}"
+              + (f"  {r['error']}" if r["error"] else ""))
+    print(summary(results, wall))
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Peak memory and throughput of the streaming exporters.
+
+    python benchmarks/bench_exports.py [--rows 100000 1000000] [--formats xlsx pdf csv csv.gz]
+
+Each export runs in a fresh child process so its peak RSS is not polluted by
+the data setup or by earlier runs.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import datagen  # noqa: E402
+import db  # noqa: E402
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:   # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def make_db(path, rows):
+    if not os.path.exists(path):
+        datagen.generate(path, rows)
+
+
+def run_child(fmt, db_path, out_path):
+    import expense
+    from exporters import export_to_csv, export_to_excel, export_to_pdf
+    exporter = {"xlsx": export_to_excel, "pdf": export_to_pdf,
+                "csv": export_to_csv, "csv.gz": export_to_csv}[fmt]
+    # Memory-mapped database pages count towards RSS although they are just
+    # page cache; turn mmap off so the figure reflects the exporter itself.
+    db.PRAGMAS = tuple(p for p in db.PRAGMAS if "mmap_size" not in p)
+    db.set_db_path(db_path)
+    baseline = peak_rss_mb()
+    count = 0
+
+    def counted():
+        nonlocal count
+        for row in expense.iter_expenses():
+            count += 1
+            yield row
+
+    start = time.perf_counter()
+    exporter(counted(), out_path)
+    seconds = time.perf_counter() - start
+    print(json.dumps({"format": fmt, "rows": count, "seconds": round(seconds, 3),
+                      "rows_per_second": round(count / seconds), "baseline_rss_mb": round(baseline, 1),
+                      "peak_rss_mb": round(peak_rss_mb(), 1)}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--formats", nargs="+", default=["xlsx", "pdf", "csv", "csv.gz"])
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "expense-bench"))
+    args = parser.parse_args()
+    os.makedirs(args.workdir, exist_ok=True)
+    for rows in args.rows:
+        db_path = os.path.join(args.workdir, f"expenses_{rows}.db")
+        make_db(db_path, rows)
+        for fmt in args.formats:
+            out_path = os.path.join(args.workdir, f"export_{rows}.{fmt}")
+            result = subprocess.run([sys.executable, __file__, "--child", fmt, db_path, out_path],
+                                    check=True, capture_output=True, text=True)
+            r = json.loads(result.stdout)
+            print(f"{rows:>9} rows  {fmt:<7} {r['seconds']:>8.2f}s  {r['rows_per_second']:>9} rows/s  "
+                  f"peak RSS {r['peak_rss_mb']:>7.1f} MB (baseline {r['baseline_rss_mb']:.1f} MB)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        run_child(*sys.argv[2:])
+    else:
+        main()
@@ -0,0 +1,86 @@
+"""Time to first window, per startup phase and per top-level import.
+
+    python benchmarks/bench_startup.py [--runs 5] [--exe dist/expense.exe] [--json out.json]
+
+Launches the app N times with --startup-timing (it exits as soon as the
+first window is drawn) and reports the median of each phase.  For the
+Python run, -X importtime gives the cumulative cost of every top-level
+import.  With --exe the frozen binary is timed the same way, including
+wall-clock time from launch.  Needs a display.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr):
+    """Cumulative microseconds of each top-level import in -X importtime output."""
+    costs = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not name.startswith("  "):         # nested imports are indented
+            costs[name.strip()] = int(cumulative)
+    return costs
+
+
+def run_once(cmd, workdir):
+    out = os.path.join(workdir, "startup.json")
+    if os.path.exists(out):
+        os.remove(out)
+    start = time.perf_counter()
+    proc = subprocess.run(cmd + [f"--startup-timing={out}"], cwd=workdir,
+                          capture_output=True, text=True, timeout=120)
+    wall = (time.perf_counter() - start) * 1000
+    with open(out) as f:
+        phases = json.load(f)
+    phases["wall_ms"] = round(wall, 1)
+    return phases, parse_importtime(proc.stderr)
+
+
+def summarize(runs):
+    return {key: round(statistics.median(r[key] for r in runs), 1) for key in runs[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--exe", help="also time a frozen build")
+    parser.add_argument("--json", help="write the medians to this file")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        targets = [("python", [sys.executable, "-X", "importtime", os.path.join(ROOT, "expense.py")])]
+        if args.exe:
+            targets.append(("exe", [os.path.abspath(args.exe)]))
+        for name, cmd in targets:
+            phases, imports = [], []
+            for _ in range(args.runs):
+                p, i = run_once(cmd, workdir)
+                phases.append(p)
+                imports.append(i)
+            results[name] = summarize(phases)
+            print(f"{name}: " + "  ".join(f"{k[:-3]} {v:.0f}ms" for k, v in results[name].items()))
+            if imports[0]:
+                modules = {m: statistics.median(run.get(m, 0) for run in imports) for m in imports[0]}
+                results[name + "_imports_ms"] = {m: round(us / 1000, 1) for m, us in
+                                                 sorted(modules.items(), key=lambda kv: -kv[1])[:15]}
+                for module, ms in results[name + "_imports_ms"].items():
+                    print(f"    import {module:<30} {ms:>7.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
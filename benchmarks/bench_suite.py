@@ -0,0 +1,220 @@
+"""Timings for the data and report paths at several database sizes.
+
+    python benchmarks/bench_suite.py [--rows 10000 100000 1000000] [--json results.json]
+                                     [--baseline benchmarks/baseline.json] [--tolerance 0.25]
+                                     [--save-baseline]
+
+Each size gets a synthetic database from datagen.py (cached in --workdir) and
+is timed on:
+
+* fetch_expenses with every combination of the from_date / to_date /
+  category filters, and the first page of a few text searches,
+* get_total_expenses_for_month for the latest month,
+* check_before_add_expense with the message boxes answered automatically,
+* recommend_actions_for_month,
+* export_to_excel and export_to_pdf of the whole table,
+* the snapshot refresh with nothing new, and the category-by-month,
+  weekday heatmap and year-over-year pivots,
+* a category suggestion for a partly typed description,
+* refresh_table on a hidden window (skipped when there is no display).
+
+Results (median and min in ms per case) are written as JSON and compared
+with the baseline: any case whose median is more than --tolerance slower
+than the baseline (and at least NOISE_MS slower) is reported and the script
+exits with status 1.  A missing baseline, or one without any of the sizes
+run, exits with status 2, so a check that compared nothing never passes.
+
+benchmarks/baseline.json is committed; its "meta" says which machine it
+was measured on.  Timings only compare on the same machine, so on a new
+one (or a CI runner) bootstrap it once from a known-good commit with
+--save-baseline, which writes the run as the new baseline.
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import categorizer  # noqa: E402
+import datagen  # noqa: E402
+import db  # noqa: E402
+import expense  # noqa: E402
+import operations  # noqa: E402
+import pivot  # noqa: E402
+import snapshot  # noqa: E402
+from table_view import PAGE_SIZE  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+NOISE_MS = 2.0          # differences below this are never a regression
+
+
+def timed(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    entry = {"median_ms": round(statistics.median(times), 3), "min_ms": round(min(times), 3), "runs": repeat}
+    if isinstance(result, list):
+        entry["rows"] = len(result)
+    return entry
+
+
+@contextlib.contextmanager
+def answered_message_boxes(answer=False):
+    """Replace the blocking message boxes used by the GUI checks with instant answers."""
+    box = expense.messagebox
+    saved = {name: getattr(box, name) for name in ("askyesno", "showwarning", "showerror", "showinfo")}
+    box.askyesno = lambda *a, **k: answer
+    box.showwarning = box.showerror = box.showinfo = lambda *a, **k: None
+    try:
+        yield
+    finally:
+        for name, fn in saved.items():
+            setattr(box, name, fn)
+
+
+def filter_cases(conn):
+    last = conn.execute("SELECT MAX(date) FROM expenses").fetchone()[0]
+    year = last[:4]
+    values = {"from_date": f"{year}-01-01", "to_date": f"{year}-06-30", "category": "Food"}
+    for n in range(len(values) + 1):
+        for keys in itertools.combinations(values, n):
+            yield "fetch_expenses[" + ("+".join(keys) or "all") + "]", {k: values[k] for k in keys}
+
+
+def refresh_table_case(repeat):
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        return {"skipped": str(e)}
+    root.withdraw()
+    app = expense.ExpenseTrackerApp(root)
+    try:
+        def refresh():
+            app.refresh_table()
+            root.update_idletasks()
+        return timed(refresh, repeat)
+    finally:
+        app.close()
+
+
+def run_size(rows, workdir, repeat, heavy_repeat):
+    path = os.path.join(workdir, f"expenses_{rows}.db")
+    if not os.path.exists(path):
+        print(f"generating {rows} rows ...", flush=True)
+        datagen.generate(path, rows)
+    db.set_db_path(path)
+    conn = db.get_conn()
+    latest = conn.execute("SELECT MAX(year_month) FROM monthly_rollup").fetchone()[0]
+    year, month = map(int, latest.split("-"))
+    results = {}
+
+    def record(name, entry):
+        results[name] = entry
+        if "skipped" in entry:
+            print(f"{rows:>9}  {name:<48} skipped ({entry['skipped']})", flush=True)
+        else:
+            print(f"{rows:>9}  {name:<48} {entry['median_ms']:>10.2f} ms", flush=True)
+
+    for name, filters in filter_cases(conn):
+        record(name, timed(lambda: expense.fetch_expenses(filters), heavy_repeat))
+    for text in ("gro", "water bill", "food"):
+        record(f"fetch_expenses[text={text!r}, first page]",
+               timed(lambda: expense.fetch_expenses({"text": text}, limit=PAGE_SIZE), repeat))
+    record("get_total_expenses_for_month", timed(lambda: operations.get_total_expenses_for_month(year, month), repeat))
+    app = types.SimpleNamespace(backend=operations)     # all check_before_add_expense uses of the app
+    with answered_message_boxes():
+        record("check_before_add_expense", timed(
+            lambda: expense.ExpenseTrackerApp.check_before_add_expense(app, 500.0, "Food", f"{latest}-15"), repeat))
+    record("recommend_actions_for_month", timed(lambda: operations.recommend_actions_for_month(year, month), repeat))
+    for name, exporter, ext in (("export_to_excel", expense.export_to_excel, "xlsx"),
+                                ("export_to_pdf", expense.export_to_pdf, "pdf")):
+        out = os.path.join(workdir, f"bench_{rows}.{ext}")
+        record(name, timed(lambda: exporter(expense.iter_expenses(), out), heavy_repeat, warmup=0))
+        os.remove(out)
+    snapshot.refresh()
+    record("snapshot.refresh[unchanged]", timed(snapshot.refresh, repeat))
+    for name in ("category_by_month", "weekday_heatmap", "year_over_year"):
+        record(f"pivot.{name}", timed(getattr(pivot, name), repeat))
+    categorizer.refresh()
+    record("categorizer.suggest_category", timed(lambda: categorizer.suggest_category("groc", 250.0), repeat))
+    record("refresh_table", refresh_table_case(repeat))
+    db.close_all()
+    return results
+
+
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    for size, cases in results.items():
+        for name, entry in cases.items():
+            base = baseline.get(size, {}).get(name)
+            if not base or "median_ms" not in base or "median_ms" not in entry:
+                continue
+            now, before = entry["median_ms"], base["median_ms"]
+            if now > before * (1 + tolerance) and now - before > NOISE_MS:
+                regressions.append(f"{size} rows  {name}: {before:.2f} ms -> {now:.2f} ms (+{(now / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per quick case")
+    parser.add_argument("--heavy-repeat", type=int, default=3, help="runs per full-table fetch and export")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "expense-bench"))
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+    os.makedirs(args.workdir, exist_ok=True)
+
+    results = {str(rows): run_size(rows, args.workdir, args.repeat, args.heavy_repeat) for rows in args.rows}
+    report = {
+        "meta": {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                 "platform": platform.platform(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline written to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one", file=sys.stderr)
+        sys.exit(2)
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    if not set(results) & set(baseline):
+        print(f"{args.baseline} has none of the sizes run ({', '.join(results)} rows); "
+              "run with --save-baseline to add them", file=sys.stderr)
+        sys.exit(2)
+    regressions = find_regressions(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for line in regressions:
+            print("  " + line)
+        sys.exit(1)
+    print("no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
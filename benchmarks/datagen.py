@@ -0,0 +1,109 @@
+"""Deterministic synthetic expenses.db for benchmarks.
+
+    python benchmarks/datagen.py OUT.db [--rows 100000] [--years 5] [--end 2025-12-31] [--seed 0]
+
+The same arguments always produce the same database: expenses spread evenly
+over `years` years ending at `end` (ids ascend with date, as when entered day
+by day), each category with its own share, price range and descriptions,
+plus a monthly budget, category limits and unwanted categories derived from
+the generated spend.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+import schema  # noqa: E402
+from records import CATEGORIES, to_paise  # noqa: E402
+
+DEFAULT_END = datetime.date(2025, 12, 31)
+
+# category: (share of rows, low amount, high amount, descriptions)
+PROFILES = {
+    "Food": (0.22, 80, 600, ["groceries", "vegetables", "milk and bread", "restaurant dinner",
+                             "canteen lunch", "fruit market", "rice and dal"]),
+    "Travel": (0.12, 20, 800, ["bus pass", "auto fare", "metro card top up", "cab to office",
+                               "train ticket", "petrol"]),
+    "Shopping": (0.10, 200, 4000, ["online order", "kitchen items", "electronics", "books",
+                                   "household supplies"]),
+    "Bills": (0.08, 300, 3000, ["electricity bill", "mobile recharge", "internet bill",
+                                "water bill", "gas cylinder"]),
+    "Medical": (0.05, 100, 2500, ["pharmacy", "doctor consultation", "lab test", "eye checkup"]),
+    "Trip": (0.02, 1500, 20000, ["hotel booking", "flight ticket", "weekend trip", "tour package"]),
+    "Dress": (0.05, 400, 3500, ["shirt", "saree", "shoes", "kurta", "jeans"]),
+    "Cosmetics": (0.05, 100, 1200, ["face cream", "shampoo", "perfume", "lipstick"]),
+    "JunkFood": (0.16, 40, 350, ["pizza", "burger", "chips and soda", "ice cream", "samosa",
+                                 "fried chicken"]),
+    "Other": (0.15, 20, 1500, ["gift", "donation", "stationery", "repair work", "misc"]),
+}
+UNWANTED = ("JunkFood", "Cosmetics")
+LIMITED = ("Food", "Shopping", "JunkFood")
+BUDGET_HEADROOM = 1.05      # budget = median monthly spend x this
+
+
+def _rows(rows, start, days, seed):
+    rng = random.Random(seed)
+    cats = [c for c in CATEGORIES if c in PROFILES]
+    weights = [PROFILES[c][0] for c in cats]
+    for i, category in enumerate(rng.choices(cats, weights, k=rows)):
+        _, low, high, words = PROFILES[category]
+        amount = round(low * (high / low) ** rng.random(), 2)    # log-uniform: many small, few large
+        date = start + datetime.timedelta(days=i * days // rows)
+        yield amount, category, rng.choice(words), date.isoformat()
+
+
+def generate(path, rows, years=5, end=DEFAULT_END, seed=0):
+    """Create `path` (which must not exist yet) holding `rows` synthetic expenses."""
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    start = end.replace(year=end.year - years) + datetime.timedelta(days=1)
+    days = (end - start).days + 1
+    db.set_db_path(path)
+    conn = db.get_conn()
+    schema.migrate(conn)
+    with db.transaction() as conn:
+        ids = schema.category_ids(conn)
+        # Generated rows are the baseline a first (full) change export covers,
+        # so they are not logged as changes.
+        with schema.triggers_suspended(conn, "trg_rollup_insert", "trg_fts_insert", "trg_changes_insert"):
+            conn.executemany("""INSERT INTO expense_rows (amount_paise, category_id, description, date)
+                                VALUES (?, ?, ?, ?)""",
+                             ((to_paise(amount), ids[category], description, date)
+                              for amount, category, description, date in _rows(rows, start, days, seed)))
+        schema.rebuild_rollup(conn)
+        schema.rebuild_search_index(conn)
+
+        monthly = sorted(t for (t,) in conn.execute(
+            "SELECT SUM(total_paise) / 100.0 FROM monthly_rollup GROUP BY year_month"))
+        budget = round(monthly[len(monthly) // 2] * BUDGET_HEADROOM) if monthly else 0
+        conn.executemany("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                         [("monthly_budget", str(budget)), ("block_mode", "0")])
+        for category, average in conn.execute(
+                f"""SELECT category, AVG(total_paise) / 100.0 FROM monthly_rollup
+                    WHERE category IN ({", ".join("?" * len(LIMITED))}) GROUP BY category""", LIMITED).fetchall():
+            conn.execute("INSERT OR REPLACE INTO category_rules (category, monthly_limit) VALUES (?, ?)",
+                         (category, round(average)))
+        conn.executemany("""INSERT INTO category_rules (category, unwanted) VALUES (?, 1)
+                            ON CONFLICT (category) DO UPDATE SET unwanted = 1""", [(c,) for c in UNWANTED])
+    db.close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("out")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--end", type=datetime.date.fromisoformat, default=DEFAULT_END)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(args.out, args.rows, args.years, args.end, args.seed)
+    print(f"wrote {args.rows} expenses to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Sustained write throughput of server.py with many concurrent clients.
+
+    python benchmarks/load_test.py [--clients 1 10 50] [--seconds 10] [--reads 0.2]
+                                   [--max-batch 256 1] [--url http://127.0.0.1:8765]
+
+Each client holds one keep-alive connection and sends requests back to back:
+POST /expenses, or with probability --reads a one-page GET /expenses.
+Without --url, a server is started on a fresh database for every
+(--max-batch, --clients) combination.  --max-batch 1 commits every write
+on its own, for comparison with group commit.  Reported per run: inserts per
+second, reads per second, write latency (median and 99th percentile), and
+the average writes per commit taken from /health.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from records import CATEGORIES  # noqa: E402
+
+
+async def _request(reader, writer, method, path, body=None):
+    payload = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: load\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    data = await reader.readexactly(length)
+    if status >= 400:
+        raise RuntimeError(f"{method} {path}: {status} {data.decode()}")
+    return json.loads(data)
+
+
+async def _client(host, port, deadline, read_ratio, stats, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            if rng.random() < read_ratio:
+                await _request(reader, writer, "GET", "/expenses?limit=50")
+                stats["reads"] += 1
+            else:
+                await _request(reader, writer, "POST", "/expenses", {
+                    "amount": round(rng.uniform(10, 2000), 2), "category": rng.choice(CATEGORIES),
+                    "description": f"load test {seed}", "date": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"})
+                stats["latencies"].append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def _health(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return await _request(reader, writer, "GET", "/health")
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, clients, seconds, read_ratio):
+    before = await _health(host, port)
+    stats = {"reads": 0, "latencies": []}
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, start + seconds, read_ratio, stats, i) for i in range(clients)))
+    wall = time.perf_counter() - start
+    after = await _health(host, port)
+    latencies = sorted(stats["latencies"])
+    commits = after["commits"] - before["commits"]
+    return {
+        "clients": clients,
+        "inserts_per_second": round(len(latencies) / wall, 1),
+        "reads_per_second": round(stats["reads"] / wall, 1),
+        "write_p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "write_p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2) if latencies else None,
+        "writes_per_commit": round((after["writes"] - before["writes"]) / commits, 1) if commits else None,
+    }
+
+
+def start_server(path, max_batch):
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "server.py"), "--db", path, "--port", "0",
+                                "--max-batch", str(max_batch)], stderr=subprocess.PIPE, text=True)
+    line = process.stderr.readline()            # "serving ... on http://host:port"
+    if "http://" not in line:
+        process.kill()
+        raise RuntimeError(f"server did not start: {line}{process.stderr.read()}")
+    url = urlsplit(line.split()[-1])
+    return process, url.hostname, url.port
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--reads", type=float, default=0.0, help="fraction of requests that are reads")
+    parser.add_argument("--max-batch", type=int, nargs="+", default=[256, 1])
+    parser.add_argument("--url", help="load an already running server instead")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    if args.url:
+        url = urlsplit(args.url)
+        for clients in args.clients:
+            results.append(asyncio.run(run_load(url.hostname, url.port, clients, args.seconds, args.reads)))
+            print(json.dumps(results[-1]), flush=True)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            for max_batch in args.max_batch:
+                for clients in args.clients:
+                    path = os.path.join(workdir, f"load_{max_batch}_{clients}.db")
+                    process, host, port = start_server(path, max_batch)
+                    try:
+                        result = asyncio.run(run_load(host, port, clients, args.seconds, args.reads))
+                    finally:
+                        process.terminate()
+                        process.wait()
+                    result["max_batch"] = max_batch
+                    results.append(result)
+                    print(json.dumps(result), flush=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import collections
+import json
+import math
+import os
+import re
+import sys
+import threading
+
+import archive
+import db
+
+# ---------------- Auto-Categorizer ----------------
+# Suggests a category for a new expense from the ones already entered.  An
+# in-memory index counts, per category, the features of every description
+# seen: its words, word pairs, word prefixes (so "gro" already points at
+# the grocer while it is being typed) and the amount's order of magnitude.
+# suggest_category() scores the categories naive-Bayes style over the
+# features of the text so far.  A description seen before word for word
+# goes straight to the categories it was filed under.
+#
+# The index only ever grows: learn_new() adds the expenses with an id above
+# its watermark, so every add costs one small indexed read, not a
+# retraining.  Deleted expenses are not unlearned; one row hardly moves the
+# counts, and refresh(rebuild=True) starts over.
+#
+# The index is saved as JSON next to the database (<db stem>.categorizer.json)
+# every SAVE_EVERY learned rows and on close.  At startup it is loaded and
+# caught up from its watermark instead of being rebuilt.
+
+FORMAT = 1
+PREFIX_MIN, PREFIX_MAX = 3, 8
+SMOOTHING = 0.5
+AMOUNT_WEIGHT = 0.25        # the amount only tips the balance between likely categories
+AMOUNT_BUCKETS = 32
+MIN_CONFIDENCE = 0.4        # below this, suggest nothing
+SAVE_EVERY = 500
+
+WORD = re.compile(r"[^\W_]+")
+
+_lock = threading.Lock()            # guards the index contents
+_refresh_lock = threading.Lock()    # one load / catch-up at a time
+_current = None                     # Index for db.DB_PATH
+
+
+def _words(description):
+    return WORD.findall((description or "").lower())
+
+
+def _amount_feature(amount):
+    return f"a:{round(math.log2(amount))}" if amount and amount > 0 else None
+
+
+def features(description, amount=None):
+    words = _words(description)
+    found = [f"w:{w}" for w in words] + [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for w in words:
+        found += [f"p:{w[:n]}" for n in range(PREFIX_MIN, min(len(w), PREFIX_MAX) + 1)]
+    if _amount_feature(amount):
+        found.append(_amount_feature(amount))
+    return found
+
+
+def _query_features(description):
+    # Typed text may end in half a word, so only each word's longest indexed
+    # prefix is looked up, not every shorter one (which would count twice).
+    words = _words(description)
+    found = [f"w:{w}" for w in words] + [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    found += [f"p:{w[:PREFIX_MAX]}" for w in words if len(w) >= PREFIX_MIN]
+    return found
+
+
+class Index:
+    """Per-category feature counts, the exact-description table and the id watermark."""
+
+    def __init__(self, path):
+        self.path = path            # the database this index describes
+        self.watermark = 0
+        self.docs = {}              # category -> expenses learned
+        self.totals = {}            # category -> feature occurrences
+        self.features = {}          # feature -> {category: count}
+        self.exact = {}             # normalised description -> {category: count}
+        self.unsaved = 0
+
+    def learn(self, description, category, amount=None, times=1):
+        self.docs[category] = self.docs.get(category, 0) + times
+        for feature in features(description, amount):
+            counts = self.features.setdefault(feature, {})
+            counts[category] = counts.get(category, 0) + times
+            self.totals[category] = self.totals.get(category, 0) + times
+        key = " ".join(_words(description))
+        if key:
+            counts = self.exact.setdefault(key, {})
+            counts[category] = counts.get(category, 0) + times
+        self.unsaved += times
+
+    def rank(self, description, amount=None):
+        """[(category, probability)] best first; empty when nothing in the text is known."""
+        known = self.exact.get(" ".join(_words(description)))
+        if known:
+            total = sum(known.values())
+            return sorted(((c, n / total) for c, n in known.items()), key=lambda item: -item[1])
+        present = [self.features[f] for f in _query_features(description) if f in self.features]
+        if not present:
+            return []       # the amount alone says too little
+        by_amount = self.features.get(_amount_feature(amount), {})
+        vocabulary = len(self.features)
+        all_docs = sum(self.docs.values())
+        scores = {}
+        for category, docs in self.docs.items():
+            denominator = math.log(self.totals.get(category, 0) + SMOOTHING * vocabulary)
+            score = math.log(docs / all_docs)
+            for counts in present:
+                score += math.log(counts.get(category, 0) + SMOOTHING) - denominator
+            if by_amount:
+                score += AMOUNT_WEIGHT * math.log((by_amount.get(category, 0) + SMOOTHING)
+                                                  / (docs + SMOOTHING * AMOUNT_BUCKETS))
+            scores[category] = score
+        best = max(scores.values())
+        weights = {c: math.exp(s - best) for c, s in scores.items()}
+        total = sum(weights.values())
+        return sorted(((c, w / total) for c, w in weights.items()), key=lambda item: -item[1])
+
+    def to_json(self):
+        return {"format": FORMAT, "watermark": self.watermark, "docs": self.docs, "totals": self.totals,
+                "features": self.features, "exact": self.exact}
+
+    @classmethod
+    def from_json(cls, path, data):
+        index = cls(path)
+        index.watermark = data["watermark"]
+        index.docs, index.totals = data["docs"], data["totals"]
+        index.features, index.exact = data["features"], data["exact"]
+        return index
+
+
+def index_file():
+    if db.DB_PATH == ":memory:":
+        return None
+    stem, _ = os.path.splitext(os.path.abspath(db.DB_PATH))
+    return stem + ".categorizer.json"
+
+
+def _load(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("format") != FORMAT:
+        return None
+    return Index.from_json(db.DB_PATH, data)
+
+
+_SELECT = """SELECT r.id, r.description, c.name, r.amount_paise
+             FROM {}.expense_rows r JOIN main.categories c ON c.id = r.category_id"""
+
+
+def _learn_rows(index, rows):
+    for expense_id, description, category, paise in rows:
+        index.learn(description, category, paise / 100)
+        index.watermark = max(index.watermark, expense_id)
+
+
+def _build(conn):
+    # Every expense, hot and archived, into a new index.  Repeats are the
+    # norm, so rows are first counted per (description, category, amount
+    # bucket) and each distinct one is learned once with its count; 2 ** bucket
+    # stands in for the amounts, as it falls in the same bucket.
+    index = Index(db.DB_PATH)
+    seen = collections.Counter()
+
+    def count(rows):
+        for expense_id, description, category, paise in rows:
+            bucket = round(math.log2(paise / 100)) if paise > 0 else None
+            seen[description, category, bucket] += 1
+            index.watermark = max(index.watermark, expense_id)
+
+    for _, _, years in archive.segments(conn):
+        archive.attach(conn, years)
+        for name in [f"archive_{y}" for y in years]:
+            count(conn.execute(_SELECT.format(name)))
+    archive.attach(conn, [])
+    count(conn.execute(_SELECT.format("main")))
+    for (description, category, bucket), times in seen.items():
+        index.learn(description, category, None if bucket is None else 2.0 ** bucket, times)
+    return index
+
+
+def save():
+    """Write the index to disk if it has learned anything since it was last saved."""
+    with _lock:
+        index = _current
+        if index is None or not index.unsaved or index.path != db.DB_PATH:
+            return
+        data = json.dumps(index.to_json())
+        index.unsaved = 0
+    path = index_file()
+    if path:
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+def refresh(conn=None, rebuild=False):
+    """Load the index (from its file, or by reading every expense), catch it up and return it."""
+    global _current
+    conn = conn or db.get_conn()
+    with _refresh_lock:
+        index = _current if _current is not None and _current.path == db.DB_PATH else None
+        if index is None and not rebuild:
+            path = index_file()
+            index = _load(path) if path else None
+        latest = conn.execute("SELECT COALESCE(MAX(id), 0) FROM expense_rows").fetchone()[0]
+        if rebuild or index is None or index.watermark > latest:     # no file, or another database's
+            index = _build(conn)
+        else:
+            new = conn.execute(_SELECT.format("main") + " WHERE r.id > ? ORDER BY r.id", (index.watermark,)).fetchall()
+            with _lock:
+                _learn_rows(index, new)
+        with _lock:
+            _current = index
+    if index.unsaved >= SAVE_EVERY:
+        save()
+    return index
+
+
+def learn_new(conn=None):
+    """Catch a loaded index up with expenses added since (after every add); no-op before the first refresh()."""
+    if _current is not None and _current.path == db.DB_PATH:
+        refresh(conn)
+
+
+def loaded():
+    return _current is not None and _current.path == db.DB_PATH
+
+
+def rank(description, amount=None):
+    index = _current if loaded() else refresh()
+    with _lock:
+        return index.rank(description, amount)
+
+
+def suggest_category(description, amount=None):
+    """The most likely category for this description (and amount), or None if there is too little to go on."""
+    ranked = rank(description, amount)
+    if ranked and ranked[0][1] >= MIN_CONFIDENCE:
+        return ranked[0][0]
+    return None
+
+
+if __name__ == "__main__":
+    # python categorizer.py [--db expenses.db] [--rebuild] [DESCRIPTION [AMOUNT]]
+    args = sys.argv[1:]
+    if "--db" in args:
+        i = args.index("--db")
+        db.set_db_path(args[i + 1])
+        del args[i:i + 2]
+    rebuild = "--rebuild" in args
+    if rebuild:
+        args.remove("--rebuild")
+    index = refresh(rebuild=rebuild)
+    save()
+    print(f"{sum(index.docs.values())} expenses, {len(index.features)} features, up to id {index.watermark}")
+    if args:
+        amount = float(args[1]) if len(args) > 1 else None
+        for category, p in rank(args[0], amount)[:5]:
+            print(f"{p:6.1%}  {category}")
@@ -0,0 +1,173 @@
+import argparse
+import datetime
+import os
+import time
+
+import archive
+import db
+import schema
+from exporters import HEADERS, export_to_csv, export_to_excel
+from queries import iter_expenses
+
+# ---------------- Change Exports ----------------
+# Incremental exports for downstream spreadsheets.  Triggers keep one row
+# per changed expense in expense_changes: a global sequence number, when it
+# last changed and whether it was deleted (a tombstone).  Each export
+# target (an output file) remembers the highest sequence number it has
+# received in export_watermarks, so the next export reads only the changes
+# past it through the seq index -- the work follows the day's changes, not
+# the size of the history.
+#
+# Every row written carries a Change column: "upsert" with the expense's
+# current values, or "delete" with only its ID.  The first export to a
+# target (or full=True) writes every current expense as an upsert.
+#
+# A CSV target accumulates: increments are appended to the same file.  An
+# .xlsx is a zip of XML parts that can only be appended to by loading and
+# saving the whole workbook again, so an XLSX target keeps the full export
+# and each increment goes to a workbook of its own beside it, named after
+# the last sequence number it holds (report.0000000150.xlsx) so the files
+# sort in the order they are to be applied.
+#
+# write_changes() only reads the database and can run on any reader;
+# record_watermark() is the one write, so an export holds the writer for a
+# single small transaction.  The watermark is read before the rows, so a
+# change made while an export runs is sent again next time; consumers apply
+# rows in order, keyed by ID.
+
+CHANGE_HEADERS = HEADERS + ["Change", "Updated At"]
+UPSERT, DELETE = "upsert", "delete"
+LOOKUP_CHUNK = 500      # ids per IN (...) lookup, under SQLite's variable limit
+
+
+def _target(path):
+    return os.path.abspath(path)
+
+
+def increment_path(path, upto):
+    """The workbook an XLSX target's increment up to `upto` is written to."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{upto:010d}{ext}"
+
+
+def watermark(path, conn=None):
+    """The change sequence number last exported to `path`, or None if it has never been exported to."""
+    conn = conn or db.get_conn()
+    row = conn.execute("SELECT seq FROM export_watermarks WHERE target = ?", (_target(path),)).fetchone()
+    return row[0] if row else None
+
+
+def latest_seq(conn=None):
+    """The sequence number of the latest change to any expense (0 before the first)."""
+    conn = conn or db.get_conn()
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM expense_changes").fetchone()[0]
+
+
+def _lookup(conn, source, ids):
+    rows = {}
+    for i in range(0, len(ids), LOOKUP_CHUNK):
+        chunk = ids[i:i + LOOKUP_CHUNK]
+        rows.update((row[0], row) for row in conn.execute(
+            f"SELECT id, amount, category, description, date FROM {source} "
+            f"WHERE id IN ({', '.join('?' * len(chunk))})", chunk))
+    return rows
+
+
+def _current_rows(conn, ids):
+    # Changed rows are nearly always in the hot file; only ids it no longer
+    # holds (archived since they changed) are looked for in the archives.
+    rows = _lookup(conn, "expenses", ids)
+    missing = [i for i in ids if i not in rows]
+    if missing and archive.archived_years(conn):
+        for _, _, years in archive.segments(conn):
+            rows.update(_lookup(conn, archive.attach(conn, years), missing))
+        archive.attach(conn, [])
+    return rows
+
+
+def changed_rows(since, upto, conn=None):
+    """Rows for the changes with since < seq <= upto, in the order they happened."""
+    conn = conn or db.get_conn()
+    changes = conn.execute("""SELECT expense_id, deleted, updated_at FROM expense_changes
+                              WHERE seq > ? AND seq <= ? ORDER BY seq""", (since, upto)).fetchall()
+    current = _current_rows(conn, [expense_id for expense_id, deleted, _ in changes if not deleted])
+    for expense_id, deleted, updated_at in changes:
+        if deleted:
+            yield (expense_id, None, None, None, None, DELETE, updated_at)
+        elif expense_id in current:     # otherwise deleted since upto; its tombstone comes next time
+            yield current[expense_id] + (UPSERT, updated_at)
+
+
+def _all_rows():
+    for row in iter_expenses():
+        yield tuple(row) + (UPSERT, None)
+
+
+def write_changes(path, full=False, track=None):
+    """Write what changed since the last export to `path` (.csv, .csv.gz or .xlsx) without recording it.
+
+    An XLSX increment goes to increment_path(path, upto) instead; the
+    summary's "written" is the file actually written.  track, if given,
+    wraps the row iterator (e.g. worker.Task.track for progress and
+    cancel).  Returns a summary dict for record_watermark().
+    """
+    start = time.perf_counter()
+    conn = db.get_conn()
+    excel = path.lower().endswith(".xlsx")
+    since = None if full else watermark(path, conn)
+    if since is not None and not os.path.exists(path):
+        since = None        # the file is gone: start it again from a full export
+    upto = latest_seq(conn)
+
+    counts = {UPSERT: 0, DELETE: 0}
+
+    def counted(rows):
+        for row in rows:
+            counts[row[5]] += 1
+            yield row
+
+    rows = counted(_all_rows() if since is None else changed_rows(since, upto, conn))
+    if track:
+        rows = track(rows)
+    if excel:
+        written = path if since is None else increment_path(path, upto)
+        if since is None or upto > since:     # no empty workbook when nothing changed
+            export_to_excel(rows, written, headers=CHANGE_HEADERS)
+    else:
+        written = path
+        export_to_csv(rows, path, headers=CHANGE_HEADERS, append=since is not None)
+    return {"path": path, "written": written, "full": since is None, "since": since or 0, "upto": upto,
+            "upserts": counts[UPSERT], "deletes": counts[DELETE], "seconds": time.perf_counter() - start}
+
+
+def record_watermark(summary):
+    """Remember that `summary`'s file now holds every change up to its upto (run on the writer)."""
+    with db.transaction() as conn:
+        conn.execute("""INSERT INTO export_watermarks (target, seq, exported_at) VALUES (?, ?, ?)
+                        ON CONFLICT (target) DO UPDATE SET seq = excluded.seq, exported_at = excluded.exported_at""",
+                     (_target(summary["path"]), summary["upto"], datetime.datetime.now().isoformat(timespec="seconds")))
+    return summary
+
+
+def export_changes(path, full=False, track=None):
+    """write_changes() and record_watermark() in one call; returns the summary dict."""
+    return record_watermark(write_changes(path, full, track))
+
+
+def describe(summary):
+    kind = "Full export" if summary["full"] else f"Changes {summary['since']}-{summary['upto']}"
+    return (f"{kind}: {summary['upserts']} added or changed, {summary['deletes']} deleted "
+            f"in {summary['seconds']:.1f}s -> {summary['written']}")
+
+
+if __name__ == "__main__":
+    # python changes.py OUT.csv|OUT.csv.gz|OUT.xlsx [--db expenses.db] [--full]
+    parser = argparse.ArgumentParser()
+    parser.add_argument("out")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--full", action="store_true", help="export every expense, not just the changes")
+    args = parser.parse_args()
+    db.set_db_path(args.db)
+    schema.migrate(db.get_conn())
+    archive.upgrade_archives()
+    print(describe(export_changes(args.out, full=args.full)))
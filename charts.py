@@ -0,0 +1,259 @@
+import datetime
+import math
+import tkinter as tk
+from tkinter import filedialog, messagebox
+
+from matplotlib.figure import Figure
+
+import pivot
+import reports
+
+# ---------------- Embedded Charts ----------------
+# One Reports window with a single matplotlib Figure drawn by
+# FigureCanvasTkAgg inside Tk's own event loop (no pyplot, no plt.show()).
+# The figure and its artists are kept between redraws: the trend line gets
+# new data and the pie wedges new angles, and the canvas is redrawn once
+# when Tk is idle.  The pie and trend come from the cached aggregates in
+# reports.py; the heatmap and year-over-year views are pivots over the
+# columnar snapshot (pivot.py).  Every view's data is read on the worker and
+# drawn back on the Tk thread, and any view can be exported to Excel as the
+# pivot behind it.
+
+TREND_WINDOWS = ("6", "12", "24", "60", "All")
+DEFAULT_TREND_WINDOW = "12"
+MAX_XTICKS = 12
+PIE_LABEL_DISTANCE, PIE_PCT_DISTANCE = 1.1, 0.6     # matplotlib's pie() defaults
+
+
+class ChartView:
+    """Draws the pie or trend chart on a Figure, reusing artists when it can."""
+
+    def __init__(self, figure):
+        self.figure = figure
+        self.ax = figure.add_subplot()
+        self.mode = None
+        self._pie = None        # (labels, wedges, label texts, percentage texts)
+        self._line = None
+        self._colorbar = None
+
+    def _switch(self, mode):
+        if self.mode != mode:
+            self.mode = mode
+            self._pie = self._line = None
+
+    def _new_plot(self):
+        # A fresh Axes: clear() would keep pie()'s equal aspect and hidden frame.
+        if self._colorbar is not None:
+            self._colorbar.remove()
+            self._colorbar = None
+        self.ax.remove()
+        self.ax = self.figure.add_subplot()
+
+    def draw_pie(self, labels, values, title):
+        self._switch("pie")
+        labels, total = list(labels), sum(values)
+        if self._pie is None or self._pie[0] != labels:
+            self._new_plot()
+            wedges, texts, pcts = self.ax.pie(values, labels=labels, autopct="%1.1f%%")
+            self._pie = (labels, wedges, texts, pcts)
+        else:
+            # Same categories: move the existing wedges and texts to the new angles.
+            theta = 0.0
+            for value, wedge, text, pct in zip(values, *self._pie[1:]):
+                end = theta + 360.0 * value / total
+                wedge.set_theta1(theta)
+                wedge.set_theta2(end)
+                mid = math.radians((theta + end) / 2)
+                x, y = math.cos(mid), math.sin(mid)
+                text.set_position((PIE_LABEL_DISTANCE * x, PIE_LABEL_DISTANCE * y))
+                text.set_horizontalalignment("left" if x > 0 else "right")
+                pct.set_position((PIE_PCT_DISTANCE * x, PIE_PCT_DISTANCE * y))
+                pct.set_text(f"{100.0 * value / total:.1f}%")
+                theta = end
+        self.ax.set_title(title)
+
+    def clear(self, message):
+        self._pie = self._line = None
+        self._new_plot()
+        self.ax.set_axis_off()
+        self.ax.text(0.5, 0.5, message, ha="center", va="center", transform=self.ax.transAxes)
+
+    def draw_trend(self, months, totals, title):
+        self._switch("trend")
+        x = list(range(len(months)))
+        if self._line is None:
+            self._new_plot()
+            self._line, = self.ax.plot(x, totals, marker="o")
+            self.ax.set_xlabel("Month")
+            self.ax.set_ylabel("Total Expenses")
+        else:
+            self._line.set_data(x, totals)
+        step = max(1, math.ceil(len(months) / MAX_XTICKS))
+        self.ax.set_xticks(x[::step])
+        self.ax.set_xticklabels(months[::step], rotation=45 if len(months) > 6 else 0, ha="right")
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.ax.set_title(title)
+
+    def draw_heatmap(self, pivot, title):
+        """A two-dimensional pivot as a colour grid (rows down, columns across)."""
+        self._switch("heatmap")
+        self._new_plot()
+        image = self.ax.imshow(pivot.values, aspect="auto", cmap="YlOrRd")
+        self._colorbar = self.figure.colorbar(image, ax=self.ax)
+        self.ax.set_yticks(range(len(pivot.labels[0])))
+        self.ax.set_yticklabels(pivot.labels[0])
+        self.ax.set_xticks(range(len(pivot.labels[1])))
+        self.ax.set_xticklabels(pivot.labels[1])
+        self.ax.set_title(title)
+
+    def draw_series(self, pivot, title):
+        """A two-dimensional pivot as one line per column over the row labels."""
+        self._switch("series")
+        self._new_plot()
+        x = list(range(len(pivot.labels[0])))
+        for column, label in enumerate(pivot.labels[1]):
+            self.ax.plot(x, pivot.values[:, column], marker="o", label=str(label))
+        self.ax.set_xticks(x)
+        self.ax.set_xticklabels(pivot.labels[0])
+        self.ax.set_ylabel("Total Expenses")
+        self.ax.legend(fontsize="small")
+        self.ax.set_title(title)
+
+
+# Views drawn from pivots: mode -> (pivot function, ChartView method, title).
+PIVOT_VIEWS = {
+    "heatmap": ("weekday_heatmap", "draw_heatmap", "Average Expense by Weekday and Month"),
+    "yoy": ("year_over_year", "draw_series", "Year over Year"),
+}
+
+
+class ChartWindow:
+    """The Reports window; created once, hidden on close and reused."""
+
+    def __init__(self, root, worker):
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.win = tk.Toplevel(root)
+        self.win.withdraw()          # shown by show() once there is something to draw
+        self.win.title("Reports")
+        self.win.configure(bg="#f0f2f5")
+        self.win.protocol("WM_DELETE_WINDOW", self.win.withdraw)
+        self.worker = worker
+        self.mode = None
+        self._drawing = 0       # bumped per draw, so only the latest result is drawn
+        controls = tk.Frame(self.win, bg="#f0f2f5")
+        controls.pack(fill="x", padx=10, pady=5)
+        tk.Button(controls, text="Category Pie", font=("Consolas",11,"bold"), bg="#17a2b8", fg="white",
+                  command=lambda: self.show("pie")).pack(side="left", padx=5)
+        tk.Button(controls, text="Monthly Trend", font=("Consolas",11,"bold"), bg="#17a2b8", fg="white",
+                  command=lambda: self.show("trend")).pack(side="left", padx=5)
+        tk.Label(controls, text="Months:", font=("Consolas",11), bg="#f0f2f5").pack(side="left", padx=5)
+        self.window_var = tk.StringVar(value=DEFAULT_TREND_WINDOW)
+        tk.OptionMenu(controls, self.window_var, *TREND_WINDOWS,
+                      command=lambda _: self.show("trend")).pack(side="left")
+        tk.Button(controls, text="Weekday Heatmap", font=("Consolas",11,"bold"), bg="#17a2b8", fg="white",
+                  command=lambda: self.show("heatmap")).pack(side="left", padx=5)
+        tk.Button(controls, text="Year over Year", font=("Consolas",11,"bold"), bg="#17a2b8", fg="white",
+                  command=lambda: self.show("yoy")).pack(side="left", padx=5)
+        tk.Button(controls, text="Export Pivot", font=("Consolas",11,"bold"), bg="#ffc107", fg="white",
+                  command=self.export_pivot).pack(side="left", padx=5)
+        figure = Figure(figsize=(7, 5))
+        figure.subplots_adjust(bottom=0.18)    # fixed margins: tight_layout would re-measure on every draw
+        self.view = ChartView(figure)
+        self.canvas = FigureCanvasTkAgg(self.view.figure, master=self.win)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+
+    @property
+    def visible(self):
+        return self.win.winfo_exists() and self.win.state() != "withdrawn"
+
+    def show(self, mode, on_empty=None):
+        """Draw the pie (this month by category), the trend or a pivot view once its data is read.
+
+        The window opens when there is something to draw; otherwise on_empty() is called.
+        """
+        def drawn(found):
+            if found:
+                self.win.deiconify()
+                self.win.lift()
+            elif on_empty:
+                on_empty()
+
+        self._draw(mode, drawn)
+
+    def refresh(self):
+        """Redraw the current chart after a write, if the window is open."""
+        if self.mode and self.visible:
+            self._draw(self.mode, lambda found: found or self._clear())
+
+    def _clear(self):
+        self.view.clear("No expense data.")
+        self.canvas.draw_idle()
+
+    def _draw(self, mode, then):
+        self.mode = mode
+        self._drawing += 1
+        drawing = self._drawing
+        if mode in PIVOT_VIEWS:
+            fn, args = getattr(pivot, PIVOT_VIEWS[mode][0]), ()
+        elif mode == "pie":
+            fn, args = reports.category_totals, (datetime.date.today().strftime("%Y-%m"),)
+        else:
+            window = self.window_var.get()
+            fn, args = reports.monthly_totals, (None if window == "All" else int(window),)
+
+        def drawn(data):
+            if drawing != self._drawing:
+                return          # the user moved on while it was reading
+            found = self._plot(mode, data)
+            if found:
+                self.canvas.draw_idle()
+            then(found)
+
+        self.worker.submit(fn, *args, label="Chart", on_done=drawn)
+
+    def _plot(self, mode, data):
+        # False if there is nothing to draw.
+        if mode in PIVOT_VIEWS:
+            _, method, title = PIVOT_VIEWS[mode]
+            if data.values.size and data.values.any():
+                getattr(self.view, method)(data, title)
+            else:
+                self.view.clear("No expense data.")
+            return True
+        if not data:
+            return False
+        if mode == "pie":
+            labels, values = zip(*data)
+            self.view.draw_pie(labels, values, "Expenses by Category (This Month)")
+        else:
+            months, totals = zip(*data)
+            self.view.draw_trend(list(months), list(totals), "Monthly Expense Trend")
+        return True
+
+    @staticmethod
+    def _current_pivot(mode, window):
+        # The pivot behind the chart on screen (runs on the worker; window is
+        # the trend's month count, read on the Tk thread).
+        if mode in PIVOT_VIEWS:
+            return getattr(pivot, PIVOT_VIEWS[mode][0])()
+        if mode == "pie":
+            today = datetime.date.today()
+            return pivot.group_by(("category",), start=today.replace(day=1).isoformat(), end=today.isoformat())
+        months = reports.monthly_totals(None if window == "All" else int(window))
+        return pivot.category_by_month(start=months[0][0] + "-01" if months else None)
+
+    def export_pivot(self):
+        if not self.mode:
+            messagebox.showinfo("No Chart", "Show a chart first.", parent=self.win)
+            return
+        filename = filedialog.asksaveasfilename(parent=self.win, defaultextension=".xlsx",
+                                                filetypes=[("Excel Files", "*.xlsx")])
+        if not filename:
+            return
+        from exporters import export_pivot_to_excel
+        mode, window = self.mode, self.window_var.get()
+        self.worker.submit(lambda: export_pivot_to_excel(self._current_pivot(mode, window), filename),
+                           label="Export Pivot",
+                           on_done=lambda _: messagebox.showinfo("Export Pivot", "Exported to Excel.", parent=self.win),
+                           on_error=lambda e: messagebox.showerror("Export failed", str(e), parent=self.win))
@@ -0,0 +1,146 @@
+import http.client
+import json
+import os
+import threading
+from urllib.parse import urlencode, urlsplit
+
+import categorizer
+import reports
+
+# ---------------- API Client ----------------
+# RemoteBackend talks to server.py and offers the same functions as the
+# operations module, plus fetch_expenses, so ExpenseTrackerApp can use
+# either one as its backend.  Every thread keeps its own keep-alive
+# connection.
+#
+# Every write goes through the server, imports and archiving included, and
+# so do the figures that depend on settings.  Charts and exports still read
+# the database file directly (opened read-only), which WAL allows while the
+# server writes.  Their cached aggregates only see this process's own
+# writes, so revalidate() compares the server's change sequence number with
+# the last one seen and drops the caches when another client has written.
+
+
+class ServerError(Exception):
+    """The server rejected a request (the message is its error)."""
+
+
+class RemoteBackend:
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+        self._seq = None        # the server's change sequence number when last checked
+
+    def _request(self, method, path, params=None, body=None, wait=False):
+        # wait=True: a long write (an import, archiving) on its own connection without a timeout.
+        if params:
+            path += "?" + urlencode({k: v for k, v in params.items() if v is not None})
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        for attempt in range(2):
+            conn = None if wait else getattr(self._local, "conn", None)
+            if conn is None:
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=None if wait else self.timeout)
+                if not wait:
+                    self._local.conn = conn
+            try:
+                conn.request(method, path, payload, headers)
+                response = conn.getresponse()
+                data = json.loads(response.read() or b"{}")
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # The server closed an idle keep-alive connection: reconnect once.
+                conn.close()
+                if not wait:
+                    self._local.conn = None
+                if attempt or wait:
+                    raise
+            finally:
+                if wait:
+                    conn.close()
+        if response.status >= 400:
+            raise ServerError(data.get("error", f"HTTP {response.status}"))
+        return data
+
+    # ---- Expenses ----
+    def fetch_expenses(self, filters=None, limit=None, after=None, before=None, offset=None):
+        params = dict(filters or {})
+        params.update(limit=limit, offset=offset,
+                      after=after and f"{after[0]},{after[1]}", before=before and f"{before[0]},{before[1]}")
+        return [tuple(row) for row in self._request("GET", "/expenses", params)["rows"]]
+
+    def count_expenses(self, filters=None):
+        return self._request("GET", "/expenses/count", filters)["count"]
+
+    def add_expense(self, amount, category, description, date):
+        expense_id = self._request("POST", "/expenses", body={"amount": amount, "category": category,
+                                                              "description": description, "date": date})["id"]
+        reports.invalidate(date[:7])
+        categorizer.learn_new()         # from the file, like the charts
+        return expense_id
+
+    def delete_expense(self, expense_id):
+        self.delete_expenses([expense_id])
+
+    def delete_expenses(self, expense_ids):
+        self._request("POST", "/expenses/delete", body={"ids": list(expense_ids)})
+        reports.invalidate()
+
+    def revalidate(self):
+        """Drop cached aggregates if any client changed expenses since the last check; True if so."""
+        seq = self._request("GET", "/changes")["seq"]
+        if seq == self._seq:
+            return False
+        self._seq = seq
+        reports.invalidate()
+        categorizer.learn_new()
+        return True
+
+    # ---- Bulk Writes ----
+    def import_statement(self, path, progress=None):
+        # The server reads the file; progress is not reported over HTTP.
+        summary = self._request("POST", "/import", body={"path": os.path.abspath(path)}, wait=True)
+        self.revalidate()
+        return summary
+
+    def archive_closed_years(self):
+        moved = self._request("POST", "/archive", wait=True)["moved"]
+        reports.invalidate()
+        return {int(year): rows for year, rows in moved.items()}
+
+    def record_export(self, summary):
+        self._request("PUT", "/export-watermark", body={"path": os.path.abspath(summary["path"]),
+                                                         "upto": summary["upto"]})
+        return summary
+
+    def get_total_expenses_for_month(self, year, month):
+        return self._request("GET", "/budget", {"year": year, "month": month})["spent"]
+
+    # ---- Budget & Settings ----
+    def get_budget(self):
+        return self._request("GET", "/budget")["budget"]
+
+    def set_budget(self, amount):
+        self._request("PUT", "/budget", body={"amount": amount})
+
+    def set_category_limit(self, category, amount):
+        self._request("PUT", "/category-limit", body={"category": category, "amount": amount})
+
+    def mark_category_unwanted(self, category, unwanted=True):
+        self._request("PUT", "/unwanted", body={"category": category, "unwanted": unwanted})
+
+    def set_block_mode(self, enabled):
+        self._request("PUT", "/block-mode", body={"enabled": enabled})
+
+    def get_block_mode(self):
+        return self._request("GET", "/budget")["block_mode"]
+
+    # ---- Helpers & Projections ----
+    def get_pre_add_figures(self, year, month, category):
+        return self._request("GET", "/pre-add", {"year": year, "month": month, "category": category})
+
+    def recommend_actions_for_month(self, year, month):
+        return self._request("GET", "/suggestions", {"year": year, "month": month})["suggestions"]
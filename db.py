@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+import instrument
+
+# ---------------- Connection Manager ----------------
+# Every thread gets one long-lived connection to the database, opened on
+# first use and reused for every query after that.  The GUI runs on a single
+# thread, so in practice this is one connection for the whole session; worker
+# threads get their own so they never share a connection object.
+
+DB_PATH = "expenses.db"
+READ_ONLY = False       # report worker processes open the file with mode=ro
+
+# Statements are cached per connection by the sqlite3 module (keyed by SQL
+# text), so every query in the app is prepared once and then re-bound.
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT = 5.0
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",      # ~16 MB page cache
+    "PRAGMA mmap_size=268435456",    # 256 MB memory-mapped reads
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
+
+_local = threading.local()
+_lock = threading.Lock()
+_connections = []
+_generation = 0
+
+
+def set_db_path(path, read_only=False):
+    """Point the app at another database file, closing any open connections.
+
+    read_only=True opens every later connection read-only, so any write
+    fails with sqlite3.OperationalError instead of touching the file.
+    """
+    global DB_PATH, READ_ONLY
+    close_all()
+    DB_PATH = path
+    READ_ONLY = read_only
+
+
+def _connect(path):
+    if READ_ONLY:
+        path = f"file:{pathname2url(os.path.abspath(path))}?mode=ro"
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT,
+                           cached_statements=STATEMENT_CACHE_SIZE,
+                           check_same_thread=False,
+                           factory=instrument.connection_factory(),
+                           uri=READ_ONLY)
+    for pragma in PRAGMAS:
+        if not (READ_ONLY and "journal_mode" in pragma):    # the writer has already set WAL
+            conn.execute(pragma)
+    return conn
+
+
+def get_conn():
+    """Return this thread's shared connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.generation == _generation:
+        return conn
+    conn = _connect(DB_PATH)
+    _local.conn = conn
+    _local.generation = _generation
+    with _lock:
+        _connections.append(conn)
+    return conn
+
+
+@contextmanager
+def transaction():
+    """Run a block of writes in one transaction on the shared connection."""
+    conn = get_conn()
+    with conn:
+        # Begin explicitly so schema changes inside the block are covered too.
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        yield conn
+
+
+def close_all():
+    """Close every connection opened by any thread (used on exit and path changes)."""
+    global _generation
+    with _lock:
+        conns = list(_connections)
+        _connections.clear()
+        _generation += 1
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.ProgrammingError:
+            pass
+    _local.__dict__.clear()
@@ -1,286 +1,74 @@
-import sqlite3
+import time
+_STARTUP_T0 = time.perf_counter()
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import datetime
-import calendar
-import matplotlib.pyplot as plt
-from openpyxl import Workbook
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+import json
+import multiprocessing
+import os
+import sys
+import db
+import schema
+import settings_store
+import archive
+import categorizer
+import changes
+import instrument
+import operations
+from queries import fetch_expenses, count_expenses, iter_expenses
+from worker import Worker, Cancelled
+from exporters import export_to_csv, export_to_excel, export_to_pdf
+from table_view import VirtualExpenseTable
+from records import CATEGORIES, parse_amount, parse_date
+# matplotlib (charts), numpy (forecast) and openpyxl (exporters) are imported on first
+# use inside the functions that need them, so they cost nothing at startup.
 
 # ---------------- Database Setup ----------------
-def init_db():
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    c.execute("""CREATE TABLE IF NOT EXISTS expenses (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    amount REAL NOT NULL,
-                    category TEXT NOT NULL,
-                    description TEXT,
-                    date TEXT NOT NULL
-                )""")
-    c.execute("""CREATE TABLE IF NOT EXISTS settings (
-                    key TEXT PRIMARY KEY,
-                    value TEXT
-                )""")
-    conn.commit()
-    conn.close()
-
-# ---------------- Expense Operations ----------------
-def add_expense(amount, category, description, date):
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    c.execute("INSERT INTO expenses (amount, category, description, date) VALUES (?, ?, ?, ?)",
-              (amount, category, description, date))
-    conn.commit()
-    conn.close()
-
-def delete_expense(expense_id):
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    c.execute("DELETE FROM expenses WHERE id=?", (expense_id,))
-    conn.commit()
-    conn.close()
-
-def fetch_expenses(filters=None):
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    query = "SELECT * FROM expenses WHERE 1=1"
-    params = []
-
-    if filters:
-        if filters.get("from_date"):
-            query += " AND date >= ?"
-            params.append(filters["from_date"])
-        if filters.get("to_date"):
-            query += " AND date <= ?"
-            params.append(filters["to_date"])
-        if filters.get("category") and filters["category"] != "All":
-            query += " AND category = ?"
-            params.append(filters["category"])
-
-    c.execute(query, params)
-    rows = c.fetchall()
-    conn.close()
-    return rows
-
-def get_total_expenses_for_month(year, month):
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    c.execute("SELECT SUM(amount) FROM expenses WHERE strftime('%Y-%m', date) = ?",
-              (f"{year}-{month:02d}",))
-    total = c.fetchone()[0]
-    conn.close()
-    return total if total else 0
-
-# ---------------- Budget & Settings ----------------
-def get_budget():
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    c.execute("SELECT value FROM settings WHERE key='monthly_budget'")
-    row = c.fetchone()
-    conn.close()
-    return float(row[0]) if row else 0
-
-def set_budget(amount):
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('monthly_budget', ?)", (str(amount),))
-    conn.commit()
-    conn.close()
-
-def set_category_limit(category, amount):
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    key = f"limit_{category}"
-    c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, str(amount)))
-    conn.commit()
-    conn.close()
-
-def get_category_limit(category):
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    key = f"limit_{category}"
-    c.execute("SELECT value FROM settings WHERE key=?", (key,))
-    row = c.fetchone()
-    conn.close()
-    return float(row[0]) if row else None
-
-def mark_category_unwanted(category, unwanted=True):
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    key = f"unwanted_{category}"
-    c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, "1" if unwanted else "0"))
-    conn.commit()
-    conn.close()
-
-def is_category_unwanted(category):
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    key = f"unwanted_{category}"
-    c.execute("SELECT value FROM settings WHERE key=?", (key,))
-    row = c.fetchone()
-    conn.close()
-    return row and row[0] == "1"
-
-def set_block_mode(enabled: bool):
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('block_mode', ?)", ( "1" if enabled else "0",))
-    conn.commit()
-    conn.close()
-
-def get_block_mode() -> bool:
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    c.execute("SELECT value FROM settings WHERE key='block_mode'")
-    row = c.fetchone()
-    conn.close()
-    return row and row[0] == "1"
-
-# ---------------- Helpers & Projections ----------------
-def get_month_spent_by_category(year, month, category):
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    c.execute("""SELECT SUM(amount) FROM expenses 
-                 WHERE strftime('%Y-%m', date)=? AND category=?""",
-              (f"{year}-{month:02d}", category))
-    total = c.fetchone()[0]
-    conn.close()
-    return total if total else 0
-
-def projected_month_end_spend(year, month):
-    today = datetime.date.today()
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    c.execute("SELECT SUM(amount) FROM expenses WHERE strftime('%Y-%m', date)=?", (f"{year}-{month:02d}",))
-    spent = c.fetchone()[0] or 0
-    conn.close()
-    days_in_month = calendar.monthrange(year, month)[1]
-    # If projecting a past month or a different month, use full days_in_month
-    if today.year == year and today.month == month:
-        day = today.day
+@instrument.timed
+def init_db(remote=False):
+    if remote:
+        # server.py owns the file and its migrations; this process only reads it.
+        db.set_db_path(db.DB_PATH, read_only=True)
     else:
-        day = days_in_month
-    if day == 0:
-        return spent
-    projected = (spent / day) * days_in_month
-    return projected
-
-def recommend_actions_for_month(year, month):
-    budget = get_budget()
-    spent = get_total_expenses_for_month(year, month)
-    proj = projected_month_end_spend(year, month)
-    suggestions = []
-    if budget > 0:
-        need_to_save = max(0, proj - budget)
-    else:
-        need_to_save = 0
-    if need_to_save > 0:
-        suggestions.append(f"Projected overshoot: ₹{need_to_save:.0f}. Try to cut this month by ₹{need_to_save:.0f}.")
-        # find top categories by spend
-        conn = sqlite3.connect("expenses.db"); c = conn.cursor()
-        c.execute("""SELECT category, SUM(amount) FROM expenses WHERE strftime('%Y-%m', date)=?
-                     GROUP BY category ORDER BY SUM(amount) DESC LIMIT 5""", (f"{year}-{month:02d}",))
-        tops = c.fetchall(); conn.close()
-        for cat, amt in tops:
-            suggestions.append(f"Top: {cat} — spent ₹{amt:.0f}. Consider cutting 20-40% from {cat}.")
-    else:
-        suggestions.append("You're on track — projected spending is within budget. Consider adding to savings.")
-    # include unwanted-category tips
-    # any unwanted category that has spending this month
-    conn = sqlite3.connect("expenses.db"); c = conn.cursor()
-    c.execute("""SELECT key FROM settings WHERE key LIKE 'unwanted_%' AND value='1'""")
-    unwanted_keys = c.fetchall(); conn.close()
-    for (k,) in unwanted_keys:
-        cat = k.replace("unwanted_", "")
-        cat_spent = get_month_spent_by_category(year, month, cat)
-        if cat_spent > 0:
-            suggestions.append(f"Unwanted category {cat} already has ₹{cat_spent:.0f} this month. Avoid further purchases in this category.")
-    return suggestions
-
-# ---------------- Export ----------------
-def export_to_excel(expenses, filename):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Expenses"
-    headers = ["ID", "Amount", "Category", "Description", "Date"]
-    ws.append(headers)
-    for row in expenses:
-        ws.append(row)
-    wb.save(filename)
-
-def export_to_pdf(expenses, filename):
-    c = canvas.Canvas(filename, pagesize=letter)
-    width, height = letter
-    y = height - 50
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(200, y, "Expense Report")
-    y -= 30
-    c.setFont("Helvetica", 10)
-    headers = ["ID", "Amount", "Category", "Description", "Date"]
-    c.drawString(30, y, " | ".join(headers))
-    y -= 20
-    for row in expenses:
-        line = " | ".join([str(x) for x in row])
-        c.drawString(30, y, line[:100])
-        y -= 15
-        if y < 50:
-            c.showPage()
-            y = height - 50
-    c.save()
-
-# ---------------- Reports ----------------
-def show_category_pie():
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    today = datetime.date.today()
-    c.execute("""SELECT category, SUM(amount) FROM expenses
-                 WHERE strftime('%Y-%m', date)=? GROUP BY category""",
-              (today.strftime("%Y-%m"),))
-    data = c.fetchall()
-    conn.close()
-    if not data:
-        messagebox.showinfo("No Data", "No expenses for this month.")
-        return
-    labels, values = zip(*data)
-    plt.figure(figsize=(6, 6))
-    plt.pie(values, labels=labels, autopct="%1.1f%%")
-    plt.title("Expenses by Category (This Month)")
-    plt.show()
-
-def show_monthly_trend():
-    conn = sqlite3.connect("expenses.db")
-    c = conn.cursor()
-    c.execute("""SELECT strftime('%Y-%m', date) as month, SUM(amount) 
-                 FROM expenses GROUP BY month ORDER BY month DESC LIMIT 6""")
-    data = c.fetchall()
-    conn.close()
-    if not data:
-        messagebox.showinfo("No Data", "No expense data available.")
-        return
-    months, totals = zip(*reversed(data))
-    plt.figure()
-    plt.plot(months, totals, marker="o")
-    plt.title("Monthly Expense Trend")
-    plt.xlabel("Month")
-    plt.ylabel("Total Expenses")
-    plt.show()
+        schema.migrate(db.get_conn())
+        archive.upgrade_archives()
+    settings_store.load()
 
 # ---------------- GUI ----------------
-CATEGORIES = ["Food", "Travel", "Shopping", "Bills", "Medical", "Trip", "Dress", "Cosmetics", "JunkFood", "Other"]
+SEARCH_DEBOUNCE_MS = 250
+REVALIDATE_MS = 5000        # how often a remote client checks for other clients' writes
 
 class ExpenseTrackerApp:
-    def __init__(self, root):
+    def __init__(self, root, backend=None):
+        # backend: the operations module (this process writes the file) or
+        # a client.RemoteBackend (writes go through server.py).
+        self.backend = backend or operations
         self.root = root
         self.root.title("Expense Tracker")
         self.root.configure(bg="#f0f2f5")
+        self.charts = None      # Reports window, built on first use
+        self.worker = Worker(root, on_status=self.show_status, on_progress=self.show_progress,
+                             on_error=self.show_error)
         self.create_widgets()
         # ensure DB exists
         self.refresh_budget_bar()
         self.refresh_table()
+        self.worker.submit(self.backend.get_block_mode, label="Loading settings", on_done=self.block_mode_loaded)
+        # Load the category suggester off the Tk thread; until it is ready
+        # the category is simply not pre-selected.
+        self.worker.submit(categorizer.refresh, label="Loading suggestions")
+        if self.backend is not operations:
+            self.root.after(REVALIDATE_MS, self.revalidate)
 
     def create_widgets(self):
+        # -------- Debug Menu (only when EXPENSE_TRACE is set) --------
+        if instrument.ENABLED:
+            menubar = tk.Menu(self.root)
+            debug_menu = tk.Menu(menubar, tearoff=0)
+            debug_menu.add_command(label="Dump Performance Stats", command=self.dump_stats)
+            menubar.add_cascade(label="Debug", menu=debug_menu)
+            self.root.config(menu=menubar)
+
         # -------- Budget Frame --------
         budget_frame = tk.Frame(self.root, bg="#ffffff", bd=2, relief="raised")
         budget_frame.pack(pady=10, padx=10, fill="x")
@@ -303,11 +91,11 @@ class ExpenseTrackerApp:
         suggest_btn = tk.Button(btns_row, text="Get Suggestions", font=("Consolas", 12, "bold"),
                                 command=self.show_suggestions, bg="#20c997", fg="white")
         suggest_btn.pack(side="left", padx=5)
-        # block mode toggle
-        self.block_var = tk.BooleanVar(value=get_block_mode())
-        block_check = tk.Checkbutton(btns_row, text="Block Unwanted (ON/OFF)", var=self.block_var,
-                                     command=self.toggle_block_mode, bg="#ffffff", font=("Consolas",10,"bold"))
-        block_check.pack(side="left", padx=5)
+        # block mode toggle, enabled once the setting is read
+        self.block_var = tk.BooleanVar(value=False)
+        self.block_check = tk.Checkbutton(btns_row, text="Block Unwanted (ON/OFF)", var=self.block_var, state="disabled",
+                                          command=self.toggle_block_mode, bg="#ffffff", font=("Consolas",10,"bold"))
+        self.block_check.pack(side="left", padx=5)
 
         # -------- Add Expense Frame --------
         add_frame = tk.Frame(self.root, bg="#ffffff", bd=2, relief="raised")
@@ -323,6 +111,11 @@ class ExpenseTrackerApp:
         tk.Label(add_frame, text="Description:", font=("Consolas",12), bg="#ffffff").grid(row=2, column=0, padx=5, pady=5)
         self.desc_entry = tk.Entry(add_frame, font=("Consolas",12), width=25)
         self.desc_entry.grid(row=2, column=1, padx=5, pady=5)
+        # Typing a description pre-selects the likely category until the user picks one.
+        self._category_picked = False
+        self._suggesting = False
+        self.category_var.trace_add("write", self.category_changed)
+        self.desc_entry.bind("<KeyRelease>", self.suggest_category)
         tk.Label(add_frame, text="Date (YYYY-MM-DD):", font=("Consolas",12), bg="#ffffff").grid(row=3, column=0, padx=5, pady=5)
         self.date_entry = tk.Entry(add_frame, font=("Consolas",12), width=25)
         self.date_entry.insert(0, datetime.date.today().strftime("%Y-%m-%d"))
@@ -333,13 +126,26 @@ class ExpenseTrackerApp:
         # -------- Expense Table Frame --------
         table_frame = tk.Frame(self.root, bg="#f0f2f5")
         table_frame.pack(padx=10, pady=10, fill="both", expand=True)
-        self.tree = ttk.Treeview(table_frame, columns=("ID","Amount","Category","Description","Date"), show="headings", height=10)
+        search_frame = tk.Frame(table_frame, bg="#f0f2f5")
+        search_frame.pack(fill="x")
+        tk.Label(search_frame, text="Search:", font=("Consolas",12), bg="#f0f2f5").pack(side="left")
+        self.search_var = tk.StringVar()
+        tk.Entry(search_frame, textvariable=self.search_var, font=("Consolas",12), width=40).pack(side="left", padx=5)
+        self._search_after = None
+        self.search_var.trace_add("write", lambda *_: self.schedule_search())
+        tree_frame = tk.Frame(table_frame, bg="#f0f2f5")
+        tree_frame.pack(expand=True, fill="both", pady=5)
+        self.tree = ttk.Treeview(tree_frame, columns=("ID","Amount","Category","Description","Date"), show="headings", height=10)
         for col in ("ID","Amount","Category","Description","Date"):
             self.tree.heading(col, text=col)
         style = ttk.Style()
         style.configure("Treeview", font=("Consolas",12), rowheight=25)
         style.configure("Treeview.Heading", font=("Consolas",12,"bold"))
-        self.tree.pack(expand=True, fill="both", pady=5)
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
+        scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", expand=True, fill="both")
+        # Only a window of rows around the view lives in the Treeview
+        self.table = VirtualExpenseTable(self.tree, self.backend.fetch_expenses, self.worker, scrollbar)
 
         # Buttons below the table
         btn_frame = tk.Frame(table_frame, bg="#f0f2f5")
@@ -347,60 +153,149 @@ class ExpenseTrackerApp:
         tk.Button(btn_frame, text="Delete Selected", font=("Consolas",12,"bold"),
                   command=self.delete_selected, bg="#dc3545", fg="white").pack(side="left", padx=5)
         tk.Button(btn_frame, text="Refresh", font=("Consolas",12,"bold"),
-                  command=lambda: [self.refresh_table(), self.refresh_budget_bar()],
+                  command=lambda: [self.refresh_table(), self.refresh_budget_bar(), self.refresh_charts()],
                   bg="#17a2b8", fg="white").pack(side="left", padx=5)
 
         # -------- Reports & Export Frame --------
         report_frame = tk.Frame(self.root, bg="#f0f2f5")
         report_frame.pack(pady=10)
         tk.Button(report_frame, text="Category Pie", font=("Consolas",12,"bold"),
-                  command=show_category_pie, bg="#17a2b8", fg="white").pack(side="left", padx=5)
+                  command=self.show_category_pie, bg="#17a2b8", fg="white").pack(side="left", padx=5)
         tk.Button(report_frame, text="Monthly Trend", font=("Consolas",12,"bold"),
-                  command=show_monthly_trend, bg="#17a2b8", fg="white").pack(side="left", padx=5)
+                  command=self.show_monthly_trend, bg="#17a2b8", fg="white").pack(side="left", padx=5)
         tk.Button(report_frame, text="Export Excel", font=("Consolas",12,"bold"),
                   command=self.export_excel, bg="#ffc107", fg="white").pack(side="left", padx=5)
         tk.Button(report_frame, text="Export PDF", font=("Consolas",12,"bold"),
                   command=self.export_pdf, bg="#ffc107", fg="white").pack(side="left", padx=5)
+        tk.Button(report_frame, text="Export CSV", font=("Consolas",12,"bold"),
+                  command=self.export_csv, bg="#ffc107", fg="white").pack(side="left", padx=5)
+        tk.Button(report_frame, text="Export Changes", font=("Consolas",12,"bold"),
+                  command=self.export_changes, bg="#ffc107", fg="white").pack(side="left", padx=5)
+        tk.Button(report_frame, text="Import CSV/OFX", font=("Consolas",12,"bold"),
+                  command=self.import_statement, bg="#6c757d", fg="white").pack(side="left", padx=5)
+        tk.Button(report_frame, text="Month-End Reports", font=("Consolas",12,"bold"),
+                  command=self.month_end_reports, bg="#ffc107", fg="white").pack(side="left", padx=5)
+        tk.Button(report_frame, text="Archive Old Years", font=("Consolas",12,"bold"),
+                  command=self.archive_old_years, bg="#6c757d", fg="white").pack(side="left", padx=5)
+
+        # -------- Status Bar --------
+        status_frame = tk.Frame(self.root, bg="#f0f2f5")
+        status_frame.pack(side="bottom", fill="x", padx=10, pady=5)
+        self.status_label = tk.Label(status_frame, text="Ready", font=("Consolas",10), bg="#f0f2f5", anchor="w")
+        self.status_label.pack(side="left", fill="x", expand=True)
+        self.cancel_btn = tk.Button(status_frame, text="Cancel", font=("Consolas",10,"bold"), state="disabled",
+                                    command=lambda: self.worker.cancel_all(), bg="#6c757d", fg="white")
+        self.cancel_btn.pack(side="right", padx=5)
+        self.busy_bar = ttk.Progressbar(status_frame, length=200)
+        self.busy_bar.pack(side="right", padx=5)
+
+    # ---- Status bar ----
+    def show_status(self, tasks):
+        if not tasks:
+            self.status_label.config(text="Ready")
+            self.busy_bar.stop()
+            self.busy_bar.config(mode="determinate", value=0)
+            self.cancel_btn.config(state="disabled")
+            return
+        labels = [t.label for t in tasks if t.label]
+        self.status_label.config(text="Working: " + ", ".join(labels) if labels else "Working…")
+        if not any(t.cancellable for t in tasks):
+            self.busy_bar.config(mode="indeterminate")
+            self.busy_bar.start(15)
+        self.cancel_btn.config(state="normal" if any(t.cancellable for t in tasks) else "disabled")
+
+    def show_progress(self, task, done, total):
+        self.busy_bar.stop()
+        if total:
+            self.busy_bar.config(mode="determinate", maximum=total, value=done)
+            self.status_label.config(text=f"{task.label}: {done:,} / {total:,} rows")
+        else:
+            self.status_label.config(text=f"{task.label}: {done:,} rows")
+
+    def show_error(self, exc):
+        messagebox.showerror("Error", str(exc))
+
+    def dump_stats(self):
+        messagebox.showinfo("Performance Stats", f"Written to {instrument.dump()}")
+
+    def revalidate(self):
+        # Other clients write through the same server: redraw when they have.
+        def checked(changed):
+            if changed:
+                self.refresh_budget_bar()
+                self.refresh_charts()
+            self.root.after(REVALIDATE_MS, self.revalidate)
+        self.worker.submit(self.backend.revalidate, on_done=checked,
+                           on_error=lambda e: self.root.after(REVALIDATE_MS, self.revalidate))
+
+    def close(self):
+        self.worker.shutdown()
+        categorizer.save()
+        if instrument.ENABLED:
+            instrument.dump()
+        self.root.destroy()
 
     # ---- Actions ----
     def add_expense_action(self):
         try:
-            amount = float(self.amount_entry.get())
-            if amount <= 0:
-                raise ValueError
-        except ValueError:
-            messagebox.showerror("Error", "Invalid amount.")
-            return
-        date = self.date_entry.get()
-        try:
-            datetime.datetime.strptime(date, "%Y-%m-%d")
-        except ValueError:
-            messagebox.showerror("Error", "Date must be YYYY-MM-DD.")
+            amount = parse_amount(self.amount_entry.get())
+            date = parse_date(self.date_entry.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return
         category = self.category_var.get()
         desc = self.desc_entry.get()
-
-        # Check before adding (category limits, unwanted + block mode, budget)
-        if not self.check_before_add_expense(amount, category, date):
+        y, m, _ = map(int, date.split("-"))
+
+        def confirmed(figures):
+            # Check before adding (category limits, unwanted + block mode, budget)
+            if not self.check_before_add_expense(amount, category, date, figures):
+                return
+            self.worker.submit(self.backend.add_expense, amount, category, desc, date, write=True,
+                               label="Adding expense", on_done=added)
+
+        def added(expense_id):
+            self.amount_entry.delete(0, tk.END)
+            self.desc_entry.delete(0, tk.END)
+            self._category_picked = False
+            self.refresh_budget_bar()
+            self.refresh_charts()
+            self.table.insert_row((expense_id, amount, category, desc, date))
+
+        self.worker.submit(self.backend.get_pre_add_figures, y, m, category, on_done=confirmed)
+
+    def category_changed(self, *_):
+        if not self._suggesting:
+            self._category_picked = True
+
+    def suggest_category(self, _event=None):
+        if self._category_picked or not categorizer.loaded():
             return
+        try:
+            amount = parse_amount(self.amount_entry.get())
+        except ValueError:
+            amount = None
+        category = categorizer.suggest_category(self.desc_entry.get(), amount)
+        if category in CATEGORIES and category != self.category_var.get():
+            self._suggesting = True
+            try:
+                self.category_var.set(category)
+            finally:
+                self._suggesting = False
 
-        add_expense(amount, category, desc, date)
-        self.amount_entry.delete(0, tk.END)
-        self.desc_entry.delete(0, tk.END)
-        self.refresh_budget_bar()
-        self.refresh_table()
-
-    def check_before_add_expense(self, amount, category, date):
+    def check_before_add_expense(self, amount, category, date, figures=None):
         # returns True to proceed, False to cancel
         try:
             y, m, _ = map(int, date.split("-"))
         except Exception:
             messagebox.showerror("Error", "Invalid date format.")
             return False
+        if figures is None:
+            figures = self.backend.get_pre_add_figures(y, m, category)
 
         # 1) per-category limit check
-        cat_limit = get_category_limit(category)
-        cat_spent = get_month_spent_by_category(y, m, category)
+        cat_limit = figures["cat_limit"]
+        cat_spent = figures["cat_spent"]
         if cat_limit is not None and (cat_spent + amount) > cat_limit:
             # show clear warning and choice
             resp = messagebox.askyesno("Category limit exceeded",
@@ -410,13 +305,13 @@ class ExpenseTrackerApp:
             # else allow to continue
 
         # 2) unwanted category & block mode
-        if is_category_unwanted(category) and get_block_mode():
+        if figures["blocked"]:
             messagebox.showwarning("Blocked", f"'{category}' is marked as UNWANTED and block mode is ON. You cannot add this expense.")
             return False
 
         # 3) monthly budget check (soft warning)
-        budget = get_budget()
-        spent = get_total_expenses_for_month(y, m)
+        budget = figures["budget"]
+        spent = figures["spent"]
         new_spent = spent + amount
         if budget > 0 and new_spent > budget:
             resp = messagebox.askyesno("Budget exceeded",
@@ -427,23 +322,40 @@ class ExpenseTrackerApp:
         return True
 
     def refresh_table(self):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        expenses = fetch_expenses()
-        for exp in expenses:
-            self.tree.insert("", "end", values=exp)
+        self.table.reload(self.table.filters)
+
+    def schedule_search(self):
+        # Debounced: search once typing pauses, not on every keystroke.
+        if self._search_after:
+            self.root.after_cancel(self._search_after)
+        self._search_after = self.root.after(SEARCH_DEBOUNCE_MS, self.apply_search)
+
+    def apply_search(self):
+        self._search_after = None
+        text = self.search_var.get().strip()
+        self.table.reload({"text": text} if text else None)
 
     def delete_selected(self):
-        for item in self.tree.selection():
-            expense_id = self.tree.item(item)["values"][0]
-            delete_expense(expense_id)
-        self.refresh_table()
-        self.refresh_budget_bar()
+        expense_ids = [int(item) for item in self.tree.selection()]
+        if not expense_ids:
+            return
+
+        def deleted(_):
+            self.table.remove_rows(expense_ids)
+            self.refresh_budget_bar()
+            self.refresh_charts()
+
+        self.worker.submit(self.backend.delete_expenses, expense_ids, write=True,
+                           label="Deleting", on_done=deleted)
 
     def refresh_budget_bar(self):
-        budget = get_budget()
         today = datetime.date.today()
-        spent = get_total_expenses_for_month(today.year, today.month)
+        backend = self.backend
+        self.worker.submit(lambda: (backend.get_budget(), backend.get_total_expenses_for_month(today.year, today.month)),
+                           on_done=self.show_budget_bar)
+
+    def show_budget_bar(self, figures):
+        budget, spent = figures
         savings = budget - spent
         if savings < 0:
             savings = 0
@@ -453,15 +365,32 @@ class ExpenseTrackerApp:
         if percent > 100: percent = 100
         self.progress["value"] = percent
 
+    # ---- Charts ----
+    def show_category_pie(self):
+        self.show_chart("pie", lambda: messagebox.showinfo("No Data", "No expenses for this month."))
+
+    def show_monthly_trend(self):
+        self.show_chart("trend", lambda: messagebox.showinfo("No Data", "No expense data available."))
+
+    def show_chart(self, mode, on_empty=None):
+        if self.charts is None:
+            from charts import ChartWindow   # loads matplotlib on first use
+            self.charts = ChartWindow(self.root, self.worker)
+        self.charts.show(mode, on_empty)
+
+    def refresh_charts(self):
+        if self.charts is not None:
+            self.charts.refresh()
+
     def set_budget_dialog(self):
         def save_budget():
             try:
                 amount = float(entry.get())
-                set_budget(amount)
-                self.refresh_budget_bar()
-                win.destroy()
             except ValueError:
                 messagebox.showerror("Error", "Invalid budget amount.")
+                return
+            self.worker.submit(self.backend.set_budget, amount, write=True, on_done=lambda _: self.refresh_budget_bar())
+            win.destroy()
         win = tk.Toplevel(self.root)
         win.title("Set Budget")
         win.configure(bg="#f0f2f5")
@@ -474,11 +403,13 @@ class ExpenseTrackerApp:
         def save_limit():
             try:
                 amt = float(entry.get())
-                set_category_limit(catvar.get(), amt)
-                messagebox.showinfo("Saved", f"Limit for {catvar.get()} set to ₹{amt:.2f}")
-                win.destroy()
             except ValueError:
                 messagebox.showerror("Error", "Invalid amount.")
+                return
+            cat = catvar.get()
+            self.worker.submit(self.backend.set_category_limit, cat, amt, write=True,
+                               on_done=lambda _: messagebox.showinfo("Saved", f"Limit for {cat} set to ₹{amt:.2f}"))
+            win.destroy()
         win = tk.Toplevel(self.root); win.title("Set Category Limit")
         tk.Label(win, text="Category:", font=("Consolas",12)).grid(row=0,column=0,padx=5,pady=5)
         catvar = tk.StringVar(value=CATEGORIES[0])
@@ -491,8 +422,8 @@ class ExpenseTrackerApp:
         def save_unwanted():
             cat = catvar.get()
             unw = var.get()
-            mark_category_unwanted(cat, unw)
-            messagebox.showinfo("Saved", f"Category '{cat}' unwanted set to {unw}.")
+            self.worker.submit(self.backend.mark_category_unwanted, cat, unw, write=True,
+                               on_done=lambda _: messagebox.showinfo("Saved", f"Category '{cat}' unwanted set to {unw}."))
             win.destroy()
         win = tk.Toplevel(self.root); win.title("Mark Unwanted Category")
         tk.Label(win, text="Category:", font=("Consolas",12)).grid(row=0,column=0,padx=5,pady=5)
@@ -502,14 +433,21 @@ class ExpenseTrackerApp:
         tk.Checkbutton(win, text="Mark as Unwanted (blockable)", var=var).grid(row=1,column=0,columnspan=2,padx=5,pady=5)
         tk.Button(win, text="Save", command=save_unwanted, bg="#fd7e14").grid(row=2,column=0,columnspan=2,pady=10)
 
+    def block_mode_loaded(self, enabled):
+        self.block_var.set(enabled)
+        self.block_check.config(state="normal")
+
     def toggle_block_mode(self):
         enabled = self.block_var.get()
-        set_block_mode(enabled)
-        messagebox.showinfo("Block Mode", f"Block unwanted mode set to {enabled}.")
+        self.worker.submit(self.backend.set_block_mode, enabled, write=True,
+                           on_done=lambda _: messagebox.showinfo("Block Mode", f"Block unwanted mode set to {enabled}."))
 
     def show_suggestions(self):
         today = datetime.date.today()
-        suggestions = recommend_actions_for_month(today.year, today.month)
+        self.worker.submit(self.backend.recommend_actions_for_month, today.year, today.month,
+                           label="Suggestions", on_done=self.show_suggestions_window)
+
+    def show_suggestions_window(self, suggestions):
         text = "\n".join(suggestions)
         # show in scrollable window
         win = tk.Toplevel(self.root); win.title("Suggestions")
@@ -519,31 +457,211 @@ class ExpenseTrackerApp:
         txt.config(state="disabled")
         tk.Button(win, text="Close", command=win.destroy, bg="#6c757d", fg="white").pack(pady=5)
 
+    def run_export(self, exporter, filename, label, done_message):
+        # Exports stream rows on a reader thread; Cancel stops them between chunks.
+        def export(task):
+            total = count_expenses()
+            try:
+                exporter(task.track(iter_expenses(), total), filename)
+            except Cancelled:
+                if os.path.exists(filename):
+                    os.remove(filename)
+                raise
+
+        self.worker.submit(export, label=label, cancellable=True, pass_task=True,
+                           on_done=lambda _: messagebox.showinfo("Success", done_message))
+
+    def if_any_expenses(self, then):
+        # Checked on a reader; then() runs on the Tk thread if there is anything to export.
+        def checked(rows):
+            if rows:
+                then()
+            else:
+                messagebox.showinfo("No Data", "No expenses to export.")
+        self.worker.submit(lambda: fetch_expenses(limit=1), label="Export", on_done=checked)
+
     def export_excel(self):
-        expenses = fetch_expenses()
-        if not expenses:
-            messagebox.showinfo("No Data", "No expenses to export.")
-            return
-        filename = filedialog.asksaveasfilename(defaultextension=".xlsx",
-                                                filetypes=[("Excel Files", "*.xlsx")])
-        if filename:
-            export_to_excel(expenses, filename)
-            messagebox.showinfo("Success", "Exported to Excel.")
+        def ask():
+            filename = filedialog.asksaveasfilename(defaultextension=".xlsx",
+                                                    filetypes=[("Excel Files", "*.xlsx")])
+            if filename:
+                self.run_export(export_to_excel, filename, "Export Excel", "Exported to Excel.")
+        self.if_any_expenses(ask)
 
     def export_pdf(self):
-        expenses = fetch_expenses()
-        if not expenses:
-            messagebox.showinfo("No Data", "No expenses to export.")
+        def ask():
+            filename = filedialog.asksaveasfilename(defaultextension=".pdf",
+                                                    filetypes=[("PDF Files", "*.pdf")])
+            if filename:
+                self.run_export(export_to_pdf, filename, "Export PDF", "Exported to PDF.")
+        self.if_any_expenses(ask)
+
+    def export_csv(self):
+        def ask():
+            filename = filedialog.asksaveasfilename(defaultextension=".csv",
+                                                    filetypes=[("CSV Files", "*.csv"), ("Gzipped CSV", "*.csv.gz")])
+            if filename:
+                self.run_export(export_to_csv, filename, "Export CSV", "Exported to CSV.")
+        self.if_any_expenses(ask)
+
+    def export_changes(self):
+        # Only what changed since the last export to the chosen file; a CSV
+        # is appended to and an XLSX gets a numbered workbook per increment
+        # beside it, so the dialog must not ask to overwrite.  The file is
+        # written on a reader and only the watermark on the writer.
+        filename = filedialog.asksaveasfilename(defaultextension=".csv", confirmoverwrite=False,
+                                                filetypes=[("CSV Files", "*.csv"), ("Gzipped CSV", "*.csv.gz"),
+                                                           ("Excel Files", "*.xlsx")])
+        if not filename:
+            return
+        def failed(e):
+            messagebox.showerror("Export Changes failed", str(e))
+
+        def written(summary):
+            self.worker.submit(self.backend.record_export, summary, write=True, label="Export Changes",
+                               on_done=lambda _: messagebox.showinfo("Export Changes", changes.describe(summary)),
+                               on_error=failed)
+
+        self.worker.submit(lambda task: changes.write_changes(filename, track=task.track),
+                           label="Export Changes", cancellable=True, pass_task=True,
+                           on_done=written, on_error=failed)
+
+    def import_statement(self):
+        filename = filedialog.askopenfilename(filetypes=[("Statements", "*.csv *.ofx *.qfx"),
+                                                         ("CSV Files", "*.csv"), ("OFX Files", "*.ofx *.qfx")])
+        if not filename:
             return
-        filename = filedialog.asksaveasfilename(defaultextension=".pdf",
-                                                filetypes=[("PDF Files", "*.pdf")])
-        if filename:
-            export_to_pdf(expenses, filename)
-            messagebox.showinfo("Success", "Exported to PDF.")
+
+        def run_import(task):
+            def progress(read, inserted):
+                task.check()
+                task.progress(read)
+            return self.backend.import_statement(filename, progress)
+
+        def imported(summary):
+            self.refresh_budget_bar()
+            self.refresh_table()
+            self.refresh_charts()
+            messagebox.showinfo("Import complete",
+                                f"Imported {summary['inserted']} expenses "
+                                f"({summary['duplicates']} duplicates skipped, {summary['rejected']} rejected)\n"
+                                f"{summary['rows_per_second']:.0f} rows/s in {summary['seconds']:.1f}s.")
+
+        self.worker.submit(run_import, write=True, label="Import", cancellable=True, pass_task=True,
+                           on_done=imported, on_error=lambda e: messagebox.showerror("Import failed", str(e)))
+
+    def month_end_reports(self):
+        # PDF, Excel and a category pie for every month of a year, for all
+        # expenses and for each category, rendered in parallel by batch.py.
+        year = simpledialog.askinteger("Month-End Reports", "Year:", parent=self.root,
+                                       initialvalue=datetime.date.today().year, minvalue=1900, maxvalue=9999)
+        if not year:
+            return
+        out_dir = filedialog.askdirectory(title="Folder for the reports")
+        if not out_dir:
+            return
+
+        def run(task):
+            import batch
+            start = time.perf_counter()
+            specs = batch.monthly_specs(year, out_dir, categories=[None] + CATEGORIES)
+
+            def progress(done, total):
+                task.check()
+                task.progress(done, total)
+
+            results = batch.run_batch(specs, progress=progress)
+            return batch.summary(results, time.perf_counter() - start)
+
+        self.worker.submit(run, label="Month-End Reports", cancellable=True, pass_task=True,
+                           on_done=lambda text: messagebox.showinfo("Month-End Reports", text),
+                           on_error=lambda e: messagebox.showerror("Month-End Reports failed", str(e)))
+
+    def archive_old_years(self):
+        if not messagebox.askyesno("Archive Old Years",
+                                   f"Move expenses from years before the last {archive.KEEP_CLOSED_YEARS + 1} "
+                                   "into per-year archive files?\nThey stay visible in the table and exports."):
+            return
+
+        def archived(moved):
+            self.refresh_table()
+            self.refresh_budget_bar()
+            self.refresh_charts()
+            if moved:
+                messagebox.showinfo("Archive complete", "\n".join(
+                    f"{year}: {rows} expenses -> {os.path.basename(archive.archive_path(year))}"
+                    for year, rows in moved.items()))
+            else:
+                messagebox.showinfo("Archive complete", "Nothing to archive.")
+
+        self.worker.submit(self.backend.archive_closed_years, write=True, label="Archiving",
+                           on_done=archived, on_error=lambda e: messagebox.showerror("Archive failed", str(e)))
+
+# Handlers run on the Tk thread, so a slow one is what the user sees as a freeze.
+instrument.instrument_methods(ExpenseTrackerApp, (
+    "add_expense_action", "suggest_category", "check_before_add_expense", "refresh_table", "apply_search", "delete_selected",
+    "refresh_budget_bar", "show_budget_bar", "show_category_pie", "show_monthly_trend",
+    "refresh_charts", "set_budget_dialog", "set_category_limit_dialog",
+    "mark_unwanted_dialog", "toggle_block_mode", "show_suggestions", "show_suggestions_window",
+    "export_excel", "export_pdf", "export_csv", "export_changes", "import_statement", "month_end_reports", "archive_old_years", "show_status", "show_progress"))
 
 # ---------------- Main ----------------
+class StartupTimer:
+    # --startup-timing[=FILE] records how long each startup phase takes, writes
+    # the figures as JSON (to FILE, or stdout) once the first window is drawn
+    # and exits, so benchmarks/bench_startup.py can measure it repeatedly.
+    def __init__(self, argv):
+        self.enabled = False
+        self.out = None
+        for arg in argv:
+            if arg == "--startup-timing" or arg.startswith("--startup-timing="):
+                self.enabled = True
+                self.out = arg.partition("=")[2] or None
+        self.phases = {}
+        self.last = _STARTUP_T0
+
+    def mark(self, phase):
+        if self.enabled:
+            now = time.perf_counter()
+            self.phases[phase + "_ms"] = round((now - self.last) * 1000, 1)
+            self.last = now
+
+    def watch_first_window(self, root, app):
+        if not self.enabled:
+            return
+        def mapped(_event):
+            root.unbind("<Map>")
+            root.after_idle(finished)
+        def finished():
+            self.mark("first_window")
+            self.phases["total_ms"] = round((time.perf_counter() - _STARTUP_T0) * 1000, 1)
+            report = json.dumps(self.phases)
+            if self.out:
+                with open(self.out, "w") as f:
+                    f.write(report)
+            else:
+                print(report, flush=True)
+            app.close()
+        root.bind("<Map>", mapped)
+
 if __name__ == "__main__":
-    init_db()
+    multiprocessing.freeze_support()     # batch report workers in the packaged app
+    timer = StartupTimer(sys.argv[1:])
+    timer.mark("imports")
+    # --server=URL (or EXPENSE_SERVER) sends writes through server.py.
+    server = next((arg.partition("=")[2] for arg in sys.argv[1:] if arg.startswith("--server=")),
+                  os.environ.get("EXPENSE_SERVER"))
+    init_db(remote=bool(server))
+    timer.mark("init_db")
     root = tk.Tk()
-    app = ExpenseTrackerApp(root)
+    timer.mark("tk")
+    backend = None
+    if server:
+        from client import RemoteBackend
+        backend = RemoteBackend(server)
+    app = ExpenseTrackerApp(root, backend)
+    root.protocol("WM_DELETE_WINDOW", app.close)
+    timer.mark("app")
+    timer.watch_first_window(root, app)
     root.mainloop()
+    db.close_all()
@@ -6,13 +6,25 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    # Imported lazily inside functions; listed so the analysis never misses them.
+    hiddenimports=['matplotlib.backends.backend_tkagg', 'openpyxl', 'numpy'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Nothing here is used by the app; leaving them out shrinks the archive the
+    # bootloader has to unpack before the first window can appear.
+    excludes=[
+        'reportlab',
+        'PyQt5', 'PyQt6', 'PySide2', 'PySide6', 'wx', 'gi',
+        'matplotlib.backends.backend_qt', 'matplotlib.backends.backend_qtagg',
+        'matplotlib.backends.backend_qt5agg', 'matplotlib.backends.backend_gtk3agg',
+        'matplotlib.backends.backend_wxagg', 'matplotlib.backends.backend_webagg',
+        'matplotlib.tests', 'numpy.tests', 'numpy.f2py', 'numpy.distutils',
+        'IPython', 'jupyter', 'notebook', 'pandas', 'scipy', 'sympy',
+        'pytest', 'lib2to3', 'tkinter.test',
+    ],
     noarchive=False,
-    optimize=0,
+    optimize=1,
 )
 pyz = PYZ(a.pure)
 
@@ -0,0 +1,158 @@
+import csv
+import gzip
+import unicodedata
+import zlib
+
+# ---------------- Streaming Exports ----------------
+# Every exporter takes an iterable of (id, amount, category, description,
+# date) rows -- normally queries.iter_expenses(filters), which reads from a
+# database cursor in chunks -- and writes each row out as soon as it
+# arrives, so memory stays flat however many rows are exported.
+
+HEADERS = ["ID", "Amount", "Category", "Description", "Date"]
+
+
+def export_to_excel(expenses, filename, headers=HEADERS):
+    """Write an .xlsx workbook."""
+    from openpyxl import Workbook   # imported on first export to keep startup fast
+    # Write-only workbooks stream rows to a temp file instead of building cells.
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Expenses")
+    ws.append(headers)
+    for row in expenses:
+        ws.append(row)
+    wb.save(filename)
+
+
+def export_pivot_to_excel(pivot, filename, title="Pivot"):
+    """Write a pivot.Pivot as a sheet: a cross-tab for two dimensions, a list otherwise."""
+    from openpyxl import Workbook
+    headers, rows = pivot.table()
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title[:31])        # Excel's sheet-name limit
+    ws.append(headers)
+    for row in rows:
+        ws.append(row)
+    wb.save(filename)
+
+
+def export_to_csv(expenses, filename, headers=HEADERS, append=False):
+    """Write a CSV file, gzip-compressed when filename ends in .gz.
+
+    append=True adds the rows to the end of an existing file (without a
+    second header line); a gzip file gets another gzip member, which every
+    gzip reader treats as one stream.
+    """
+    mode = "a" if append else "w"
+    if filename.endswith(".gz"):
+        f = gzip.open(filename, mode + "t", newline="", encoding="utf-8")
+    else:
+        f = open(filename, mode, newline="", encoding="utf-8")
+    with f:
+        writer = csv.writer(f)
+        if not append:
+            writer.writerow(headers)
+        for row in expenses:
+            writer.writerow(row)
+
+
+# Page geometry matches the original report: US letter, 15pt rows, a title
+# and header line on the first page only.
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+TOP, BOTTOM, ROW_HEIGHT = PAGE_HEIGHT - 50, 50, 15
+
+
+class _PdfWriter:
+    """Minimal text-only PDF writer that flushes every page as it is finished.
+
+    reportlab's canvas keeps every page in memory until save(), which grows
+    with the row count; here only the byte offset of each object is kept.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.offsets = {}
+        self.pages = []
+        self.next_id = 5   # 1 catalog, 2 page tree, 3-4 fonts
+        self.f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        self._object(4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+
+    def _object(self, obj_id, body):
+        self.offsets[obj_id] = self.f.tell()
+        self.f.write(b"%d 0 obj\n" % obj_id + body + b"\nendobj\n")
+
+    def add_page(self, content):
+        data = zlib.compress(content.encode("cp1252"))
+        stream_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self._object(stream_id, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data)
+                     + data + b"\nendstream")
+        self._object(page_id, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                              b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+                     % (PAGE_WIDTH, PAGE_HEIGHT, stream_id))
+        self.pages.append(page_id)
+
+    def close(self):
+        kids = b" ".join(b"%d 0 R" % p for p in self.pages)
+        self._object(2, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(self.pages))
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref = self.f.tell()
+        self.f.write(b"xref\n0 %d\n0000000000 65535 f \n" % self.next_id)
+        for obj_id in range(1, self.next_id):
+            self.f.write(b"%010d 00000 n \n" % self.offsets[obj_id])
+        self.f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (self.next_id, xref))
+
+
+# The standard fonts only cover cp1252 (WinAnsiEncoding).  Other characters
+# are written as their closest cp1252 spelling when they have one (accents
+# dropped, "₹" as "Rs."), otherwise as their code point, so nothing in a
+# description is silently lost.
+_PDF_SUBSTITUTES = {"₹": "Rs.", "\u2212": "-"}
+
+
+def _pdf_char(ch):
+    stripped = "".join(c for c in unicodedata.normalize("NFKD", ch) if not unicodedata.combining(c))
+    for plain in (ch, _PDF_SUBSTITUTES.get(ch), stripped):
+        try:
+            if plain:
+                plain.encode("cp1252")
+                return plain
+        except UnicodeEncodeError:
+            pass
+    return f"<U+{ord(ch):04X}>"
+
+
+def _pdf_encodable(text):
+    try:
+        text.encode("cp1252")
+        return text
+    except UnicodeEncodeError:
+        return "".join(map(_pdf_char, text))
+
+
+def _pdf_text(x, y, text, font="F1", size=10):
+    text = _pdf_encodable(text)
+    text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return f"BT /{font} {size} Tf {x} {y} Td ({text}) Tj ET\n"
+
+
+def export_to_pdf(expenses, filename):
+    with open(filename, "wb") as f:
+        pdf = _PdfWriter(f)
+        y = TOP
+        page = [_pdf_text(200, y, "Expense Report", "F2", 14)]
+        y -= 30
+        page.append(_pdf_text(30, y, " | ".join(HEADERS)))
+        y -= 20
+        for row in expenses:
+            line = " | ".join([str(x) for x in row])
+            page.append(_pdf_text(30, y, line[:100]))
+            y -= ROW_HEIGHT
+            if y < BOTTOM:
+                pdf.add_page("".join(page))
+                page = []
+                y = TOP
+        if page or not pdf.pages:
+            pdf.add_page("".join(page))
+        pdf.close()
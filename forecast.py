@@ -0,0 +1,224 @@
+import calendar
+import datetime
+import sys
+
+import numpy as np
+
+import db
+
+# ---------------- Spending Forecast Engine ----------------
+# The whole daily spend history is loaded from daily_rollup in one query into
+# a (days x categories) matrix.  Forecasts, anomaly flags and suggestions for
+# every category are then computed together with array operations, instead
+# of one query per category.
+#
+# Each remaining day of the month is forecast per category as
+#     base rate x weekday factor x day-of-month factor
+# where the base rate blends the trailing 28- and 90-day averages, and the
+# factors compare spend on that weekday / part of the month with the
+# category's overall average over the last year (shrunk towards 1 when there
+# is little data).
+
+SHORT_WINDOW, LONG_WINDOW, SEASON_WINDOW = 28, 90, 365
+SHRINK_DAYS = 8           # pseudo-observations pulling seasonal factors to 1
+ANOMALY_Z = 3.0
+ANOMALY_MIN_DAYS = 30     # need this much history before flagging anomalies
+DOM_BUCKETS = np.array([0] * 10 + [1] * 10 + [2] * 11)   # day 1-10, 11-20, 21-31
+
+
+class History:
+    """Daily spend per category: start date, category names and a (days, categories) matrix."""
+
+    def __init__(self, start, categories, daily):
+        self.start = start
+        self.categories = categories
+        self.daily = daily
+        self.index = {c: i for i, c in enumerate(categories)}
+
+    def day_index(self, date):
+        return (date - self.start).days
+
+
+def load_history(conn=None):
+    conn = conn or db.get_conn()
+    rows = conn.execute("SELECT date, category, total_paise / 100.0 FROM daily_rollup WHERE total_paise > 0").fetchall()
+    if not rows:
+        return History(datetime.date.today(), [], np.zeros((0, 0)))
+    dates, cats, totals = zip(*rows)
+    days = np.array(dates, dtype="datetime64[D]")
+    first = days.min()
+    categories, cat_idx = np.unique(np.array(cats), return_inverse=True)
+    day_idx = (days - first).astype(np.int64)
+    daily = np.zeros((int(day_idx.max()) + 1, len(categories)))
+    np.add.at(daily, (day_idx, cat_idx), np.array(totals, dtype=float))
+    return History(first.astype(datetime.date), [str(c) for c in categories], daily)
+
+
+def _seasonal_factors(daily, labels, n_labels):
+    """Per-category spend on each label (weekday, month part) relative to the overall mean."""
+    block = daily[-SEASON_WINDOW:]
+    lab = labels[len(daily) - len(block):len(daily)]
+    sums = np.zeros((n_labels, daily.shape[1]))
+    np.add.at(sums, lab, block)
+    counts = np.bincount(lab, minlength=n_labels)[:, None]
+    overall = block.mean(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(overall > 0, (sums / np.maximum(counts, 1)) / overall, 1.0)
+    # Shrink towards 1 so a weekday seen only a couple of times cannot dominate.
+    return (ratio * counts + SHRINK_DAYS) / (counts + SHRINK_DAYS)
+
+
+def forecast_month(history, year, month, as_of=None, today=None):
+    """Forecast month-end spend per category using only data up to and including `as_of`.
+
+    Without as_of the forecast is as of today (default: the real date), and
+    spent also counts this month's expenses already recorded with a later
+    date.  Returns a dict with categories, spent and projected (month end)
+    as arrays aligned with categories, plus the as_of date used.
+    """
+    days_in_month = calendar.monthrange(year, month)[1]
+    first_day = datetime.date(year, month, 1)
+    now = as_of is None
+    if now:
+        today = today or datetime.date.today()
+        as_of = today if (today.year, today.month) == (year, month) else first_day.replace(day=days_in_month)
+    n_cat = len(history.categories)
+    m0 = history.day_index(first_day)
+    if n_cat and m0 < 0:
+        # History starting after the 1st: the days before it spent nothing.
+        history = History(first_day, history.categories,
+                          np.vstack([np.zeros((-m0, n_cat)), history.daily]))
+        m0 = 0
+    end = history.day_index(as_of) + 1           # days of history visible to the forecast
+    if n_cat == 0 or end <= m0:
+        zero = np.zeros(n_cat)
+        return {"categories": history.categories, "spent": zero, "projected": zero, "as_of": as_of}
+
+    # Days after the last recorded expense are real zero-spend days.
+    daily = history.daily[:end]
+    if len(daily) < end:
+        daily = np.vstack([daily, np.zeros((end - len(daily), n_cat))])
+    spent = daily[m0:].sum(axis=0)
+    if now:
+        spent = spent + history.daily[end:m0 + days_in_month].sum(axis=0)
+    remaining = days_in_month - as_of.day
+    if remaining <= 0:
+        return {"categories": history.categories, "spent": spent, "projected": spent.copy(), "as_of": as_of}
+
+    short, long = daily[-SHORT_WINDOW:], daily[-LONG_WINDOW:]
+    base = 0.5 * short.mean(axis=0) + 0.5 * long.mean(axis=0)
+
+    # Weekday and month-part labels for every day of history plus the rest of this month.
+    dates = np.datetime64(history.start, "D") + np.arange(m0 + days_in_month)
+    weekdays = (dates.astype(np.int64) - 4) % 7          # 1970-01-01 was a Thursday
+    dom_buckets = DOM_BUCKETS[(dates - dates.astype("datetime64[M]")).astype(np.int64)]
+    dow = _seasonal_factors(daily, weekdays, 7)
+    dom = _seasonal_factors(daily, dom_buckets, 3)
+
+    future = np.arange(end, m0 + days_in_month)
+    factors = dow[weekdays[future]] * dom[dom_buckets[future]]       # (remaining days, categories)
+    projected = spent + (base * factors).sum(axis=0)
+    return {"categories": history.categories, "spent": spent, "projected": projected, "as_of": as_of}
+
+
+def find_anomalies(history, year, month, as_of=None):
+    """Days this month where a category spent more than ANOMALY_Z std above its trailing mean."""
+    first_day = datetime.date(year, month, 1)
+    as_of = as_of or datetime.date.today()
+    m0, end = history.day_index(first_day), min(history.day_index(as_of) + 1, len(history.daily))
+    if m0 < ANOMALY_MIN_DAYS or end <= m0:
+        return []
+    ref = history.daily[max(0, m0 - LONG_WINDOW):m0]
+    mean, std = ref.mean(axis=0), ref.std(axis=0)
+    block = history.daily[m0:end]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(std > 0, (block - mean) / std, 0)
+    days, cats = np.nonzero((z > ANOMALY_Z) & (block > 0))
+    return [(first_day + datetime.timedelta(days=int(d)), history.categories[c], float(block[d, c]), float(z[d, c]))
+            for d, c in zip(days, cats)]
+
+
+def build_suggestions(year, month, budget, unwanted, limits, history=None, today=None):
+    """All month suggestions from a single history load and forecast pass."""
+    history = history if history is not None else load_history()
+    fc = forecast_month(history, year, month, today=today)
+    cats, spent, projected = fc["categories"], fc["spent"], fc["projected"]
+    suggestions = []
+    need_to_save = max(0, projected.sum() - budget) if budget > 0 else 0
+    if need_to_save > 0:
+        suggestions.append(f"Projected overshoot: ₹{need_to_save:.0f}. Try to cut this month by ₹{need_to_save:.0f}.")
+        # top categories by spend
+        for i in np.argsort(-spent)[:5]:
+            if spent[i] > 0:
+                suggestions.append(f"Top: {cats[i]} — spent ₹{spent[i]:.0f}. Consider cutting 20-40% from {cats[i]}.")
+    else:
+        suggestions.append("You're on track — projected spending is within budget. Consider adding to savings.")
+    for i, cat in enumerate(cats):
+        limit = limits.get(cat)
+        if limit is not None and spent[i] <= limit < projected[i]:
+            suggestions.append(f"{cat} is on course for ₹{projected[i]:.0f} against its ₹{limit:.0f} limit.")
+    # unwanted categories that already have spending this month
+    for cat in unwanted:
+        i = history.index.get(cat)
+        if i is not None and spent[i] > 0:
+            suggestions.append(f"Unwanted category {cat} already has ₹{spent[i]:.0f} this month. Avoid further purchases in this category.")
+    for day, cat, amount, _ in find_anomalies(history, year, month, fc["as_of"]):
+        suggestions.append(f"Unusual spend: ₹{amount:.0f} on {cat} on {day:%d %b}, well above your normal daily {cat} spend.")
+    return suggestions
+
+
+# ---------------- Backtesting ----------------
+def backtest(history, months=12, as_of_days=(7, 14, 21)):
+    """Forecast each of the last `months` complete months as of the given days
+    and compare with what was actually spent.
+
+    Returns {as_of_day: {"model_mae": ..., "linear_mae": ..., "model_mape": ..., "linear_mape": ...}}
+    where errors are on the month total; "linear" is the old spent/day x days projection.
+    """
+    if not len(history.daily):
+        return {}
+    last = history.start + datetime.timedelta(days=len(history.daily) - 1)
+    targets = []
+    y, m = last.year, last.month
+    for _ in range(months):
+        y, m = (y, m - 1) if m > 1 else (y - 1, 12)
+        if datetime.date(y, m, 1) < history.start:
+            break
+        targets.append((y, m))
+    results = {}
+    for day in as_of_days:
+        model_err, linear_err, actuals = [], [], []
+        for y, m in targets:
+            days_in_month = calendar.monthrange(y, m)[1]
+            actual = forecast_month(history, y, m, datetime.date(y, m, days_in_month))["spent"].sum()
+            fc = forecast_month(history, y, m, datetime.date(y, m, min(day, days_in_month)))
+            spent = fc["spent"].sum()
+            model_err.append(abs(fc["projected"].sum() - actual))
+            linear_err.append(abs(spent / day * days_in_month - actual))
+            actuals.append(actual)
+        actuals = np.maximum(np.array(actuals), 1e-9)
+        results[day] = {
+            "months": len(targets),
+            "model_mae": float(np.mean(model_err)),
+            "linear_mae": float(np.mean(linear_err)),
+            "model_mape": float(np.mean(np.array(model_err) / actuals) * 100),
+            "linear_mape": float(np.mean(np.array(linear_err) / actuals) * 100),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    # python forecast.py [expenses.db] -- backtest the forecast against past months
+    import time
+    if len(sys.argv) > 1:
+        db.set_db_path(sys.argv[1])
+    start = time.perf_counter()
+    history = load_history()
+    loaded = time.perf_counter()
+    results = backtest(history)
+    done = time.perf_counter()
+    print(f"{history.daily.shape[0]} days x {history.daily.shape[1]} categories loaded in "
+          f"{(loaded - start) * 1000:.1f} ms, backtest in {(done - loaded) * 1000:.1f} ms")
+    for day, r in results.items():
+        print(f"as of day {day:>2} over {r['months']} months: MAPE model {r['model_mape']:.1f}% "
+              f"vs linear {r['linear_mape']:.1f}% (MAE {r['model_mae']:.0f} vs {r['linear_mae']:.0f})")
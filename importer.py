@@ -0,0 +1,197 @@
+import csv
+import hashlib
+import re
+import sys
+import time
+
+import db
+import schema
+from records import CATEGORIES, parse_amount, parse_date, to_paise
+
+# ---------------- Bulk Import ----------------
+# Statements are read as a stream of rows, validated with the same rules as
+# the Add Expense form and written with executemany() in batches inside one
+# transaction.  Every row carries an import_key (the file's own transaction
+# id when it has one, otherwise a hash of date/amount/description), and the
+# unique index on that column makes re-importing the same file a no-op.
+# The per-row rollup and search-index triggers are suspended for the load;
+# the new rows are summed into the rollups and indexed once at the end.
+
+DEFAULT_BATCH_SIZE = 5000
+
+_CSV_COLUMNS = {
+    "date": ("date", "transaction date", "txn date", "value date"),
+    "amount": ("amount", "debit", "withdrawal"),
+    "description": ("description", "narration", "details", "particulars", "memo"),
+    "category": ("category",),
+    "key": ("id", "reference", "ref", "transaction id"),
+}
+
+_CATEGORY_LOOKUP = {c.lower(): c for c in CATEGORIES}
+
+_OFX_TAG = re.compile(r"<(/?\w+)>([^<\r\n]*)")
+
+
+def map_category(name):
+    """Match a category case-insensitively against CATEGORIES, falling back to Other."""
+    return _CATEGORY_LOOKUP.get((name or "").strip().lower(), "Other")
+
+
+def read_csv(path):
+    """Yield one dict per CSV row with date/amount/description/category/key fields."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [h.strip().lower() for h in next(reader, [])]
+        index = {}
+        for field, aliases in _CSV_COLUMNS.items():
+            for alias in aliases:
+                if alias in header:
+                    index[field] = header.index(alias)
+                    break
+        if "date" not in index or "amount" not in index:
+            raise ValueError(f"{path}: CSV needs a date and an amount column.")
+        for row in reader:
+            if not row:
+                continue
+            yield {field: (row[i] if i < len(row) else "") for field, i in index.items()}
+
+
+def read_ofx(path):
+    """Yield one dict per debit <STMTTRN> in an OFX/QFX statement."""
+    txn = None
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            for tag, value in _OFX_TAG.findall(line):
+                tag = tag.upper()
+                if tag == "STMTTRN":
+                    txn = {}
+                elif tag == "/STMTTRN" and txn is not None:
+                    amount = txn.get("TRNAMT", "")
+                    # Statements sign debits negative; credits are income, not expenses.
+                    if amount.startswith("-"):
+                        yield {
+                            "date": txn.get("DTPOSTED", "")[:8],
+                            "amount": amount[1:],
+                            "description": txn.get("MEMO") or txn.get("NAME", ""),
+                            "key": txn.get("FITID", ""),
+                        }
+                    txn = None
+                elif txn is not None and not tag.startswith("/"):
+                    txn[tag] = value.strip()
+
+
+def _rows_for(path):
+    if path.lower().endswith((".ofx", ".qfx")):
+        return read_ofx(path), "%Y%m%d"
+    return read_csv(path), None
+
+
+def prepare_rows(rows, date_format="%Y-%m-%d"):
+    """Validate raw rows and yield (amount, category, description, date, import_key) tuples.
+
+    Rows that fail validation are yielded as None so callers can count them.
+    Rows without their own key are keyed by content plus how many identical
+    rows came before them on the same date, so two identical purchases on one
+    day stay two expenses.  Statements are expected in date order.
+    """
+    seen = {}
+    current_date = None
+    for raw in rows:
+        try:
+            amount = parse_amount((raw.get("amount") or "").replace(",", "").strip())
+            date = parse_date((raw.get("date") or "").strip(), date_format)
+        except ValueError:
+            yield None
+            continue
+        category = map_category(raw.get("category"))
+        description = (raw.get("description") or "").strip()
+        key = (raw.get("key") or "").strip()
+        if key:
+            key = "id:" + key
+        else:
+            if date != current_date:
+                seen.clear()
+                current_date = date
+            content = f"{date}|{amount:.2f}|{description}"
+            n = seen.get(content, 0)
+            seen[content] = n + 1
+            key = hashlib.sha1(f"{content}|{n}".encode()).hexdigest()[:16]
+        yield (amount, category, description, date, key)
+
+
+def import_expenses(path, batch_size=DEFAULT_BATCH_SIZE, progress=None, date_format=None):
+    """Import a CSV or OFX file and return a summary dict.
+
+    progress, if given, is called as progress(rows_read, rows_inserted) after
+    every batch.  The summary has rows_read, inserted, duplicates, rejected,
+    seconds and rows_per_second.
+    """
+    rows, file_date_format = _rows_for(path)
+    date_format = date_format or file_date_format or "%Y-%m-%d"
+    start = time.perf_counter()
+    read = inserted = rejected = 0
+    batch = []
+    with db.transaction() as conn, schema.triggers_suspended(conn, "trg_rollup_insert", "trg_fts_insert",
+                                                                     "trg_changes_insert"):
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM expense_rows").fetchone()[0]
+        category_ids = schema.category_ids(conn)
+        insert = _INSERT_GUARDED if conn.execute("SELECT 1 FROM archives LIMIT 1").fetchone() else _INSERT
+        for record in prepare_rows(rows, date_format):
+            read += 1
+            if record is None:
+                rejected += 1
+                continue
+            batch.append(record)
+            if len(batch) >= batch_size:
+                inserted += _insert_batch(conn, insert, category_ids, batch)
+                batch = []
+                if progress:
+                    progress(read, inserted)
+        if batch:
+            inserted += _insert_batch(conn, insert, category_ids, batch)
+        # The new rows are added to the rollups in one grouped pass instead of
+        # one upsert per row, and indexed for search and logged as changes in
+        # one statement each.
+        if inserted:
+            schema.add_to_rollup(conn, after_id=last_id)
+            schema.rebuild_search_index(conn, after_id=last_id)
+            schema.log_changes(conn, after_id=last_id)
+    if progress:
+        progress(read, inserted)
+    seconds = time.perf_counter() - start
+    return {
+        "rows_read": read,
+        "inserted": inserted,
+        "duplicates": read - rejected - inserted,
+        "rejected": rejected,
+        "seconds": seconds,
+        "rows_per_second": read / seconds if seconds > 0 else 0,
+    }
+
+
+_INSERT = """INSERT OR IGNORE INTO expense_rows (amount_paise, category_id, description, date, import_key)
+             VALUES (?, ?, ?, ?, ?)"""
+# Once years have been archived their rows' keys are no longer in expense_rows.
+_INSERT_GUARDED = """INSERT OR IGNORE INTO expense_rows (amount_paise, category_id, description, date, import_key)
+                     SELECT ?1, ?2, ?3, ?4, ?5
+                     WHERE NOT EXISTS (SELECT 1 FROM archived_import_keys WHERE import_key = ?5)"""
+
+
+def _insert_batch(conn, insert, category_ids, batch):
+    # map_category() only yields CATEGORIES, which are always in the table.
+    cur = conn.executemany(insert, [(to_paise(amount), category_ids[category], description, date, key)
+                                    for amount, category, description, date, key in batch])
+    return cur.rowcount
+
+
+if __name__ == "__main__":
+    # python importer.py statement.csv [expenses.db]
+    if len(sys.argv) > 2:
+        db.set_db_path(sys.argv[2])
+    schema.migrate(db.get_conn())
+    summary = import_expenses(sys.argv[1],
+                              progress=lambda n, _: print(f"\r{n} rows read", end="", flush=True))
+    print()
+    print(f"{summary['inserted']} inserted, {summary['duplicates']} duplicates, "
+          f"{summary['rejected']} rejected in {summary['seconds']:.2f}s "
+          f"({summary['rows_per_second']:.0f} rows/s)")
@@ -0,0 +1,226 @@
+import collections
+import functools
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# ---------------- Latency Instrumentation ----------------
+# Opt-in: set EXPENSE_TRACE=stats.json before starting the app.  Then every
+# decorated database function, GUI handler, background task and SQL
+# statement is timed into a per-operation latency histogram, anything slower
+# than EXPENSE_TRACE_SLOW_MS (default 50 ms) goes to a slow log together with
+# its SQL and parameters, and the stats are written to the file on exit or
+# from the Debug menu.
+#
+# When the variable is unset timed()/wrap() hand back the original function
+# and db.py opens plain sqlite3 connections, so nothing is measured and
+# nothing costs anything.
+
+OUTPUT = os.environ.get("EXPENSE_TRACE") or None
+ENABLED = OUTPUT is not None
+SLOW_MS = float(os.environ.get("EXPENSE_TRACE_SLOW_MS", 50))
+SLOW_LOG_SIZE = 500
+MAX_STATEMENTS = 20      # statements kept per slow operation
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_lock = threading.Lock()
+_histograms = {}
+_slow = collections.deque(maxlen=SLOW_LOG_SIZE)
+_local = threading.local()
+_started = time.time()
+
+
+class Histogram:
+    """Latency counts in BUCKETS_MS buckets (the last bucket is everything slower)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, p):
+        # Upper bound of the bucket holding the p-th percentile (max for the overflow bucket).
+        target, seen = p / 100 * self.count, 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": {(f"<={b}" if i < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}"): n
+                        for i, (b, n) in enumerate(zip(BUCKETS_MS + (None,), self.buckets)) if n},
+        }
+
+
+def _params(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {k: repr(v)[:200] for k, v in params.items()}
+    return [repr(v)[:200] for v in params]
+
+
+def record(op, ms, sql=None, params=None, statements=None):
+    """Add one timing to op's histogram, and to the slow log if it took SLOW_MS or more."""
+    with _lock:
+        hist = _histograms.get(op)
+        if hist is None:
+            hist = _histograms[op] = Histogram()
+        hist.add(ms)
+        if ms >= SLOW_MS:
+            entry = {"op": op, "ms": round(ms, 3), "at": round(time.time() - _started, 3),
+                     "thread": threading.current_thread().name}
+            if sql is not None:
+                entry["sql"] = sql
+                entry["params"] = _params(params)
+            if statements:
+                entry["statements"] = statements[:MAX_STATEMENTS]
+            _slow.append(entry)
+
+
+# ---- Operation timing ----
+def _open_scope():
+    stack = getattr(_local, "scopes", None)
+    if stack is None:
+        stack = _local.scopes = []
+    statements = []
+    stack.append(statements)
+    return statements
+
+
+def _close_scope():
+    _local.scopes.pop()
+
+
+def wrap(fn, op):
+    """Return fn timed as `op` (fn itself when instrumentation is off)."""
+    if not ENABLED:
+        return fn
+
+    if inspect.isgeneratorfunction(fn):
+        # Only time spent producing items counts, not the consumer's work in between.
+        @functools.wraps(fn)
+        def timed_generator(*args, **kwargs):
+            gen = fn(*args, **kwargs)
+            spent = 0.0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(gen)
+                    finally:
+                        spent += time.perf_counter() - start
+                    yield item
+            except StopIteration:
+                pass
+            finally:
+                gen.close()
+                record(op, spent * 1000)
+        return timed_generator
+
+    @functools.wraps(fn)
+    def timed_call(*args, **kwargs):
+        statements = _open_scope()
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            _close_scope()
+            record(op, ms, statements=statements)
+    return timed_call
+
+
+def timed(fn=None, *, op=None):
+    """Decorator form of wrap(); the op name defaults to the function's qualified name."""
+    if fn is None:
+        return lambda f: wrap(f, op or f.__qualname__)
+    return wrap(fn, op or fn.__qualname__)
+
+
+def instrument_methods(cls, names):
+    """Time the named methods of cls (GUI handlers) as "ClassName.method"."""
+    if ENABLED:
+        for name in names:
+            setattr(cls, name, wrap(getattr(cls, name), f"{cls.__name__}.{name}"))
+
+
+# ---- SQL timing ----
+def _normalize(sql):
+    return " ".join(sql.split())
+
+
+class TracedConnection(sqlite3.Connection):
+    """sqlite3 connection that times every statement (execute() up to the first row)."""
+
+    def _timed(self, method, sql, params):
+        start = time.perf_counter()
+        try:
+            return method(sql, params) if params is not None else method(sql)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            text = _normalize(sql)
+            logged = params if method.__name__ == "execute" else None   # executemany params are an iterator
+            for statements in getattr(_local, "scopes", ()):
+                statements.append({"sql": text, "params": _params(logged), "ms": round(ms, 3)})
+            record("sql: " + text[:160], ms, sql=text, params=logged)
+
+    def execute(self, sql, params=None):
+        return self._timed(super().execute, sql, params)
+
+    def executemany(self, sql, params):
+        return self._timed(super().executemany, sql, params)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            record("sql: COMMIT", (time.perf_counter() - start) * 1000)
+
+
+def connection_factory():
+    return TracedConnection if ENABLED else sqlite3.Connection
+
+
+# ---- Reporting ----
+def stats():
+    with _lock:
+        return {
+            "slow_ms": SLOW_MS,
+            "uptime_s": round(time.time() - _started, 1),
+            "operations": {op: h.to_dict() for op, h in
+                           sorted(_histograms.items(), key=lambda kv: -kv[1].total_ms)},
+            "slow_log": list(_slow),
+        }
+
+
+def dump(path=None):
+    """Write stats() as JSON to path (default: the EXPENSE_TRACE file) and return the path."""
+    path = path or OUTPUT
+    with open(path, "w") as f:
+        json.dump(stats(), f, indent=2)
+    return path
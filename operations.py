@@ -0,0 +1,152 @@
+import archive
+import categorizer
+import changes
+import db
+import importer
+import instrument
+import reports
+import schema
+import settings_store
+from queries import count_expenses, fetch_expenses  # noqa: F401  (part of the backend interface)
+from records import to_paise
+
+# Adding and deleting expenses, budget and category settings, and the
+# figures behind the pre-add checks and suggestions.  Shared by the Tk app
+# and the API server (server.py), so nothing here imports Tk.  This module
+# is the app's local backend; client.RemoteBackend offers the same
+# functions over the server.
+
+# ---------------- Expense Operations ----------------
+# insert_expense / remove_expenses work inside the caller's transaction, so
+# the API server can commit a whole batch of writes at once; once it
+# commits, expenses_added / expenses_deleted do the follow-up work.
+def insert_expense(conn, amount, category, description, date):
+    cur = conn.execute("""INSERT INTO expense_rows (amount_paise, category_id, description, date)
+                          VALUES (?, ?, ?, ?)""",
+                       (to_paise(amount), schema.category_id(conn, category), description, date))
+    return cur.lastrowid
+
+def expenses_added(dates):
+    for year_month in {date[:7] for date in dates}:
+        reports.invalidate(year_month)
+    categorizer.learn_new()
+
+@instrument.timed
+def add_expense(amount, category, description, date):
+    with db.transaction() as conn:
+        expense_id = insert_expense(conn, amount, category, description, date)
+    expenses_added([date])
+    return expense_id
+
+def remove_expenses(conn, expense_ids):
+    # Returns the ids not in the hot file (moved to year archives, or gone).
+    return [i for i in expense_ids
+            if not conn.execute("DELETE FROM expense_rows WHERE id=?", (i,)).rowcount]
+
+def expenses_deleted(missing):
+    if missing:
+        archive.delete_archived(missing)
+    reports.invalidate()
+
+def delete_expense(expense_id):
+    delete_expenses([expense_id])
+
+@instrument.timed
+def delete_expenses(expense_ids):
+    with db.transaction() as conn:
+        missing = remove_expenses(conn, expense_ids)
+    expenses_deleted(missing)
+
+@instrument.timed
+def get_total_expenses_for_month(year, month):
+    total = db.get_conn().execute(
+        "SELECT SUM(total_paise) / 100.0 FROM monthly_rollup WHERE year_month = ?",
+        (f"{year}-{month:02d}",)).fetchone()[0]
+    return total if total else 0
+
+# ---------------- Bulk Writes ----------------
+# Long writes: the app runs them on its writer thread and the API server on
+# its single writer, so nothing else is waiting for the write lock meanwhile.
+@instrument.timed
+def import_statement(path, progress=None):
+    summary = importer.import_expenses(path, progress=progress)
+    reports.invalidate()
+    categorizer.learn_new()
+    return summary
+
+@instrument.timed
+def archive_closed_years():
+    moved = archive.archive_closed_years()
+    reports.invalidate()
+    return moved
+
+def record_export(summary):
+    return changes.record_watermark(summary)
+
+def revalidate():
+    # Only this process writes the file, and its writes invalidate the caches.
+    return False
+
+# ---------------- Budget & Settings ----------------
+# Served from the in-process settings cache; setters write through to the DB.
+def get_budget():
+    return settings_store.get_budget()
+
+@instrument.timed
+def set_budget(amount):
+    settings_store.set_budget(amount)
+
+@instrument.timed
+def set_category_limit(category, amount):
+    settings_store.set_category_limit(category, amount)
+
+def get_category_limit(category):
+    return settings_store.get_category_limit(category)
+
+@instrument.timed
+def mark_category_unwanted(category, unwanted=True):
+    settings_store.mark_category_unwanted(category, unwanted)
+
+def is_category_unwanted(category):
+    return settings_store.is_category_unwanted(category)
+
+@instrument.timed
+def set_block_mode(enabled: bool):
+    settings_store.set_block_mode(enabled)
+
+def get_block_mode() -> bool:
+    return settings_store.get_block_mode()
+
+# ---------------- Helpers & Projections ----------------
+@instrument.timed
+def get_month_spent_by_category(year, month, category):
+    row = db.get_conn().execute(
+        "SELECT total_paise / 100.0 FROM monthly_rollup WHERE year_month=? AND category=?",
+        (f"{year}-{month:02d}", category)).fetchone()
+    return row[0] if row else 0
+
+@instrument.timed
+def get_pre_add_figures(year, month, category):
+    # Everything check_before_add_expense needs, gathered in one call so the
+    # GUI can fetch it off the main thread.
+    return {
+        "cat_limit": get_category_limit(category),
+        "cat_spent": get_month_spent_by_category(year, month, category),
+        "blocked": is_category_unwanted(category) and get_block_mode(),
+        "budget": get_budget(),
+        "spent": get_total_expenses_for_month(year, month),
+    }
+
+@instrument.timed
+def projected_month_end_spend(year, month):
+    # Seasonal per-category forecast; see forecast.py
+    import forecast
+    history = forecast.load_history()
+    return float(forecast.forecast_month(history, year, month)["projected"].sum())
+
+@instrument.timed
+def recommend_actions_for_month(year, month):
+    import forecast
+    return forecast.build_suggestions(year, month, get_budget(),
+                                      settings_store.unwanted_categories(),
+                                      settings_store.category_limits())
@@ -0,0 +1,179 @@
+import calendar
+import datetime
+import sys
+
+import numpy as np
+
+import db
+import snapshot
+
+# ---------------- Pivot Reports ----------------
+# Group-bys over the columnar snapshot, computed with NumPy instead of SQL:
+# every row gets an integer code per dimension, the codes are combined into
+# one flat cell index and np.bincount sums (or counts) each cell in a single
+# pass.  Any mix of dimensions works, e.g. ("category", "month") for a
+# category-by-month table or ("weekday", "month_of_year") for a heatmap.
+#
+# Time buckets (day, week, month, quarter, year) cover every bucket from the
+# first to the last row, empty ones included, so series have no gaps.
+# Cyclic dimensions (weekday, day_of_month, month_of_year) always have all
+# their values.  Categories are those present, by name.
+
+WEEKDAYS = list(calendar.day_abbr)               # Mon .. Sun
+MONTHS = list(calendar.month_abbr)[1:]           # Jan .. Dec
+AGGREGATES = ("sum", "count", "mean")
+EPOCH = datetime.date(1970, 1, 1)
+
+
+class Pivot:
+    """Aggregated values in an N-d array, with one list of labels per dimension."""
+
+    def __init__(self, dims, labels, values, agg):
+        self.dims = dims
+        self.labels = labels
+        self.values = values
+        self.agg = agg
+
+    def total(self, dim):
+        """Sum the values over one dimension (sums and counts only)."""
+        axis = self.dims.index(dim)
+        return Pivot(self.dims[:axis] + self.dims[axis + 1:], self.labels[:axis] + self.labels[axis + 1:],
+                     self.values.sum(axis=axis), self.agg)
+
+    def table(self):
+        """(headers, rows) for a table or spreadsheet.
+
+        One and two dimensions lay out as a list / cross-tab; more are
+        flattened to one row per cell with a column per dimension.
+        """
+        if len(self.dims) == 2:
+            headers = [f"{self.dims[0]} / {self.dims[1]}"] + [str(c) for c in self.labels[1]]
+            return headers, [[label] + [_cell(v) for v in row] for label, row in zip(self.labels[0], self.values)]
+        headers = list(self.dims) + [self.agg]
+        rows = []
+        for index in np.ndindex(*self.values.shape):
+            rows.append([self.labels[d][i] for d, i in enumerate(index)] + [_cell(self.values[index])])
+        return headers, rows
+
+
+def _cell(value):
+    return round(float(value), 2)
+
+
+def _date(day):
+    return (EPOCH + datetime.timedelta(days=int(day))).isoformat()
+
+
+def _time_codes(days, unit):
+    # Integer bucket per row (days/weeks/months/... since 1970) for time buckets.
+    if unit == "day":
+        return days.astype(np.int64)
+    if unit == "week":
+        return (days.astype(np.int64) + 3) // 7        # 1970-01-01 was a Thursday: weeks start on Monday
+    months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    return {"month": months, "quarter": months // 3, "year": months // 12}[unit]
+
+
+def _time_label(code, unit):
+    if unit == "day":
+        return _date(code)
+    if unit == "week":
+        return _date(code * 7 - 3)
+    if unit == "month":
+        return f"{1970 + code // 12}-{code % 12 + 1:02d}"
+    if unit == "quarter":
+        return f"{1970 + code // 4}-Q{code % 4 + 1}"
+    return str(1970 + code)
+
+
+def _codes(snap, days, categories, dim):
+    """(codes from 0, labels) for one dimension of the selected rows."""
+    if dim == "category":
+        present, codes = np.unique(categories, return_inverse=True)
+        names = [snap.categories.get(int(c), str(c)) for c in present]
+        order = np.argsort(names, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        return rank[codes], [names[i] for i in order]
+    if dim == "weekday":
+        return (days.astype(np.int64) + 3) % 7, WEEKDAYS
+    if dim == "month_of_year":
+        return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) % 12, MONTHS
+    if dim == "day_of_month":
+        d = days.astype("datetime64[D]")
+        return (d - d.astype("datetime64[M]")).astype(np.int64), list(range(1, 32))
+    if dim in ("day", "week", "month", "quarter", "year"):
+        codes = _time_codes(days, dim)
+        first = int(codes.min()) if len(codes) else 0
+        last = int(codes.max()) if len(codes) else -1
+        return codes - first, [_time_label(c, dim) for c in range(first, last + 1)]
+    raise ValueError(f"Unknown pivot dimension: {dim}")
+
+
+def _day_number(date):
+    return (datetime.date.fromisoformat(date) - EPOCH).days
+
+
+def group_by(dims, agg="sum", start=None, end=None, categories=None, snap=None):
+    """Aggregate amounts over any combination of dimensions and return a Pivot.
+
+    dims: names from category, day, week, month, quarter, year, weekday,
+    day_of_month, month_of_year.  agg: sum or mean of the amounts (rupees),
+    or count of expenses.  start/end (YYYY-MM-DD, inclusive) and categories
+    (names) restrict the rows.  snap defaults to a freshly refreshed snapshot.
+    """
+    if agg not in AGGREGATES:
+        raise ValueError(f"Unknown aggregate: {agg}")
+    dims = tuple(dims)
+    if snap is None:
+        snap = snapshot.refresh()
+    days, cats, paise = snap["day"], snap["category"], snap["amount_paise"]
+    mask = np.ones(len(snap), dtype=bool)
+    if start:
+        mask &= days >= _day_number(start)
+    if end:
+        mask &= days <= _day_number(end)
+    if categories:
+        ids = [i for i, name in snap.categories.items() if name in set(categories)]
+        mask &= np.isin(cats, ids)
+    if not mask.all():
+        days, cats, paise = days[mask], cats[mask], paise[mask]
+
+    codes, labels = zip(*(_codes(snap, days, cats, dim) for dim in dims)) if dims else ((), ())
+    shape = tuple(len(l) for l in labels)
+    cells = int(np.prod(shape))
+    flat = np.ravel_multi_index(codes, shape) if dims else np.zeros(len(days), dtype=np.int64)
+    counts = np.bincount(flat, minlength=cells)
+    if agg == "count":
+        values = counts
+    else:
+        values = np.bincount(flat, weights=paise, minlength=cells) / 100.0
+        if agg == "mean":
+            values = np.divide(values, counts, out=np.zeros(cells), where=counts > 0)
+    return Pivot(dims, list(labels), values.reshape(shape), agg)
+
+
+# ---- Ready-made reports ----
+def category_by_month(start=None, end=None, snap=None):
+    """Spend per category (rows) and month (columns)."""
+    return group_by(("category", "month"), start=start, end=end, snap=snap)
+
+
+def weekday_heatmap(by="month_of_year", agg="mean", start=None, end=None, snap=None):
+    """Spend per weekday (rows) against `by` (columns); mean spend per expense by default."""
+    return group_by(("weekday", by), agg=agg, start=start, end=end, snap=snap)
+
+
+def year_over_year(categories=None, snap=None):
+    """Spend per month of the year (rows) for each year (columns)."""
+    return group_by(("month_of_year", "year"), categories=categories, snap=snap)
+
+
+if __name__ == "__main__":
+    # python pivot.py [expenses.db] -- print the category-by-month pivot
+    if len(sys.argv) > 1:
+        db.set_db_path(sys.argv[1])
+    headers, rows = category_by_month().table()
+    print("\t".join(headers))
+    for row in rows:
+        print("\t".join(str(v) for v in row))
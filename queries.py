@@ -0,0 +1,150 @@
+import re
+
+import archive
+import db
+import instrument
+
+# ---------------- Expense Queries ----------------
+# Reading expenses back: filtered and paged fetches for the table, counts,
+# and chunked iteration for exports, over the hot table plus any archives a
+# date range reaches, or over the full-text index for searches.  Kept apart
+# from the GUI so report worker processes can use them without Tk.
+
+EXPORT_CHUNK_SIZE = 5000
+
+
+def search_terms(text):
+    # Each word of the search box becomes a quoted prefix term ("gro"*), and
+    # FTS5 ANDs the terms together.  Quoting keeps FTS syntax characters inert.
+    words = re.findall(r"\w+", text or "")
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def search_tiers(text):
+    # Relevance tiers for a search: expenses whose description matches every
+    # term, then those that match only through their category.  Scoring every
+    # match with bm25 costs ~300 ms for a common word on a million rows, while
+    # each tier streams from the index newest first and stops after a page.
+    terms = search_terms(text)
+    if not terms:
+        return ()
+    return (f"{{description}} : ({terms})", f"({terms}) NOT {{description}} : ({terms})")
+
+
+def _expense_query(filters=None, limit=None, after=None, before=None, offset=None,
+                   columns="id, amount, category, description, date", match=None,
+                   source="expenses", bounds=(None, None)):
+    # match: an FTS5 query; defaults to the filters' "text" (all tiers).
+    # source/bounds: the table or archive view to read and a date range
+    # limiting it to one archive segment (see _query_parts).
+    match = match or (search_terms(filters.get("text")) if filters else "")
+    if match:
+        query = f"""SELECT {columns} FROM (SELECT rowid AS match_id FROM expenses_fts
+                                             WHERE expenses_fts MATCH ?)
+                    CROSS JOIN expenses ON id = match_id WHERE 1=1"""
+        params = [match]
+    else:
+        query = f"SELECT {columns} FROM {source} WHERE 1=1"
+        params = []
+        for op, bound in zip((">=", "<="), bounds):
+            if bound:
+                query += f" AND date {op} ?"
+                params.append(bound)
+
+    if filters:
+        if filters.get("from_date"):
+            query += " AND date >= ?"
+            params.append(filters["from_date"])
+        if filters.get("to_date"):
+            query += " AND date <= ?"
+            params.append(filters["to_date"])
+        if filters.get("category") and filters["category"] != "All":
+            query += " AND category_id = (SELECT id FROM categories WHERE name = ?)"
+            params.append(filters["category"])
+
+    if match:
+        # Newest first, read straight off the full-text index in rowid order.
+        query += " ORDER BY match_id DESC"
+    else:
+        if after:
+            query += " AND (date, id) > (?, ?)"
+            params.extend(after)
+        if before:
+            query += " AND (date, id) < (?, ?) ORDER BY date DESC, id DESC"
+            params.extend(before)
+        else:
+            query += " ORDER BY date, id"
+    if limit or offset:
+        query += " LIMIT ? OFFSET ?"
+        params.extend((limit or -1, offset or 0))
+    return query, params
+
+
+def _query_parts(conn, filters=None, after=None, before=None):
+    # The pieces a read is made of, in result order, as (archive years,
+    # _expense_query arguments): one per search tier for text searches
+    # (the hot file only), otherwise one per archive segment the date range
+    # reaches -- usually just the hot table.
+    filters = filters or {}
+    tiers = search_tiers(filters.get("text"))
+    if tiers:
+        return [((), {"match": match}) for match in tiers]
+    parts = []
+    for lo, hi, years in archive.segments(conn, filters.get("from_date"), filters.get("to_date")):
+        if (after and hi and hi < after[0]) or (before and lo and lo > before[0]):
+            continue
+        parts.append((years, {"bounds": (lo, hi)}))
+    return parts[::-1] if before else parts
+
+
+@instrument.timed
+def fetch_expenses(filters=None, limit=None, after=None, before=None, offset=None):
+    # Rows come back ordered by (date, id).  For paging pass limit plus the
+    # (date, id) of the last row seen as after=, or of the first row as before=.
+    # A "text" filter searches descriptions and categories instead; those rows
+    # come back ranked (see search_tiers) and are paged with limit and offset.
+    # Date ranges reaching into archived years read the archives too.
+    conn = db.get_conn()
+    rows = []
+    for years, part in _query_parts(conn, filters, after, before):
+        source = archive.attach(conn, years)
+        query, params = _expense_query(filters, limit and limit - len(rows), after, before, offset,
+                                       source=source, **part)
+        page = conn.execute(query, params).fetchall()
+        rows += page
+        if limit and len(rows) >= limit:
+            break
+        # The next part starts where this one ran out.
+        if offset and not page:
+            query, params = _expense_query(filters, columns="COUNT(*)", source=source, **part)
+            offset -= conn.execute(query, params).fetchone()[0]
+        else:
+            offset = 0
+    if before and not search_tiers((filters or {}).get("text")):
+        rows.reverse()
+    return rows
+
+
+@instrument.timed
+def count_expenses(filters=None):
+    conn = db.get_conn()
+    total = 0
+    for years, part in _query_parts(conn, filters):
+        query, params = _expense_query(filters, columns="COUNT(*)", source=archive.attach(conn, years), **part)
+        total += conn.execute(query, params).fetchone()[0]
+    return total
+
+
+@instrument.timed
+def iter_expenses(filters=None, chunk_size=EXPORT_CHUNK_SIZE):
+    # Same rows, order and filters as fetch_expenses, read from a cursor a
+    # chunk at a time so exports never hold the whole table in memory.
+    conn = db.get_conn()
+    for years, part in _query_parts(conn, filters):
+        query, params = _expense_query(filters, source=archive.attach(conn, years), **part)
+        cur = conn.execute(query, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
@@ -0,0 +1,38 @@
+import datetime
+import functools
+import math
+
+# ---------------- Expense Record Rules ----------------
+# Shared by the Add Expense form and the bulk importer so both accept and
+# reject exactly the same input.
+
+MAX_PAISE = 2 ** 63 - 1     # SQLite INTEGER range
+
+CATEGORIES = ["Food", "Travel", "Shopping", "Bills", "Medical", "Trip", "Dress", "Cosmetics", "JunkFood", "Other"]
+
+
+def parse_amount(text):
+    """Return the amount as a float, or raise ValueError("Invalid amount.")."""
+    try:
+        amount = float(text)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("Invalid amount.") from None
+    # "nan", "inf" and "1e400" all parse; none of them is a sum of money.
+    if not math.isfinite(amount) or amount <= 0 or to_paise(amount) > MAX_PAISE:
+        raise ValueError("Invalid amount.")
+    return amount
+
+
+def to_paise(amount):
+    """Amount in rupees -> whole paise, as stored in expense_rows.amount_paise."""
+    return round(amount * 100)
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_date(text, date_format="%Y-%m-%d"):
+    """Return the date as YYYY-MM-DD, or raise ValueError("Date must be YYYY-MM-DD.")."""
+    try:
+        parsed = datetime.datetime.strptime(text, date_format)
+    except (TypeError, ValueError):
+        raise ValueError("Date must be YYYY-MM-DD.") from None
+    return parsed.strftime("%Y-%m-%d")
@@ -0,0 +1,68 @@
+import threading
+
+import db
+
+# ---------------- Report Aggregates ----------------
+# The series behind the charts are read from monthly_rollup once and kept in
+# memory until a write touches them: adding an expense drops only its month,
+# deletes and imports drop everything.  A generation counter stops a query
+# that was already running when the data changed from caching a stale result.
+
+_lock = threading.RLock()
+_path = None
+_generation = 0
+_months = None          # [(year_month, total)] for every month with spend, oldest first
+_by_category = {}       # year_month -> [(category, total)]
+
+
+def invalidate(year_month=None):
+    """Forget cached aggregates for one month (YYYY-MM), or all of them."""
+    global _generation, _months
+    with _lock:
+        _generation += 1
+        _months = None
+        if year_month is None:
+            _by_category.clear()
+        else:
+            _by_category.pop(year_month, None)
+
+
+def _snapshot():
+    # Start over after db.set_db_path() points the app at another file.
+    global _path
+    if _path != db.DB_PATH:
+        _path = db.DB_PATH
+        invalidate()
+    return _generation
+
+
+def category_totals(year_month):
+    """[(category, total)] for one month, in category order so the pie keeps its wedges."""
+    with _lock:
+        generation = _snapshot()
+        cached = _by_category.get(year_month)
+    if cached is not None:
+        return cached
+    rows = db.get_conn().execute("""SELECT category, total_paise / 100.0 FROM monthly_rollup
+                                    WHERE year_month=? AND total_paise > 0 ORDER BY category""",
+                                 (year_month,)).fetchall()
+    with _lock:
+        if generation == _generation:
+            _by_category[year_month] = rows
+    return rows
+
+
+def monthly_totals(months=None):
+    """[(year_month, total)] for the last `months` months with spend (all when None), oldest first."""
+    global _months
+    with _lock:
+        generation = _snapshot()
+        series = _months
+    if series is None:
+        series = db.get_conn().execute("""SELECT year_month, SUM(total_paise) / 100.0 FROM monthly_rollup
+                                          GROUP BY year_month HAVING SUM(total_paise) > 0
+                                          ORDER BY year_month""").fetchall()
+        with _lock:
+            if generation == _generation:
+                _months = series
+    return series[-months:] if months else series
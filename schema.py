@@ -0,0 +1,530 @@
+import sqlite3
+import sys
+from contextlib import contextmanager
+
+from records import CATEGORIES
+
+# ---------------- Schema Migrations ----------------
+# The schema version lives in PRAGMA user_version.  Each entry in MIGRATIONS
+# upgrades the database by one version and runs inside its own transaction,
+# so an existing expenses.db is upgraded in place the next time the app
+# starts and a failed step leaves the file at the previous version.
+
+if sqlite3.sqlite_version_info < (3, 31, 0):
+    raise RuntimeError(f"SQLite 3.31 or newer is required (found {sqlite3.sqlite_version}).")
+
+
+def _v1_base_tables(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS expenses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    amount REAL NOT NULL,
+                    category TEXT NOT NULL,
+                    description TEXT,
+                    date TEXT NOT NULL
+                )""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS settings (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )""")
+
+
+def _v2_month_key_and_indexes(conn):
+    # Dates are always stored as YYYY-MM-DD, so the first seven characters are
+    # the month.  A generated column lets month filters use an index instead of
+    # evaluating strftime() against every row.
+    conn.execute("""ALTER TABLE expenses ADD COLUMN year_month TEXT
+                    GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_category_date ON expenses (category, date)")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_expenses_month_category_amount
+                    ON expenses (year_month, category, amount)""")
+
+
+def rebuild_rollup(conn, from_month=None, to_month=None):
+    """Recompute monthly_rollup and daily_rollup from the raw expenses (repairs drift).
+
+    With from_month/to_month (YYYY-MM) only that range of months is rebuilt.
+    Months of archived years are never touched: their expenses have moved to
+    archive files (see archive.py) and the rollups are their only summary here.
+    """
+    first_hot = _first_hot_month(conn)
+    if first_hot:
+        from_month = max(from_month or first_hot, first_hot)
+        to_month = to_month or "9999-12"
+    month_where = day_where = ""
+    month_params = day_params = ()
+    if from_month and to_month:
+        month_where, month_params = " WHERE year_month BETWEEN ? AND ?", (from_month, to_month)
+        day_where, day_params = " WHERE date BETWEEN ? AND ?", (from_month + "-01", to_month + "-31")
+    conn.execute("DELETE FROM monthly_rollup" + month_where, month_params)
+    conn.execute(f"""INSERT INTO monthly_rollup (year_month, category, total_paise, count)
+                     SELECT year_month, name, SUM(amount_paise), COUNT(*)
+                     FROM expense_rows JOIN categories ON categories.id = category_id{month_where}
+                     GROUP BY year_month, category_id""", month_params)
+    conn.execute("DELETE FROM daily_rollup" + day_where, day_params)
+    conn.execute(f"""INSERT INTO daily_rollup (date, category, total_paise)
+                     SELECT date, name, SUM(amount_paise)
+                     FROM expense_rows JOIN categories ON categories.id = category_id{day_where}
+                     GROUP BY date, category_id""", day_params)
+
+
+def _first_hot_month(conn):
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'archives'").fetchone():
+        return None
+    year = conn.execute("SELECT MAX(year) FROM archives").fetchone()[0]
+    return f"{year + 1}-01" if year else None
+
+
+def add_to_rollup(conn, after_id):
+    """Add expenses with id > after_id to the rollups in one grouped pass (after a bulk load)."""
+    conn.execute("""INSERT INTO monthly_rollup (year_month, category, total_paise, count)
+                    SELECT year_month, name, SUM(amount_paise), COUNT(*)
+                    FROM expense_rows JOIN categories ON categories.id = category_id
+                    WHERE expense_rows.id > ? GROUP BY year_month, category_id
+                    ON CONFLICT (year_month, category)
+                    DO UPDATE SET total_paise = total_paise + excluded.total_paise,
+                                  count = count + excluded.count""", (after_id,))
+    conn.execute("""INSERT INTO daily_rollup (date, category, total_paise)
+                    SELECT date, name, SUM(amount_paise)
+                    FROM expense_rows JOIN categories ON categories.id = category_id
+                    WHERE expense_rows.id > ? GROUP BY date, category_id
+                    ON CONFLICT (date, category) DO UPDATE SET total_paise = total_paise + excluded.total_paise""",
+                 (after_id,))
+
+
+def remove_from_rollup(conn, rows):
+    """Subtract (amount_paise, category, date) rows deleted outside expense_rows (from an archive)."""
+    rows = list(rows)
+    conn.executemany("""UPDATE monthly_rollup SET total_paise = total_paise - ?, count = count - 1
+                        WHERE year_month = substr(?, 1, 7) AND category = ?""",
+                     [(paise, date, category) for paise, category, date in rows])
+    conn.execute("DELETE FROM monthly_rollup WHERE count <= 0")
+    conn.executemany("UPDATE daily_rollup SET total_paise = total_paise - ? WHERE date = ? AND category = ?",
+                     [(paise, date, category) for paise, category, date in rows])
+
+
+def category_id(conn, name):
+    """The id of category `name`, adding it to the categories table if it is new."""
+    row = conn.execute("SELECT id FROM categories WHERE name = ?", (name,)).fetchone()
+    if row:
+        return row[0]
+    return conn.execute("INSERT INTO categories (name) VALUES (?)", (name,)).lastrowid
+
+
+def category_ids(conn):
+    """{name: id} for every known category (for bulk loads)."""
+    return dict(conn.execute("SELECT name, id FROM categories"))
+
+
+@contextmanager
+def triggers_suspended(conn, *names):
+    """Drop the named triggers for the duration of the block, then recreate them.
+
+    Must run inside a transaction so other connections never see the table
+    without its triggers.  Used by bulk loads, which refresh the derived
+    tables once at the end instead of once per row.
+    """
+    placeholders = ", ".join("?" * len(names))
+    saved = conn.execute(f"SELECT name, sql FROM sqlite_master WHERE type='trigger' AND name IN ({placeholders})",
+                         names).fetchall()
+    for name, _ in saved:
+        conn.execute(f"DROP TRIGGER {name}")
+    try:
+        yield
+    finally:
+        for _, sql in saved:
+            conn.execute(sql)
+
+
+def _v3_monthly_rollup(conn):
+    # Per month/category totals kept current by triggers, so the budget bar,
+    # pre-add checks and reports read a handful of rows instead of summing
+    # every expense.
+    conn.execute("""CREATE TABLE IF NOT EXISTS monthly_rollup (
+                    year_month TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    total REAL NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (year_month, category)
+                ) WITHOUT ROWID""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS trg_rollup_insert AFTER INSERT ON expenses BEGIN
+                        INSERT INTO monthly_rollup (year_month, category, total, count)
+                        VALUES (NEW.year_month, NEW.category, NEW.amount, 1)
+                        ON CONFLICT (year_month, category)
+                        DO UPDATE SET total = total + excluded.total, count = count + 1;
+                    END""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS trg_rollup_delete AFTER DELETE ON expenses BEGIN
+                        UPDATE monthly_rollup SET total = total - OLD.amount, count = count - 1
+                        WHERE year_month = OLD.year_month AND category = OLD.category;
+                        DELETE FROM monthly_rollup
+                        WHERE year_month = OLD.year_month AND category = OLD.category AND count <= 0;
+                    END""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS trg_rollup_update
+                    AFTER UPDATE OF amount, category, date ON expenses BEGIN
+                        UPDATE monthly_rollup SET total = total - OLD.amount, count = count - 1
+                        WHERE year_month = OLD.year_month AND category = OLD.category;
+                        DELETE FROM monthly_rollup
+                        WHERE year_month = OLD.year_month AND category = OLD.category AND count <= 0;
+                        INSERT INTO monthly_rollup (year_month, category, total, count)
+                        VALUES (NEW.year_month, NEW.category, NEW.amount, 1)
+                        ON CONFLICT (year_month, category)
+                        DO UPDATE SET total = total + excluded.total, count = count + 1;
+                    END""")
+    conn.execute("""INSERT INTO monthly_rollup (year_month, category, total, count)
+                    SELECT year_month, category, SUM(amount), COUNT(*)
+                    FROM expenses GROUP BY year_month, category""")
+
+
+def _v4_import_key(conn):
+    # Dedupe key for rows written by the bulk importer; hand-entered expenses
+    # leave it NULL and are not constrained.
+    conn.execute("ALTER TABLE expenses ADD COLUMN import_key TEXT")
+    conn.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_import_key
+                    ON expenses (import_key) WHERE import_key IS NOT NULL""")
+
+
+def _v5_category_rules(conn):
+    # Typed per-category rules replace the limit_<category> and
+    # unwanted_<category> rows of the key/value settings table.
+    conn.execute("""CREATE TABLE IF NOT EXISTS category_rules (
+                    category TEXT PRIMARY KEY,
+                    monthly_limit REAL,
+                    unwanted INTEGER NOT NULL DEFAULT 0
+                )""")
+    conn.execute("""INSERT INTO category_rules (category, monthly_limit)
+                    SELECT substr(key, 7), CAST(value AS REAL) FROM settings WHERE key LIKE 'limit\\_%' ESCAPE '\\'""")
+    conn.execute("""INSERT INTO category_rules (category, unwanted)
+                    SELECT substr(key, 10), value = '1' FROM settings WHERE key LIKE 'unwanted\\_%' ESCAPE '\\'
+                    ON CONFLICT (category) DO UPDATE SET unwanted = excluded.unwanted""")
+    conn.execute("DELETE FROM settings WHERE key LIKE 'limit\\_%' ESCAPE '\\' OR key LIKE 'unwanted\\_%' ESCAPE '\\'")
+
+
+def _v6_daily_rollup(conn):
+    # Daily per-category totals for the forecast engine, which loads the whole
+    # history in one query.  The rollup triggers now maintain both tables.
+    conn.execute("""CREATE TABLE IF NOT EXISTS daily_rollup (
+                    date TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    total REAL NOT NULL,
+                    PRIMARY KEY (date, category)
+                ) WITHOUT ROWID""")
+    for name in ("trg_rollup_insert", "trg_rollup_delete", "trg_rollup_update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    add_new = """INSERT INTO monthly_rollup (year_month, category, total, count)
+                 VALUES (NEW.year_month, NEW.category, NEW.amount, 1)
+                 ON CONFLICT (year_month, category)
+                 DO UPDATE SET total = total + excluded.total, count = count + 1;
+                 INSERT INTO daily_rollup (date, category, total)
+                 VALUES (NEW.date, NEW.category, NEW.amount)
+                 ON CONFLICT (date, category) DO UPDATE SET total = total + excluded.total;"""
+    remove_old = """UPDATE monthly_rollup SET total = total - OLD.amount, count = count - 1
+                    WHERE year_month = OLD.year_month AND category = OLD.category;
+                    DELETE FROM monthly_rollup
+                    WHERE year_month = OLD.year_month AND category = OLD.category AND count <= 0;
+                    UPDATE daily_rollup SET total = total - OLD.amount
+                    WHERE date = OLD.date AND category = OLD.category;"""
+    conn.execute(f"CREATE TRIGGER trg_rollup_insert AFTER INSERT ON expenses BEGIN {add_new} END")
+    conn.execute(f"CREATE TRIGGER trg_rollup_delete AFTER DELETE ON expenses BEGIN {remove_old} END")
+    conn.execute(f"""CREATE TRIGGER trg_rollup_update AFTER UPDATE OF amount, category, date ON expenses
+                     BEGIN {remove_old} {add_new} END""")
+    conn.execute("""INSERT INTO daily_rollup (date, category, total)
+                    SELECT date, category, SUM(amount) FROM expenses GROUP BY date, category""")
+
+
+def _v7_search_index(conn):
+    # Full-text index over description and category for the search box.  It is
+    # an external-content table: the text stays in expenses and the index
+    # holds only tokens, kept in step by triggers.  Prefix indexes make
+    # search-as-you-type prefixes ("gro*") as cheap as whole words.
+    try:
+        conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5(
+                        description, category,
+                        content='expenses', content_rowid='id',
+                        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                    )""")
+    except sqlite3.OperationalError as e:
+        raise RuntimeError(f"This SQLite build lacks FTS5, which expense search needs ({e}).") from None
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS trg_fts_insert AFTER INSERT ON expenses BEGIN
+                        INSERT INTO expenses_fts (rowid, description, category)
+                        VALUES (NEW.id, NEW.description, NEW.category);
+                    END""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS trg_fts_delete AFTER DELETE ON expenses BEGIN
+                        INSERT INTO expenses_fts (expenses_fts, rowid, description, category)
+                        VALUES ('delete', OLD.id, OLD.description, OLD.category);
+                    END""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS trg_fts_update AFTER UPDATE OF description, category ON expenses BEGIN
+                        INSERT INTO expenses_fts (expenses_fts, rowid, description, category)
+                        VALUES ('delete', OLD.id, OLD.description, OLD.category);
+                        INSERT INTO expenses_fts (rowid, description, category)
+                        VALUES (NEW.id, NEW.description, NEW.category);
+                    END""")
+    rebuild_search_index(conn)
+
+
+def rebuild_search_index(conn, after_id=None):
+    """Re-index every expense, or with after_id only those with a larger id (after a bulk load)."""
+    if after_id is None:
+        conn.execute("INSERT INTO expenses_fts (expenses_fts) VALUES ('rebuild')")
+    else:
+        conn.execute("""INSERT INTO expenses_fts (rowid, description, category)
+                        SELECT id, description, category FROM expenses WHERE id > ?""", (after_id,))
+
+
+def _v8_archives(conn):
+    # Closed years can be moved out to per-year archive files (archive.py).
+    # The hot file records which years are archived, and keeps the import keys
+    # of archived rows so re-importing an old statement still skips them.
+    conn.execute("""CREATE TABLE IF NOT EXISTS archives (
+                    year INTEGER PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    rows INTEGER NOT NULL,
+                    archived_at TEXT NOT NULL
+                )""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS archived_import_keys (
+                    import_key TEXT PRIMARY KEY
+                ) WITHOUT ROWID""")
+
+
+def _v9_compact_storage(conn):
+    # Amounts become INTEGER paise (exact sums, no REAL drift) and categories
+    # become small integer ids into a categories table, which shrinks every
+    # row and the category indexes.  The rows move to expense_rows; a view
+    # named expenses shows them in the old shape (amount in rupees, category
+    # by name), so every read query is unchanged.  Writes go to expense_rows.
+    # The rollups keep category names but total in paise as well.
+    conn.execute("""CREATE TABLE categories (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE
+                )""")
+    conn.executemany("INSERT INTO categories (name) VALUES (?)", [(c,) for c in CATEGORIES])
+    conn.execute("""INSERT OR IGNORE INTO categories (name)
+                    SELECT DISTINCT category FROM expenses UNION SELECT category FROM category_rules""")
+
+    for name in ("trg_rollup_insert", "trg_rollup_delete", "trg_rollup_update",
+                 "trg_fts_insert", "trg_fts_delete", "trg_fts_update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.execute("""CREATE TABLE expense_rows (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    amount_paise INTEGER NOT NULL,
+                    category_id INTEGER NOT NULL REFERENCES categories (id),
+                    description TEXT,
+                    date TEXT NOT NULL,
+                    year_month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL,
+                    import_key TEXT
+                )""")
+    conn.execute("""INSERT INTO expense_rows (id, amount_paise, category_id, description, date, import_key)
+                    SELECT e.id, CAST(ROUND(e.amount * 100) AS INTEGER), c.id, e.description, e.date, e.import_key
+                    FROM expenses e JOIN categories c ON c.name = e.category ORDER BY e.id""")
+    # Keep AUTOINCREMENT from reusing the ids of deleted rows.
+    conn.execute("""UPDATE sqlite_sequence SET seq = MAX(seq, (SELECT seq FROM sqlite_sequence WHERE name = 'expenses'))
+                    WHERE name = 'expense_rows'""")
+    conn.execute("""INSERT INTO sqlite_sequence (name, seq)
+                    SELECT 'expense_rows', seq FROM sqlite_sequence WHERE name = 'expenses'
+                    AND NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'expense_rows')""")
+    conn.execute("DROP TABLE expenses")
+    conn.execute("CREATE INDEX idx_expense_rows_date ON expense_rows (date)")
+    conn.execute("CREATE INDEX idx_expense_rows_category_date ON expense_rows (category_id, date)")
+    conn.execute("""CREATE INDEX idx_expense_rows_month_category_amount
+                    ON expense_rows (year_month, category_id, amount_paise)""")
+    conn.execute("""CREATE UNIQUE INDEX idx_expense_rows_import_key
+                    ON expense_rows (import_key) WHERE import_key IS NOT NULL""")
+    conn.execute("""CREATE VIEW expenses AS
+                    SELECT expense_rows.id, amount_paise / 100.0 AS amount, name AS category,
+                           description, date, year_month, import_key, category_id
+                    FROM expense_rows JOIN categories ON categories.id = category_id""")
+
+    # Rollups: carry archived months over (rounded to paise), then recompute
+    # the rest exactly from the rows.
+    for table, key in (("monthly_rollup", "year_month"), ("daily_rollup", "date")):
+        conn.execute(f"ALTER TABLE {table} RENAME TO {table}_v8")
+    conn.execute("""CREATE TABLE monthly_rollup (
+                    year_month TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    total_paise INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (year_month, category)
+                ) WITHOUT ROWID""")
+    conn.execute("""CREATE TABLE daily_rollup (
+                    date TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    total_paise INTEGER NOT NULL,
+                    PRIMARY KEY (date, category)
+                ) WITHOUT ROWID""")
+    conn.execute("""INSERT INTO monthly_rollup
+                    SELECT year_month, category, CAST(ROUND(total * 100) AS INTEGER), count FROM monthly_rollup_v8""")
+    conn.execute("""INSERT INTO daily_rollup
+                    SELECT date, category, CAST(ROUND(total * 100) AS INTEGER) FROM daily_rollup_v8""")
+    conn.execute("DROP TABLE monthly_rollup_v8")
+    conn.execute("DROP TABLE daily_rollup_v8")
+    rebuild_rollup(conn)
+
+    name_of = "(SELECT name FROM categories WHERE id = {}.category_id)"
+    new_name, old_name = name_of.format("NEW"), name_of.format("OLD")
+    add_new = f"""INSERT INTO monthly_rollup (year_month, category, total_paise, count)
+                  VALUES (NEW.year_month, {new_name}, NEW.amount_paise, 1)
+                  ON CONFLICT (year_month, category)
+                  DO UPDATE SET total_paise = total_paise + excluded.total_paise, count = count + 1;
+                  INSERT INTO daily_rollup (date, category, total_paise)
+                  VALUES (NEW.date, {new_name}, NEW.amount_paise)
+                  ON CONFLICT (date, category) DO UPDATE SET total_paise = total_paise + excluded.total_paise;"""
+    remove_old = f"""UPDATE monthly_rollup SET total_paise = total_paise - OLD.amount_paise, count = count - 1
+                     WHERE year_month = OLD.year_month AND category = {old_name};
+                     DELETE FROM monthly_rollup
+                     WHERE year_month = OLD.year_month AND category = {old_name} AND count <= 0;
+                     UPDATE daily_rollup SET total_paise = total_paise - OLD.amount_paise
+                     WHERE date = OLD.date AND category = {old_name};"""
+    conn.execute(f"CREATE TRIGGER trg_rollup_insert AFTER INSERT ON expense_rows BEGIN {add_new} END")
+    conn.execute(f"CREATE TRIGGER trg_rollup_delete AFTER DELETE ON expense_rows BEGIN {remove_old} END")
+    conn.execute(f"""CREATE TRIGGER trg_rollup_update AFTER UPDATE OF amount_paise, category_id, date ON expense_rows
+                     BEGIN {remove_old} {add_new} END""")
+
+    # The search index's content table is now the expenses view; its tokens
+    # are unchanged, only the triggers move to expense_rows.
+    index_new = f"""INSERT INTO expenses_fts (rowid, description, category)
+                    VALUES (NEW.id, NEW.description, {new_name});"""
+    unindex_old = f"""INSERT INTO expenses_fts (expenses_fts, rowid, description, category)
+                      VALUES ('delete', OLD.id, OLD.description, {old_name});"""
+    conn.execute(f"CREATE TRIGGER trg_fts_insert AFTER INSERT ON expense_rows BEGIN {index_new} END")
+    conn.execute(f"CREATE TRIGGER trg_fts_delete AFTER DELETE ON expense_rows BEGIN {unindex_old} END")
+    conn.execute(f"""CREATE TRIGGER trg_fts_update AFTER UPDATE OF description, category_id ON expense_rows
+                     BEGIN {unindex_old} {index_new} END""")
+
+    # Archives written before this version keep the old layout until
+    # archive.upgrade_archives() converts them (ATTACH cannot run in here).
+    conn.execute("ALTER TABLE archives ADD COLUMN compact INTEGER NOT NULL DEFAULT 0")
+
+
+def _v10_change_log(conn):
+    # One row per expense that changed since this version: a global change
+    # sequence number, when it changed and whether it was deleted (a
+    # tombstone).  Incremental exports (changes.py) read everything past the
+    # seq they last exported; rows older than the log are covered by the
+    # first, full export.
+    conn.execute("""CREATE TABLE expense_changes (
+                    expense_id INTEGER PRIMARY KEY,
+                    seq INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    deleted INTEGER NOT NULL DEFAULT 0
+                )""")
+    conn.execute("CREATE UNIQUE INDEX idx_expense_changes_seq ON expense_changes (seq)")
+    conn.execute("""CREATE TABLE export_watermarks (
+                    target TEXT PRIMARY KEY,
+                    seq INTEGER NOT NULL,
+                    exported_at TEXT NOT NULL
+                )""")
+    record = """INSERT INTO expense_changes (expense_id, seq, updated_at, deleted)
+                VALUES ({row}.id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM expense_changes), datetime('now'), {deleted})
+                ON CONFLICT (expense_id) DO UPDATE
+                SET seq = excluded.seq, updated_at = excluded.updated_at, deleted = excluded.deleted;"""
+    conn.execute(f"""CREATE TRIGGER trg_changes_insert AFTER INSERT ON expense_rows
+                     BEGIN {record.format(row="NEW", deleted=0)} END""")
+    conn.execute(f"""CREATE TRIGGER trg_changes_update AFTER UPDATE ON expense_rows
+                     BEGIN {record.format(row="NEW", deleted=0)} END""")
+    conn.execute(f"""CREATE TRIGGER trg_changes_delete AFTER DELETE ON expense_rows
+                     BEGIN {record.format(row="OLD", deleted=1)} END""")
+
+
+def log_changes(conn, after_id):
+    """Record expenses with id > after_id as changed, in id order (after a bulk load)."""
+    conn.execute("""INSERT INTO expense_changes (expense_id, seq, updated_at)
+                    SELECT id, (SELECT COALESCE(MAX(seq), 0) FROM expense_changes) + ROW_NUMBER() OVER (ORDER BY id),
+                           datetime('now')
+                    FROM expense_rows WHERE id > ?""", (after_id,))
+
+
+def log_deletes(conn, expense_ids):
+    """Record tombstones for expenses deleted outside expense_rows (from an archive)."""
+    conn.executemany("""INSERT INTO expense_changes (expense_id, seq, updated_at, deleted)
+                        VALUES (?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM expense_changes), datetime('now'), 1)
+                        ON CONFLICT (expense_id) DO UPDATE
+                        SET seq = excluded.seq, updated_at = excluded.updated_at, deleted = 1""",
+                     [(i,) for i in expense_ids])
+
+
+MIGRATIONS = [
+    _v1_base_tables,
+    _v2_month_key_and_indexes,
+    _v3_monthly_rollup,
+    _v4_import_key,
+    _v5_category_rules,
+    _v6_daily_rollup,
+    _v7_search_index,
+    _v8_archives,
+    _v9_compact_storage,
+    _v10_change_log,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=SCHEMA_VERSION):
+    """Bring the database up to `target` (default SCHEMA_VERSION), one transaction per step."""
+    version = get_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"Database schema v{version} is newer than this app (v{SCHEMA_VERSION}).")
+    for step in range(version + 1, target + 1):
+        conn.execute("BEGIN")
+        try:
+            MIGRATIONS[step - 1](conn)
+            conn.execute(f"PRAGMA user_version={step}")
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+# ---------------- Query Plan Check ----------------
+# The queries the GUI runs on every action.  None of them may fall back to a
+# full table scan; run `python schema.py` after touching the schema or these
+# queries.  With no argument the plans are checked against a freshly migrated
+# in-memory database, pass a path to check a real file (with its statistics).
+HOT_QUERIES = {
+    "month total": ("SELECT SUM(total_paise) FROM monthly_rollup WHERE year_month = ?", ("2024-01",)),
+    "month category total": ("SELECT total_paise FROM monthly_rollup WHERE year_month = ? AND category = ?",
+                             ("2024-01", "Food")),
+    "month by category": ("SELECT category, total_paise FROM monthly_rollup WHERE year_month = ?",
+                          ("2024-01",)),
+    "raw month by category": ("SELECT category, SUM(amount) FROM expenses WHERE year_month = ? GROUP BY category",
+                              ("2024-01",)),
+    "date range": ("SELECT id, amount, category, description, date FROM expenses WHERE date >= ? AND date <= ?",
+                   ("2024-01-01", "2024-01-31")),
+    "keyset page": ("SELECT id, amount, category, description, date FROM expenses "
+                    "WHERE (date, id) > (?, ?) ORDER BY date, id LIMIT 200", ("2024-01-01", 0)),
+    "category date range": ("SELECT id, amount, category, description, date FROM expenses "
+                            "WHERE date >= ? AND date <= ? "
+                            "AND category_id = (SELECT id FROM categories WHERE name = ?)",
+                            ("2024-01-01", "2024-01-31", "Food")),
+}
+
+
+def check_query_plans(conn):
+    """Return [(name, plan detail)] for every hot query that scans instead of searching."""
+    failures = []
+    for name, (sql, params) in HOT_QUERIES.items():
+        for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+            detail = row[-1]
+            if detail.startswith("SCAN"):
+                failures.append((name, detail))
+    return failures
+
+
+if __name__ == "__main__":
+    # python schema.py [--rebuild-rollup] [path]
+    args = sys.argv[1:]
+    rebuild = "--rebuild-rollup" in args
+    args = [a for a in args if a != "--rebuild-rollup"]
+    conn = sqlite3.connect(args[0] if args else ":memory:")
+    migrate(conn)
+    if rebuild:
+        with conn:
+            rebuild_rollup(conn)
+        print("monthly_rollup and daily_rollup rebuilt")
+    failures = check_query_plans(conn)
+    for name, detail in failures:
+        print(f"FULL SCAN  {name}: {detail}")
+    print(f"{len(HOT_QUERIES) - len({n for n, _ in failures})}/{len(HOT_QUERIES)} hot queries use an index")
+    sys.exit(1 if failures else 0)
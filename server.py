@@ -0,0 +1,398 @@
+import argparse
+import asyncio
+import datetime
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import archive
+import changes
+import db
+import operations
+import queries
+import schema
+import settings_store
+from records import parse_amount, parse_date
+
+# ---------------- API Server ----------------
+# A local HTTP/JSON server so several people can use one expenses.db at once.
+# Each app opening the file directly takes its own write locks, and two
+# writers at once end in "database is locked".  Behind the server only one
+# thread ever writes.
+#
+# Writes (adds, deletes, settings) are queued for a single writer task.  It
+# takes everything waiting in the queue, up to MAX_BATCH, and commits the
+# adds and deletes in one transaction (a group commit).  Many clients adding
+# at once share a commit instead of queueing for one each.  Every write gets
+# its own savepoint, so one bad write fails alone.  Reads run on a pool of
+# reader threads, each with its own connection; WAL lets them read while
+# the writer commits.
+#
+#   GET    /health
+#   GET    /expenses?from_date=&to_date=&category=&text=&limit=&offset=&after=DATE,ID&before=DATE,ID
+#   GET    /expenses/count?from_date=&to_date=&category=&text=
+#   POST   /expenses                {"amount", "category", "description", "date"} -> {"id"}
+#   DELETE /expenses/ID
+#   POST   /expenses/delete         {"ids": [...]}
+#   GET    /budget?year=&month=     -> {"budget", "spent", "block_mode"}
+#   PUT    /budget                  {"amount"}
+#   PUT    /category-limit          {"category", "amount"}
+#   PUT    /unwanted                {"category", "unwanted"}
+#   PUT    /block-mode              {"enabled"}
+#   GET    /pre-add?year=&month=&category=
+#   GET    /suggestions?year=&month=
+#   GET    /changes                 -> {"seq"}: the latest change sequence number
+#   POST   /import                  {"path"} -> the import summary
+#   POST   /archive                 -> {"moved": {year: rows}}
+#   PUT    /export-watermark        {"path", "upto"}
+#
+# Imports, archiving and export watermarks are writes too, so they run on
+# the writer in turn; paths are on the server's machine.  Clients cache
+# report figures and poll /changes to learn when another client's writes
+# made them stale.
+#
+# client.py has a RemoteBackend that ExpenseTrackerApp uses instead of
+# writing the file itself (expense.py --server URL).
+
+HOST, PORT = "127.0.0.1", 8765
+MAX_BATCH = 256             # writes per group commit
+MAX_QUEUE = 10000           # waiting writes before clients are slowed down
+READERS = 4
+MAX_BODY = 1 << 20
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ---- Writer ----
+class WriteQueue:
+    """Single writer: queued writes are committed in batches on one thread."""
+
+    def __init__(self, max_batch=MAX_BATCH):
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue(MAX_QUEUE)
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="writer")
+        self.commits = self.writes = 0
+
+    async def add(self, amount, category, description, date):
+        return await self._submit("add", (amount, category, description, date))
+
+    async def delete(self, expense_ids):
+        return await self._submit("delete", (expense_ids,))
+
+    async def call(self, fn, *args):
+        """Run a write that commits on its own (settings) in queue order."""
+        return await self._submit("call", (fn, args))
+
+    async def _submit(self, kind, args):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((kind, args, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(self.executor, self._commit, [(k, a) for k, a, _ in batch])
+            except Exception as e:
+                results = [(False, e)] * len(batch)
+            for (_, _, future), (ok, value) in zip(batch, results):
+                if future.done():
+                    continue        # the client went away
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _commit(self, batch):
+        # Runs on the writer thread.  Consecutive adds and deletes share a
+        # transaction; a settings call ends the group and runs on its own.
+        results = []
+        group = []
+        for kind, args in batch:
+            if kind == "call":
+                results += self._commit_group(group)
+                group = []
+                fn, call_args = args
+                try:
+                    results.append((True, fn(*call_args)))
+                except Exception as e:
+                    results.append((False, e))
+            else:
+                group.append((kind, args))
+        return results + self._commit_group(group)
+
+    def _commit_group(self, group):
+        if not group:
+            return []
+        results, dates, missing, deletes = [], [], [], False
+        try:
+            with db.transaction() as conn:
+                for kind, args in group:
+                    conn.execute("SAVEPOINT write")
+                    try:
+                        if kind == "add":
+                            results.append((True, operations.insert_expense(conn, *args)))
+                            dates.append(args[3])
+                        else:
+                            missing += operations.remove_expenses(conn, args[0])
+                            deletes = True
+                            results.append((True, None))
+                        conn.execute("RELEASE write")
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write")
+                        conn.execute("RELEASE write")
+                        results.append((False, e))
+        except Exception as e:      # the commit itself failed: nothing was written
+            return [(False, e)] * len(group)
+        self.commits += 1
+        self.writes += len(group)
+        if dates:
+            operations.expenses_added(dates)
+        if deletes:
+            operations.expenses_deleted(missing)
+        return results
+
+
+# ---- Requests ----
+def _one(query, name, convert=str, default=None):
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        return convert(values[0])
+    except ValueError:
+        raise HttpError(400, f"Invalid {name}: {values[0]!r}") from None
+
+
+def _key(text):
+    # "DATE,ID" -> (date, id) paging key
+    date, _, expense_id = text.partition(",")
+    return date, int(expense_id)
+
+
+def _filters(query):
+    return {name: query[name][0] for name in ("from_date", "to_date", "category", "text") if query.get(name)}
+
+
+def _month(query):
+    today = datetime.date.today()
+    return _one(query, "year", int, today.year), _one(query, "month", int, today.month)
+
+
+def _category(body):
+    category = body.get("category")
+    if not isinstance(category, str) or not category:
+        raise HttpError(400, "category is required.")
+    return category
+
+
+def _expense(body):
+    try:
+        amount = parse_amount(body.get("amount"))
+        date = parse_date(body.get("date"))
+    except ValueError as e:
+        raise HttpError(400, str(e)) from None
+    category = _category(body)
+    description = body.get("description") or ""
+    if not isinstance(description, str):
+        raise HttpError(400, "Description must be text.")
+    return amount, category, description, date
+
+
+def _ids(values):
+    if not isinstance(values, list) or not all(isinstance(i, int) for i in values):
+        raise HttpError(400, "ids must be a list of integers.")
+    return values
+
+
+def _path(body):
+    path = body.get("path")
+    if not isinstance(path, str) or not path:
+        raise HttpError(400, "path is required.")
+    return path
+
+
+def _number(body, name):
+    value = body.get(name)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise HttpError(400, f"{name} must be a number.")
+    return float(value)
+
+
+class ExpenseServer:
+    def __init__(self, host=HOST, port=PORT, max_batch=MAX_BATCH, readers=READERS):
+        self.host, self.port = host, port
+        self.writes = WriteQueue(max_batch)
+        self.readers = ThreadPoolExecutor(readers, thread_name_prefix="reader")
+        self.server = None
+
+    async def start(self):
+        self._writer_task = asyncio.create_task(self.writes.run())
+        self.server = await asyncio.start_server(self._connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def read(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.readers, fn, *args)
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    status, payload = 413, {"error": "Request body too large."}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self._dispatch(method, target, body)
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                data = json.dumps(payload).encode()
+                head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                        f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n")
+                if not keep_alive:
+                    head += "Connection: close\r\n"
+                writer.write(head.encode() + b"\r\n" + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, target, body):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        try:
+            try:
+                data = json.loads(body) if body else {}
+            except ValueError:
+                raise HttpError(400, "Body is not valid JSON.") from None
+            if not isinstance(data, dict):
+                raise HttpError(400, "Body must be a JSON object.")
+            return await self._route(method, url.path.rstrip("/") or "/", query, data)
+        except HttpError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    async def _route(self, method, path, query, body):
+        if path == "/health" and method == "GET":
+            return 200, {"ok": True, "commits": self.writes.commits, "writes": self.writes.writes}
+        if path == "/expenses":
+            if method == "GET":
+                rows = await self.read(queries.fetch_expenses, _filters(query), _one(query, "limit", int),
+                                       _one(query, "after", _key), _one(query, "before", _key),
+                                       _one(query, "offset", int))
+                return 200, {"rows": [list(row) for row in rows]}
+            if method == "POST":
+                return 201, {"id": await self.writes.add(*_expense(body))}
+            raise HttpError(405, "Use GET or POST.")
+        if path == "/expenses/count" and method == "GET":
+            return 200, {"count": await self.read(queries.count_expenses, _filters(query))}
+        if path == "/expenses/delete" and method == "POST":
+            await self.writes.delete(_ids(body.get("ids")))
+            return 200, {"ok": True}
+        if path.startswith("/expenses/") and method == "DELETE":
+            try:
+                expense_id = int(path.rsplit("/", 1)[1])
+            except ValueError:
+                raise HttpError(404, f"No such resource: {path}") from None
+            await self.writes.delete([expense_id])
+            return 200, {"ok": True}
+        if path == "/budget":
+            if method == "GET":
+                year, month = _month(query)
+                return 200, {"budget": settings_store.get_budget(), "block_mode": settings_store.get_block_mode(),
+                             "spent": await self.read(operations.get_total_expenses_for_month, year, month)}
+            if method == "PUT":
+                await self.writes.call(operations.set_budget, _number(body, "amount"))
+                return 200, {"ok": True}
+            raise HttpError(405, "Use GET or PUT.")
+        if path == "/category-limit" and method == "PUT":
+            await self.writes.call(operations.set_category_limit, _category(body), _number(body, "amount"))
+            return 200, {"ok": True}
+        if path == "/unwanted" and method == "PUT":
+            await self.writes.call(operations.mark_category_unwanted, _category(body), bool(body.get("unwanted", True)))
+            return 200, {"ok": True}
+        if path == "/block-mode" and method == "PUT":
+            await self.writes.call(operations.set_block_mode, bool(body.get("enabled")))
+            return 200, {"ok": True}
+        if path == "/pre-add" and method == "GET":
+            year, month = _month(query)
+            category = _one(query, "category")
+            if not category:
+                raise HttpError(400, "category is required.")
+            return 200, await self.read(operations.get_pre_add_figures, year, month, category)
+        if path == "/changes" and method == "GET":
+            return 200, {"seq": await self.read(changes.latest_seq)}
+        if path == "/import" and method == "POST":
+            return 200, await self.writes.call(operations.import_statement, _path(body))
+        if path == "/archive" and method == "POST":
+            return 200, {"moved": await self.writes.call(operations.archive_closed_years)}
+        if path == "/export-watermark" and method == "PUT":
+            upto = body.get("upto")
+            if isinstance(upto, bool) or not isinstance(upto, int):
+                raise HttpError(400, "upto must be an integer.")
+            await self.writes.call(operations.record_export, {"path": _path(body), "upto": upto})
+            return 200, {"ok": True}
+        if path == "/suggestions" and method == "GET":
+            return 200, {"suggestions": await self.read(operations.recommend_actions_for_month, *_month(query))}
+        raise HttpError(404, f"No such resource: {method} {path}")
+
+
+def main():
+    # python server.py [--db expenses.db] [--host 127.0.0.1] [--port 8765] [--max-batch 256] [--readers 4]
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="writes per commit (1: no group commit)")
+    parser.add_argument("--readers", type=int, default=READERS)
+    args = parser.parse_args()
+    db.set_db_path(args.db)
+    schema.migrate(db.get_conn())
+    archive.upgrade_archives()
+    settings_store.load()
+
+    async def serve():
+        server = await ExpenseServer(args.host, args.port, args.max_batch, args.readers).start()
+        print(f"serving {db.DB_PATH} on http://{server.host}:{server.port}", file=sys.stderr, flush=True)
+        async with server.server:
+            await server.server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import threading
+
+import db
+
+# ---------------- Settings Cache ----------------
+# Budget, block mode and the per-category rules are read on every pre-add
+# check and budget bar refresh, but change only when the user edits them.
+# They are loaded once into memory and every setter writes through to the
+# database and then updates the cache, so reads never touch SQLite.
+
+_lock = threading.RLock()
+_cache = None
+
+
+def load():
+    """(Re)load all settings from the database into the cache."""
+    global _cache
+    conn = db.get_conn()
+    values = dict(conn.execute("SELECT key, value FROM settings WHERE key IN ('monthly_budget', 'block_mode')"))
+    rules = {category: (limit, bool(unwanted)) for category, limit, unwanted
+             in conn.execute("SELECT category, monthly_limit, unwanted FROM category_rules")}
+    with _lock:
+        _cache = {
+            "path": db.DB_PATH,
+            "budget": float(values["monthly_budget"]) if values.get("monthly_budget") else 0,
+            "block_mode": values.get("block_mode") == "1",
+            "rules": rules,
+        }
+
+
+def _current():
+    # Reload lazily after db.set_db_path() points the app at another file.
+    if _cache is None or _cache["path"] != db.DB_PATH:
+        load()
+    return _cache
+
+
+# ---- Reads ----
+def get_budget():
+    with _lock:
+        return _current()["budget"]
+
+
+def get_block_mode():
+    with _lock:
+        return _current()["block_mode"]
+
+
+def get_category_limit(category):
+    with _lock:
+        return _current()["rules"].get(category, (None, False))[0]
+
+
+def is_category_unwanted(category):
+    with _lock:
+        return _current()["rules"].get(category, (None, False))[1]
+
+
+def unwanted_categories():
+    with _lock:
+        return [c for c, (_, unwanted) in _current()["rules"].items() if unwanted]
+
+
+def category_limits():
+    with _lock:
+        return {c: limit for c, (limit, _) in _current()["rules"].items() if limit is not None}
+
+
+# ---- Write-through updates ----
+def _set_setting(key, value):
+    with db.transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+
+
+def set_budget(amount):
+    with _lock:
+        _set_setting("monthly_budget", str(amount))
+        _current()["budget"] = float(amount)
+
+
+def set_block_mode(enabled):
+    with _lock:
+        _set_setting("block_mode", "1" if enabled else "0")
+        _current()["block_mode"] = bool(enabled)
+
+
+def set_category_limit(category, amount):
+    with _lock:
+        with db.transaction() as conn:
+            conn.execute("""INSERT INTO category_rules (category, monthly_limit) VALUES (?, ?)
+                            ON CONFLICT (category) DO UPDATE SET monthly_limit = excluded.monthly_limit""",
+                         (category, float(amount)))
+        rules = _current()["rules"]
+        rules[category] = (float(amount), rules.get(category, (None, False))[1])
+
+
+def mark_category_unwanted(category, unwanted=True):
+    with _lock:
+        with db.transaction() as conn:
+            conn.execute("""INSERT INTO category_rules (category, unwanted) VALUES (?, ?)
+                            ON CONFLICT (category) DO UPDATE SET unwanted = excluded.unwanted""",
+                         (category, int(bool(unwanted))))
+        rules = _current()["rules"]
+        rules[category] = (rules.get(category, (None, False))[0], bool(unwanted))
@@ -0,0 +1,215 @@
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+import archive
+import changes
+import db
+
+# ---------------- Columnar Snapshot ----------------
+# A column-per-file copy of every expense (hot and archived) for pivots:
+# id, day (days since 1970-01-01), category id and amount in paise, each a
+# NumPy .npy file opened memory-mapped, so a report touches only the
+# columns it uses and the OS pages them in on demand.
+#
+# The snapshot is brought up to date before every use.  Its watermark is
+# the change log's sequence number (expense_changes.seq, see changes.py)
+# when it was taken: while that has not moved nothing needs reading, and
+# once it has, the rows of every expense changed since -- inserted,
+# updated or deleted, at any id -- replace their old copies.  If the
+# rollups then count a different number of rows than the snapshot holds
+# (rows loaded without logging, or changed and then archived), it is
+# rebuilt from scratch.  Archiving moves rows without changing them, so it
+# needs nothing.
+#
+# Files live in <db stem>.snapshot/ next to the database.  Each refresh
+# writes a new generation of files and then switches meta.json to it, so a
+# reader still mapping the previous generation is never disturbed; old
+# generations are removed once nothing maps them.
+
+COLUMNS = {"id": np.int64, "day": np.int32, "category": np.int32, "amount_paise": np.int64}
+FORMAT = 2
+
+_lock = threading.Lock()
+_current = None         # (db path, Snapshot)
+
+
+class Snapshot:
+    """The columns (NumPy arrays, usually memory-mapped) plus category names and the change-log watermark."""
+
+    def __init__(self, columns, categories, watermark, generation=0):
+        self.columns = columns
+        self.categories = categories        # category id -> name
+        self.watermark = watermark
+        self.generation = generation
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+
+def snapshot_dir():
+    if db.DB_PATH == ":memory:":
+        return None
+    stem, _ = os.path.splitext(os.path.abspath(db.DB_PATH))
+    return stem + ".snapshot"
+
+
+_SELECT = """SELECT id, CAST(julianday(date) - 2440587.5 AS INTEGER), category_id, amount_paise
+             FROM {}.expense_rows"""
+
+
+def _to_columns(rows, sort=False):
+    array = np.array(rows, dtype=np.int64).reshape(-1, len(COLUMNS))
+    if sort:
+        array = array[np.argsort(array[:, 0])]      # archives first, but the columns are kept in id order
+    return {name: array[:, i].astype(dtype) for i, (name, dtype) in enumerate(COLUMNS.items())}
+
+
+def _read_all(conn):
+    rows = []
+    for _, _, years in archive.segments(conn):
+        archive.attach(conn, years)
+        for name in ["main"] + [f"archive_{y}" for y in years]:
+            rows += conn.execute(_SELECT.format(name)).fetchall()
+    archive.attach(conn, [])
+    return _to_columns(rows, sort=True)
+
+
+def _read_changed(conn, watermark):
+    """(ids of every expense changed since `watermark`, columns of those still in main)."""
+    rows = conn.execute("""SELECT c.expense_id, r.id, CAST(julianday(r.date) - 2440587.5 AS INTEGER),
+                                  r.category_id, r.amount_paise
+                           FROM expense_changes c LEFT JOIN main.expense_rows r ON r.id = c.expense_id
+                           WHERE c.seq > ? ORDER BY c.expense_id""", (watermark,)).fetchall()
+    # Deleted (and archived) expenses are no longer in main, so only the live ones have columns.
+    return (np.array([row[0] for row in rows], dtype=np.int64),
+            _to_columns([row[1:] for row in rows if row[1] is not None]))
+
+
+def _patch(current, changed, new):
+    """current with the rows of `changed` ids replaced by `new` (in id order)."""
+    ids = current["id"]
+    if not len(changed):
+        return current.columns
+    if not len(ids) or (changed.min() > ids[-1] and len(new["id"]) == len(changed)):
+        # Only new expenses: append.
+        return {name: np.concatenate([current[name], new[name]]) for name in COLUMNS}
+    keep = ~np.isin(ids, changed)
+    columns = {name: np.concatenate([current[name][keep], new[name]]) for name in COLUMNS}
+    order = np.argsort(columns["id"], kind="stable")
+    return {name: values[order] for name, values in columns.items()}
+
+
+def _expected_rows(conn):
+    # The rollups keep counting archived rows, so this is the total everywhere.
+    return conn.execute("SELECT COALESCE(SUM(count), 0) FROM monthly_rollup").fetchone()[0]
+
+
+def _load(directory):
+    try:
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+    if meta.get("format") != FORMAT:
+        return None, None
+    try:
+        columns = {name: np.load(os.path.join(directory, f"g{meta['generation']}-{name}.npy"), mmap_mode="r")
+                   for name in COLUMNS}
+    except (OSError, ValueError):
+        return None, None
+    return meta, columns
+
+
+def _save(directory, generation, columns, watermark):
+    os.makedirs(directory, exist_ok=True)
+    for name, values in columns.items():
+        np.save(os.path.join(directory, f"g{generation}-{name}.npy"), values)
+    tmp = os.path.join(directory, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"format": FORMAT, "generation": generation, "watermark": watermark, "rows": len(columns["id"])}, f)
+    os.replace(tmp, os.path.join(directory, "meta.json"))
+    for entry in os.listdir(directory):
+        if entry.endswith(".npy") and not entry.startswith(f"g{generation}-"):
+            try:
+                os.remove(os.path.join(directory, entry))
+            except OSError:
+                pass    # still mapped somewhere (Windows); removed by a later refresh
+    return {name: np.load(os.path.join(directory, f"g{generation}-{name}.npy"), mmap_mode="r") for name in COLUMNS}
+
+
+def refresh(conn=None):
+    """Bring the snapshot up to date with the database and return it."""
+    global _current
+    conn = conn or db.get_conn()
+    with _lock:
+        directory = snapshot_dir()
+        current = _current[1] if _current and _current[0] == db.DB_PATH else None
+        if current is None and directory:
+            meta, columns = _load(directory)
+            if meta:
+                current = Snapshot(columns, {}, meta["watermark"], meta["generation"])
+
+        watermark = changes.latest_seq(conn)
+        columns = None
+        if current is not None:
+            if watermark != current.watermark:
+                columns = _patch(current, *_read_changed(conn, current.watermark))
+            else:
+                columns = current.columns
+            if len(columns["id"]) != _expected_rows(conn):
+                columns = None          # out of step with the rollups: rebuild
+        if columns is None:
+            columns = _read_all(conn)
+
+        generation = current.generation if current is not None else 0
+        if current is None or columns is not current.columns:
+            generation += 1
+            if directory:
+                columns = _save(directory, generation, columns, watermark)
+        categories = dict(conn.execute("SELECT id, name FROM categories"))
+        _current = (db.DB_PATH, Snapshot(columns, categories, watermark, generation))
+        return _current[1]
+
+
+def load(conn=None):
+    """The snapshot as last saved, without refreshing it; None if there is none.
+
+    For readers that must not write, such as report worker processes: the
+    parent refreshes once and every worker maps the same files.
+    """
+    conn = conn or db.get_conn()
+    directory = snapshot_dir()
+    meta, columns = _load(directory) if directory else (None, None)
+    if meta is None:
+        return None
+    categories = dict(conn.execute("SELECT id, name FROM categories"))
+    return Snapshot(columns, categories, meta["watermark"], meta["generation"])
+
+
+def drop():
+    """Forget the in-memory snapshot and delete its files (they are rebuilt on the next refresh)."""
+    global _current
+    with _lock:
+        _current = None
+        directory = snapshot_dir()
+        if directory and os.path.isdir(directory):
+            for entry in os.listdir(directory):
+                try:
+                    os.remove(os.path.join(directory, entry))
+                except OSError:
+                    pass
+
+
+if __name__ == "__main__":
+    # python snapshot.py [expenses.db] -- refresh the snapshot and report its size
+    if len(sys.argv) > 1:
+        db.set_db_path(sys.argv[1])
+    snap = refresh()
+    print(f"{len(snap)} rows up to change {snap.watermark} in {snapshot_dir() or 'memory'}")
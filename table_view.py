@@ -0,0 +1,183 @@
+# ---------------- Virtualized Expense Table ----------------
+# The Treeview only ever holds a window of rows around what is on screen.
+# Pages are fetched by keyset (date, id) as the user scrolls towards either
+# edge of the window, and rows that fall too far outside it are dropped, so
+# the widget stays small no matter how large the database grows.
+# Text searches come back ranked rather than in (date, id) order, so those
+# are paged by offset instead, with `start` tracking the offset of the first
+# row in the window.
+# Pages are read on the worker (the backend may be a server) and added on
+# the Tk thread when they arrive; one page is in flight at a time, and a
+# reload discards pages requested before it.
+
+PAGE_SIZE = 200
+MAX_ROWS = 3 * PAGE_SIZE     # visible rows plus a prefetch buffer either side
+EDGE = 0.15                  # fetch when the view is this close to an edge
+
+
+class VirtualExpenseTable:
+    def __init__(self, tree, fetch, worker, scrollbar=None):
+        """tree: a Treeview with ID..Date columns; fetch: fetch_expenses-compatible callable run on worker."""
+        self.tree = tree
+        self.fetch = fetch
+        self.worker = worker
+        self.scrollbar = scrollbar
+        self.filters = None
+        self.at_start = True
+        self.at_end = False
+        self.ranked = False
+        self.start = 0
+        self._pending = False
+        self._loading = False       # a page is being read
+        self._generation = 0        # bumped by reload()
+        tree.configure(yscrollcommand=self._on_scroll)
+
+    # ---- Loading ----
+    def reload(self, filters=None):
+        self.filters = filters
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self.at_start = True
+        self.at_end = False
+        self.ranked = bool(filters and filters.get("text"))
+        self.start = 0
+        self._generation += 1
+        self._loading = False
+        self.load_next()
+        self.tree.yview_moveto(0)
+
+    def _request(self, kwargs, apply):
+        # Read a page on the worker and hand it to apply(rows) on the Tk thread.
+        self._loading = True
+        generation = self._generation
+
+        def loaded(rows):
+            if generation != self._generation:
+                return          # reloaded while this page was read
+            self._loading = False
+            apply(rows)
+
+        def failed(exc):
+            if generation == self._generation:
+                self._loading = False
+            if self.worker.on_error:
+                self.worker.on_error(exc)
+
+        filters = self.filters
+        self.worker.submit(lambda: self.fetch(filters, **kwargs), label="Loading expenses",
+                           on_done=loaded, on_error=failed)
+
+    def load_next(self):
+        if self._loading:
+            return
+        children = self.tree.get_children()
+        if self.ranked:
+            self._request({"limit": PAGE_SIZE, "offset": self.start + len(children)}, self._add_next)
+        else:
+            after = self._key(children[-1]) if children else None
+            self._request({"limit": PAGE_SIZE, "after": after}, self._add_next)
+
+    def _add_next(self, rows):
+        children = self.tree.get_children()
+        if len(rows) < PAGE_SIZE:
+            self.at_end = True
+        rows = self._new(rows)
+        for row in rows:
+            self.tree.insert("", "end", iid=str(row[0]), values=row)
+        excess = len(children) + len(rows) - MAX_ROWS
+        if excess > 0:
+            top = self.tree.identify_row(1)
+            self.tree.delete(*children[:excess])
+            self.start += excess
+            self.at_start = False
+            self._pin(top)
+
+    def load_prev(self):
+        children = self.tree.get_children()
+        if self._loading or not children:
+            return
+        if self.ranked:
+            count = min(PAGE_SIZE, self.start)
+            if not count:
+                self.at_start = True
+                return
+            self._request({"limit": count, "offset": self.start - count}, self._add_prev)
+        else:
+            self._request({"limit": PAGE_SIZE, "before": self._key(children[0])}, self._add_prev)
+
+    def _add_prev(self, rows):
+        children = self.tree.get_children()
+        if self.ranked:
+            self.start -= len(rows)
+            if self.start == 0:
+                self.at_start = True
+        elif len(rows) < PAGE_SIZE:
+            self.at_start = True
+        top = self.tree.identify_row(1)
+        rows = self._new(rows)
+        for row in reversed(rows):
+            self.tree.insert("", 0, iid=str(row[0]), values=row)
+        excess = len(children) + len(rows) - MAX_ROWS
+        if excess > 0:
+            self.tree.delete(*children[-excess:])
+            self.at_end = False
+        self._pin(top)
+
+    def _new(self, rows):
+        # A row added while its page was being read is already in the tree.
+        return [row for row in rows if not self.tree.exists(str(row[0]))]
+
+    def _pin(self, top):
+        # Adding or dropping rows above the view shifts it; keep the same row on top.
+        if top and self.tree.exists(top):
+            self.tree.yview_moveto(self.tree.index(top) / max(1, len(self.tree.get_children())))
+
+    def _on_scroll(self, first, last):
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        if self._pending:
+            return
+        first, last = float(first), float(last)
+        if (last > 1 - EDGE and not self.at_end) or (first < EDGE and not self.at_start):
+            self._pending = True
+            self.tree.after_idle(self._fill)
+
+    def _fill(self):
+        self._pending = False
+        first, last = self.tree.yview()
+        if last > 1 - EDGE and not self.at_end:
+            self.load_next()
+        elif first < EDGE and not self.at_start:
+            self.load_prev()
+
+    # ---- Incremental updates ----
+    def insert_row(self, row):
+        """Show a newly added expense if it falls inside the loaded window."""
+        if self.filters:
+            # Cheaper to refetch one page than to re-implement every filter here.
+            self.reload(self.filters)
+            return
+        children = self.tree.get_children()
+        key = (row[4], row[0])
+        if children:
+            if key < self._key(children[0]) and not self.at_start:
+                return
+            if key > self._key(children[-1]) and not self.at_end:
+                return
+        index = len(children)
+        for i, iid in enumerate(children):
+            if key < self._key(iid):
+                index = i
+                break
+        self.tree.insert("", index, iid=str(row[0]), values=row)
+
+    def remove_rows(self, expense_ids):
+        items = [str(i) for i in expense_ids if self.tree.exists(str(i))]
+        if items:
+            self.tree.delete(*items)
+        if not self.at_end and len(self.tree.get_children()) < PAGE_SIZE:
+            self.load_next()
+
+    def _key(self, iid):
+        return (self.tree.set(iid, "Date"), int(iid))
@@ -0,0 +1,49 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import schema  # noqa: E402
+
+# Expenses as the original app stored them (schema v0: REAL rupees and
+# category names), with amounts chosen to be inexact in binary floating point.
+BASELINE_EXPENSES = [
+    (0.29, "Food", "tea", "2024-01-03"),
+    (19.99, "Food", "groceries", "2024-01-03"),
+    (0.1, "Travel", "bus", "2024-01-15"),
+    (1234.56, "Bills", "electricity", "2024-02-01"),
+    (99999.99, "Shopping", "laptop", "2024-02-10"),
+    (4.35, "Pets", "a category not in the list", "2024-02-10"),
+]
+
+
+def create_baseline_db(path):
+    """A file in the original app's layout, before any migration."""
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE expenses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    amount REAL NOT NULL,
+                    category TEXT NOT NULL,
+                    description TEXT,
+                    date TEXT NOT NULL
+                )""")
+    conn.execute("CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT)")
+    conn.executemany("INSERT INTO expenses (amount, category, description, date) VALUES (?, ?, ?, ?)",
+                     BASELINE_EXPENSES)
+    conn.executemany("INSERT INTO settings (key, value) VALUES (?, ?)",
+                     [("monthly_budget", "5000"), ("limit_Food", "300.5"), ("unwanted_JunkFood", "1")])
+    conn.commit()
+    return conn
+
+
+@pytest.fixture
+def database(tmp_path):
+    """A freshly migrated expenses database that db.get_conn() points at."""
+    db.set_db_path(str(tmp_path / "expenses.db"))
+    schema.migrate(db.get_conn())
+    yield db.get_conn()
+    db.close_all()
@@ -0,0 +1,110 @@
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import changes  # noqa: E402
+import operations  # noqa: E402
+import schema  # noqa: E402
+
+
+def _log(conn):
+    return conn.execute("SELECT expense_id, seq, deleted FROM expense_changes ORDER BY seq").fetchall()
+
+
+def _read(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_insert_update_delete_are_logged(database):
+    first = operations.add_expense(10.5, "Food", "lunch", "2024-01-03")
+    second = operations.add_expense(3, "Travel", "bus", "2024-01-04")
+    assert _log(database) == [(first, 1, 0), (second, 2, 0)]
+
+    with database:
+        database.execute("UPDATE expense_rows SET amount_paise = 1100 WHERE id = ?", (first,))
+    assert _log(database) == [(second, 2, 0), (first, 3, 0)]      # one row per expense, moved to the end
+
+    operations.delete_expense(second)
+    assert _log(database) == [(first, 3, 0), (second, 4, 1)]
+    assert changes.latest_seq(database) == 4
+
+
+def test_bulk_logging(database):
+    with database:
+        before = database.execute("SELECT COALESCE(MAX(id), 0) FROM expense_rows").fetchone()[0]
+        with schema.triggers_suspended(database, "trg_changes_insert"):
+            for day in (1, 2, 3):
+                database.execute("INSERT INTO expense_rows (amount_paise, category_id, date) VALUES (100, 1, ?)",
+                                 (f"2024-01-0{day}",))
+        schema.log_changes(database, before)
+        schema.log_deletes(database, [99])
+    assert [(seq, deleted) for _, seq, deleted in _log(database)] == [(1, 0), (2, 0), (3, 0), (4, 1)]
+
+
+def test_changed_rows(database):
+    kept = operations.add_expense(10.5, "Food", "lunch", "2024-01-03")
+    gone = operations.add_expense(3, "Travel", "bus", "2024-01-04")
+    operations.delete_expense(gone)
+    rows = list(changes.changed_rows(0, changes.latest_seq(database)))
+    assert [row[:6] for row in rows] == [(kept, 10.5, "Food", "lunch", "2024-01-03", changes.UPSERT),
+                                          (gone, None, None, None, None, changes.DELETE)]
+
+
+def test_export_after_watermark_has_only_new_changes(database, tmp_path):
+    path = str(tmp_path / "changes.csv")
+    kept = operations.add_expense(10.5, "Food", "lunch", "2024-01-03")
+    edited = operations.add_expense(3, "Travel", "bus", "2024-01-04")
+    gone = operations.add_expense(7, "Bills", "phone", "2024-01-05")
+
+    first = changes.export_changes(path)
+    assert first["full"] and first["upserts"] == 3
+    assert changes.watermark(path) == first["upto"] == changes.latest_seq(database)
+    assert len(_read(path)) == 1 + 3
+
+    # Nothing changed: the next export adds nothing.
+    assert changes.export_changes(path)["upserts"] == 0
+    assert len(_read(path)) == 1 + 3
+
+    added = operations.add_expense(20, "Food", "dinner", "2024-01-06")
+    with database:
+        database.execute("UPDATE expense_rows SET description = 'train' WHERE id = ?", (edited,))
+    operations.delete_expense(gone)
+    second = changes.export_changes(path)
+    assert (second["full"], second["since"], second["upserts"], second["deletes"]) == (False, first["upto"], 2, 1)
+    increment = _read(path)[1 + 3:]
+    assert [(row[0], row[3], row[5]) for row in increment] == [
+        (str(added), "dinner", changes.UPSERT), (str(edited), "train", changes.UPSERT), (str(gone), "", changes.DELETE)]
+    assert str(kept) not in [row[0] for row in increment]
+    assert changes.watermark(path) == second["upto"]
+
+
+def test_watermark_is_recorded_only_by_record_watermark(database, tmp_path):
+    path = str(tmp_path / "changes.csv")
+    operations.add_expense(1, "Food", "", "2024-01-01")
+    summary = changes.write_changes(path)
+    assert changes.watermark(path) is None
+    changes.record_watermark(summary)
+    assert changes.watermark(path) == summary["upto"]
+
+
+def test_xlsx_increments_go_to_their_own_workbooks(database, tmp_path):
+    from openpyxl import load_workbook
+    path = str(tmp_path / "changes.xlsx")
+    operations.add_expense(10.5, "Food", "lunch", "2024-01-03")
+    first = changes.export_changes(path)
+    assert first["written"] == path
+    full = os.path.getmtime(path), os.path.getsize(path)
+
+    assert changes.export_changes(path)["upserts"] == 0
+    assert list(tmp_path.glob("*.xlsx")) == [tmp_path / "changes.xlsx"]     # nothing changed, nothing written
+
+    added = operations.add_expense(20, "Food", "dinner", "2024-01-06")
+    second = changes.export_changes(path)
+    assert second["written"] == changes.increment_path(path, second["upto"]) == str(tmp_path / "changes.0000000002.xlsx")
+    assert (os.path.getmtime(path), os.path.getsize(path)) == full     # the full export is not rewritten
+    rows = list(load_workbook(second["written"]).worksheets[0].values)
+    assert rows[0] == tuple(changes.CHANGE_HEADERS)
+    assert [(row[0], row[3], row[5]) for row in rows[1:]] == [(added, "dinner", changes.UPSERT)]
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exporters import export_to_pdf  # noqa: E402
+
+pypdf = pytest.importorskip("pypdf")
+
+
+def _pdf_text(path):
+    reader = pypdf.PdfReader(path)
+    return len(reader.pages), [page.extract_text() for page in reader.pages]
+
+
+def test_pdf_is_readable_and_paged(tmp_path):
+    path = str(tmp_path / "report.pdf")
+    rows = [(i, 10.5, "Food", f"lunch {i}", "2026-10-01") for i in range(1, 201)]
+    export_to_pdf(iter(rows), path)
+    pages, text = _pdf_text(path)
+    assert pages == 5       # 45 rows on the first page, 46 on the rest
+    assert "Expense Report" in text[0]
+    assert "ID | Amount | Category | Description | Date" in text[0]
+    assert "200 | 10.5 | Food | lunch 200 | 2026-10-01" in text[-1]
+
+
+def test_pdf_without_rows_has_one_page(tmp_path):
+    path = str(tmp_path / "empty.pdf")
+    export_to_pdf([], path)
+    assert _pdf_text(path)[0] == 1
+
+
+def test_pdf_keeps_text_outside_cp1252(tmp_path):
+    path = str(tmp_path / "unicode.pdf")
+    export_to_pdf([(1, 99.0, "Food", "café € (tip) ₹50 Łódź naïve Ωmega சா", "2026-10-01")], path)
+    text = _pdf_text(path)[1][0]
+    assert "café € (tip) Rs.50 <U+0141>ódz naïve <U+03A9>mega <U+0B9A><U+0BBE>" in text
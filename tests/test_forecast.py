@@ -0,0 +1,53 @@
+import datetime
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import forecast  # noqa: E402
+from forecast import History  # noqa: E402
+
+
+def _history(start, categories, entries):
+    # entries: {date: {category: amount}}
+    last = max(entries)
+    daily = np.zeros(((last - start).days + 1, len(categories)))
+    for date, amounts in entries.items():
+        for category, amount in amounts.items():
+            daily[(date - start).days, categories.index(category)] += amount
+    return History(start, categories, daily)
+
+
+def test_history_starting_mid_month():
+    # A new user whose first expense is on the 5th of the month.
+    start = datetime.date(2026, 10, 5)
+    history = _history(start, ["Food", "JunkFood"], {
+        start: {"Food": 100, "JunkFood": 999},
+        datetime.date(2026, 10, 10): {"Food": 0.0},
+    })
+    fc = forecast.forecast_month(history, 2026, 10, as_of=datetime.date(2026, 10, 10))
+    assert fc["spent"].sum() == 1099
+    assert fc["projected"].sum() > 1099
+
+    tips = forecast.build_suggestions(2026, 10, 500, ["JunkFood"], {}, history, today=datetime.date(2026, 10, 10))
+    assert tips[0].startswith("Projected overshoot")
+    assert any(t.startswith("Unwanted category JunkFood") for t in tips)
+
+
+def test_expenses_dated_later_this_month_count_as_spent():
+    start = datetime.date(2026, 9, 1)
+    today = datetime.date(2026, 10, 18)
+    history = _history(start, ["Rent"], {start: {"Rent": 10}, datetime.date(2026, 10, 25): {"Rent": 500}})
+    fc = forecast.forecast_month(history, 2026, 10, today=today)
+    assert fc["as_of"] == today
+    assert fc["spent"].sum() == 500
+    assert fc["projected"].sum() >= 500
+
+
+def test_backtest_sees_only_data_up_to_as_of():
+    start = datetime.date(2026, 1, 1)
+    history = _history(start, ["Food"], {start: {"Food": 10}, datetime.date(2026, 1, 20): {"Food": 1000}})
+    fc = forecast.forecast_month(history, 2026, 1, as_of=datetime.date(2026, 1, 10))
+    assert fc["spent"].sum() == 10
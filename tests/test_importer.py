@@ -0,0 +1,58 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import importer  # noqa: E402
+
+STATEMENT = """Date,Amount,Description,Category
+2024-01-03,10.50,lunch,food
+2024-01-03,10.50,lunch,food
+2024-01-04,"1,250.00",rent share,Bills
+2024-01-05,not a number,broken row,Other
+2024-01-06,0.29,tea,Food
+"""
+
+OFX = """<OFX><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240107<TRNAMT>-45.00<FITID>T1<NAME>cab</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240108<TRNAMT>500.00<FITID>T2<NAME>salary</STMTTRN>
+</BANKTRANLIST></OFX>
+"""
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def _rows(conn):
+    return conn.execute("SELECT amount_paise, description, date FROM expense_rows ORDER BY id").fetchall()
+
+
+def test_reimport_adds_nothing(database, tmp_path):
+    path = _write(tmp_path, "statement.csv", STATEMENT)
+    first = importer.import_expenses(path)
+    assert (first["rows_read"], first["inserted"], first["duplicates"], first["rejected"]) == (5, 4, 0, 1)
+    rows = _rows(database)
+    assert [paise for paise, _, _ in rows] == [1050, 1050, 125000, 29]     # the same lunch twice is two expenses
+
+    second = importer.import_expenses(path)
+    assert (second["inserted"], second["duplicates"], second["rejected"]) == (0, 4, 1)
+    assert _rows(database) == rows
+    totals = database.execute("SELECT SUM(total_paise), SUM(count) FROM monthly_rollup").fetchone()
+    assert totals == (sum(paise for paise, _, _ in rows), 4)
+
+
+def test_reimport_of_an_ofx_statement_adds_nothing(database, tmp_path):
+    path = _write(tmp_path, "statement.ofx", OFX)
+    assert importer.import_expenses(path)["inserted"] == 1          # the credit is income, not an expense
+    assert importer.import_expenses(path)["inserted"] == 0
+    assert _rows(database) == [(4500, "cab", "2024-01-07")]
+
+
+def test_overlapping_statements(database, tmp_path):
+    importer.import_expenses(_write(tmp_path, "a.csv", STATEMENT))
+    more = STATEMENT + "2024-01-07,5.00,snack,JunkFood\n"
+    summary = importer.import_expenses(_write(tmp_path, "b.csv", more))
+    assert (summary["inserted"], summary["duplicates"]) == (1, 4)
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import parse_amount, to_paise  # noqa: E402
+
+
+@pytest.mark.parametrize("text", ["nan", "inf", "-inf", "1e400", "1e17", 10 ** 400, "0", "-5", "", None, "abc"])
+def test_parse_amount_rejects(text):
+    with pytest.raises(ValueError, match="Invalid amount."):
+        parse_amount(text)
+
+
+def test_parse_amount_accepts():
+    assert to_paise(parse_amount("12.345")) == 1234
+    assert parse_amount(" 99 ") == 99.0
@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import schema  # noqa: E402
+
+
+def _expected(conn):
+    monthly = conn.execute("""SELECT year_month, name, SUM(amount_paise), COUNT(*)
+                              FROM expense_rows JOIN categories ON categories.id = category_id
+                              GROUP BY year_month, name ORDER BY 1, 2""").fetchall()
+    daily = conn.execute("""SELECT date, name, SUM(amount_paise)
+                            FROM expense_rows JOIN categories ON categories.id = category_id
+                            GROUP BY date, name ORDER BY 1, 2""").fetchall()
+    return monthly, daily
+
+
+def _rollups(conn):
+    monthly = conn.execute("SELECT year_month, category, total_paise, count FROM monthly_rollup ORDER BY 1, 2")
+    # A day whose expenses are all gone keeps a zero row; it sums the same.
+    daily = conn.execute("SELECT date, category, total_paise FROM daily_rollup WHERE total_paise != 0 ORDER BY 1, 2")
+    return monthly.fetchall(), daily.fetchall()
+
+
+def _insert(conn, paise, category, date):
+    return conn.execute("INSERT INTO expense_rows (amount_paise, category_id, description, date) VALUES (?, ?, '', ?)",
+                        (paise, schema.category_id(conn, category), date)).lastrowid
+
+
+@pytest.fixture
+def expenses(database):
+    ids = [_insert(database, paise, category, date) for paise, category, date in [
+        (1050, "Food", "2024-01-03"), (250, "Food", "2024-01-03"), (9999, "Travel", "2024-01-31"),
+        (120000, "Bills", "2024-02-01"), (5, "Food", "2024-02-29")]]
+    database.commit()
+    return database, ids
+
+
+def test_insert(expenses):
+    conn, _ = expenses
+    assert _rollups(conn) == _expected(conn)
+    assert _rollups(conn)[0][0] == ("2024-01", "Food", 1300, 2)
+
+
+def test_delete(expenses):
+    conn, ids = expenses
+    conn.execute("DELETE FROM expense_rows WHERE id = ?", (ids[0],))
+    assert _rollups(conn) == _expected(conn)
+    conn.execute("DELETE FROM expense_rows WHERE id = ?", (ids[2],))     # the month's only Travel expense
+    assert _rollups(conn) == _expected(conn)
+    assert ("2024-01", "Travel") not in [row[:2] for row in _rollups(conn)[0]]
+
+
+@pytest.mark.parametrize("change, params", [
+    ("amount_paise = ?", (777,)),
+    ("category_id = ?", ("Travel",)),
+    ("date = ?", ("2024-01-20",)),           # another day, same month
+    ("date = ?", ("2024-03-05",)),           # another month
+    ("date = ?, category_id = ?, amount_paise = ?", ("2023-12-31", "Medical", 1)),
+])
+def test_update(expenses, change, params):
+    conn, ids = expenses
+    params = tuple(schema.category_id(conn, p) if p in ("Travel", "Medical") else p for p in params)
+    conn.execute(f"UPDATE expense_rows SET {change} WHERE id = ?", params + (ids[1],))
+    assert _rollups(conn) == _expected(conn)
+
+
+def test_rebuild_repairs_drift(expenses):
+    conn, _ = expenses
+    conn.execute("UPDATE monthly_rollup SET total_paise = total_paise + 1")
+    conn.execute("DELETE FROM daily_rollup WHERE date = '2024-02-01'")
+    schema.rebuild_rollup(conn)
+    assert _rollups(conn) == _expected(conn)
@@ -0,0 +1,64 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import schema  # noqa: E402
+from conftest import BASELINE_EXPENSES, create_baseline_db  # noqa: E402
+
+
+@pytest.fixture
+def migrated(tmp_path):
+    # Upgrade the original layout one version at a time, as successive
+    # releases of the app would have.
+    conn = create_baseline_db(str(tmp_path / "expenses.db"))
+    for version in range(1, schema.SCHEMA_VERSION + 1):
+        schema.migrate(conn, version)
+        assert schema.get_version(conn) == version
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("name", sorted(schema.HOT_QUERIES))
+def test_hot_query_uses_an_index(migrated, name):
+    sql, params = schema.HOT_QUERIES[name]
+    plan = [row[-1] for row in migrated.execute("EXPLAIN QUERY PLAN " + sql, params)]
+    assert not [detail for detail in plan if detail.startswith("SCAN")], plan
+
+
+def test_fresh_database_query_plans(database):
+    assert schema.check_query_plans(database) == []
+
+
+def test_migration_keeps_every_expense(migrated):
+    rows = migrated.execute("SELECT amount, category, description, date FROM expenses ORDER BY id").fetchall()
+    assert rows == BASELINE_EXPENSES
+
+
+def test_v9_converts_amounts_to_exact_paise(tmp_path):
+    conn = create_baseline_db(str(tmp_path / "expenses.db"))
+    schema.migrate(conn, 8)
+    rules = conn.execute("SELECT category, monthly_limit, unwanted FROM category_rules ORDER BY category").fetchall()
+    schema.migrate(conn, 9)
+
+    rows = conn.execute("""SELECT r.amount_paise, c.name, r.description, r.date
+                           FROM expense_rows r JOIN categories c ON c.id = r.category_id ORDER BY r.id""").fetchall()
+    assert rows == [(round(amount * 100), category, description, date)
+                    for amount, category, description, date in BASELINE_EXPENSES]
+    assert [paise for paise, _, _, _ in rows] == [29, 1999, 10, 123456, 9999999, 435]
+
+    # Every category in use or in a rule has an id; names survive the move.
+    names = {name for (name,) in conn.execute("SELECT name FROM categories")}
+    assert {"Pets", "JunkFood", "Food"} <= names
+    assert conn.execute("SELECT category, monthly_limit, unwanted FROM category_rules ORDER BY category").fetchall() == rules
+
+    # Rollups are exact sums of the paise.
+    assert conn.execute("SELECT year_month, category, total_paise, count FROM monthly_rollup ORDER BY 1, 2").fetchall() == [
+        ("2024-01", "Food", 29 + 1999, 2), ("2024-01", "Travel", 10, 1),
+        ("2024-02", "Bills", 123456, 1), ("2024-02", "Pets", 435, 1), ("2024-02", "Shopping", 9999999, 1)]
+
+    # New ids continue after the old ones.
+    conn.execute("INSERT INTO expense_rows (amount_paise, category_id, date) VALUES (1, 1, '2024-03-01')")
+    assert conn.execute("SELECT MAX(id) FROM expense_rows").fetchone()[0] == len(BASELINE_EXPENSES) + 1
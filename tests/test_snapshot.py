@@ -0,0 +1,79 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import changes  # noqa: E402
+import operations  # noqa: E402
+import pivot  # noqa: E402
+import snapshot  # noqa: E402
+
+
+def _rows(conn):
+    return conn.execute("""SELECT id, CAST(julianday(date) - 2440587.5 AS INTEGER), category_id, amount_paise
+                           FROM expense_rows ORDER BY id""").fetchall()
+
+
+def _columns(snap):
+    return list(zip(*(snap[name].tolist() for name in snapshot.COLUMNS)))
+
+
+def _by_month(conn):
+    return {(month, category): paise / 100 for month, category, paise in conn.execute(
+        "SELECT year_month, category, total_paise FROM monthly_rollup")}
+
+
+def _pivot_by_month(snap):
+    table = pivot.category_by_month(snap=snap)
+    months = table.labels[table.dims.index("month")]
+    categories = table.labels[table.dims.index("category")]
+    values = table.values if table.dims[0] == "month" else table.values.T
+    return {(m, c): round(float(values[i, j]), 2) for i, m in enumerate(months) for j, c in enumerate(categories)
+            if values[i, j]}
+
+
+@pytest.fixture
+def snap(database):
+    for amount, category, date in [(10.5, "Food", "2024-01-03"), (3, "Travel", "2024-01-04"),
+                                   (120, "Bills", "2024-02-01"), (7.25, "Food", "2024-02-10")]:
+        operations.add_expense(amount, category, "", date)
+    snapshot.drop()
+    yield snapshot.refresh()
+    snapshot.drop()
+
+
+@pytest.mark.parametrize("change, params", [
+    ("amount_paise = ?", (999,)),
+    ("category_id = (SELECT id FROM categories WHERE name = ?)", ("Shopping",)),
+    ("date = ?", ("2024-03-15",)),
+])
+def test_update_below_the_watermark(database, snap, change, params):
+    with database:
+        database.execute(f"UPDATE expense_rows SET {change} WHERE id = 1", params)
+    fresh = snapshot.refresh()
+    assert fresh.watermark == changes.latest_seq(database) > snap.watermark
+    assert _columns(fresh) == _rows(database)
+    assert _pivot_by_month(fresh) == _by_month(database)
+
+
+def test_insert_and_delete(database, snap):
+    operations.delete_expense(2)
+    added = operations.add_expense(42, "Food", "", "2024-03-01")
+    fresh = snapshot.refresh()
+    assert _columns(fresh) == _rows(database)
+    assert fresh["id"].tolist()[-1] == added
+
+
+def test_unchanged_keeps_the_generation(database, snap):
+    assert snapshot.refresh().generation == snap.generation
+
+
+def test_saved_snapshot_catches_up(database, snap):
+    # Another process (or a restart) picks the saved watermark up from disk.
+    snapshot._current = None
+    with database:
+        database.execute("UPDATE expense_rows SET amount_paise = 1 WHERE id = 1")
+    assert snapshot.load().watermark == snap.watermark
+    assert _columns(snapshot.refresh()) == _rows(database)
@@ -0,0 +1,137 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import instrument
+
+# ---------------- Background Worker ----------------
+# Database work, reports and exports run on background threads so the Tk
+# window never blocks.  Writes go through a single writer thread, so only
+# one connection ever writes to the database, while a small pool of readers
+# keeps serving queries (WAL lets them run alongside the writer).  Results
+# come back to the Tk thread through a queue drained by root.after(), since
+# Tk itself must only be touched from the main thread.
+
+POLL_MS = 50
+READER_THREADS = 2
+
+
+class Cancelled(Exception):
+    """Raised inside a task after the user cancelled it."""
+
+
+class Task:
+    def __init__(self, worker, label, cancellable):
+        self.worker = worker
+        self.label = label
+        self.cancellable = cancellable
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    def progress(self, done, total=None):
+        self.worker._post(self.worker._progress, self, done, total)
+
+    def track(self, rows, total=None, every=1000):
+        """Pass rows through, reporting progress and honouring cancel every `every` rows."""
+        done = 0
+        for done, row in enumerate(rows, 1):
+            if done % every == 0:
+                self.check()
+                self.progress(done, total)
+            yield row
+        self.progress(done, total)
+
+
+class Worker:
+    def __init__(self, root, on_status=None, on_progress=None, on_error=None):
+        """on_status(tasks) runs whenever the set of running tasks changes,
+        on_progress(task, done, total) when a task reports progress and
+        on_error(exc) for failed tasks without their own error handler."""
+        self.root = root
+        self.on_status = on_status
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self.tasks = []
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=READER_THREADS, thread_name_prefix="db-reader")
+        self._results = queue.SimpleQueue()
+        self._after_id = root.after(POLL_MS, self._poll)
+
+    def submit(self, fn, *args, write=False, on_done=None, on_error=None,
+               label=None, cancellable=False, pass_task=False):
+        """Run fn(*args) in the background and call on_done(result) on the Tk thread.
+
+        write=True queues the call on the single writer thread.  With
+        pass_task=True fn is called as fn(task, *args) so it can report
+        progress and check for cancellation.
+        """
+        if instrument.ENABLED:
+            name = label or getattr(fn, "__qualname__", "task")
+            fn = instrument.wrap(fn, "task: " + name)
+            if on_done:
+                on_done = instrument.wrap(on_done, "callback: " + name)
+        task = Task(self, label, cancellable)
+        self.tasks.append(task)
+        self._status()
+
+        def run():
+            try:
+                result = fn(task, *args) if pass_task else fn(*args)
+            except Cancelled:
+                self._post(self._finish, task, None, None)
+            except Exception as e:
+                self._post(self._finish, task, on_error or self.on_error, e)
+            else:
+                self._post(self._finish, task, on_done, result)
+
+        (self._writer if write else self._readers).submit(run)
+        return task
+
+    def cancel_all(self):
+        for task in self.tasks:
+            if task.cancellable:
+                task.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self.root.after_cancel(self._after_id)
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+
+    # ---- Tk-thread side ----
+    def _post(self, fn, *args):
+        self._results.put((fn, args))
+
+    def _poll(self):
+        while True:
+            try:
+                fn, args = self._results.get_nowait()
+            except queue.Empty:
+                break
+            fn(*args)
+        self._after_id = self.root.after(POLL_MS, self._poll)
+
+    def _finish(self, task, callback, value):
+        if task in self.tasks:
+            self.tasks.remove(task)
+        self._status()
+        if callback:
+            callback(value)
+
+    def _progress(self, task, done, total):
+        if self.on_progress and task in self.tasks:
+            self.on_progress(task, done, total)
+
+    def _status(self):
+        if self.on_status:
+            self.on_status(list(self.tasks))